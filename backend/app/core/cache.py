@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+try:
+    import redis
+except ImportError:  # The shared cache backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Small thread-safe in-process cache with per-entry TTL and LRU eviction.
+
+    Entries expire ``ttl_seconds`` after they were last written. When the
+    cache is full the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """Get a live entry, refreshing its LRU position."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Store an entry, evicting the least recently used one if full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """Remove an entry and return it."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Any) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class RedisCache:
+    """
+    Cache shared between workers, with the get/set/pop interface of TTLCache.
+
+    Values are stored as JSON under ``prefix`` + key. Errors talking to
+    Redis are logged and treated as misses, so callers fall back to the
+    database.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = ""):
+        if redis is None:
+            raise RuntimeError("redis is required for a shared cache")
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Get an entry, or default if it is missing or Redis is unavailable."""
+        try:
+            raw = self._client.get(f"{self.prefix}{key}")
+        except redis.RedisError as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            return default
+        return default if raw is None else json.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store an entry for ttl_seconds."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            self._client.set(f"{self.prefix}{key}", json.dumps(value), ex=max(1, int(ttl)))
+        except redis.RedisError as e:
+            logger.warning(f"Shared cache write failed: {e}")
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Remove an entry and return it."""
+        try:
+            raw = self._client.getdel(f"{self.prefix}{key}")
+        except redis.RedisError as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+            return default
+        return default if raw is None else json.loads(raw)
+
+
+_request_cache: ContextVar[Optional[Dict[Hashable, Any]]] = ContextVar(
+    "request_cache", default=None
+)
+
+
+def request_cache() -> Optional[Dict[Hashable, Any]]:
+    """
+    Get the current request's memo dict, or None outside a request.
+
+    Lets services memoize lookups for the duration of one request
+    (including sync code run in the threadpool) without threading a
+    cache argument through every call.
+    """
+    return _request_cache.get()
+
+
+class RequestCacheMiddleware:
+    """
+    ASGI middleware giving each HTTP request a fresh request_cache().
+
+    WebSocket connections get none: a memo would live as long as the
+    socket, and lookups repeated per message must see current data.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_cache.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_cache.reset(token)
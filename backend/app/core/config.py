@@ -40,6 +40,15 @@ class Settings(BaseSettings):
     pro_quizzes_per_material: int = 10
     pro_trial_days: int = 7
 
+    # Subscription cache (read-through, invalidated by Stripe webhooks)
+    subscription_cache_size: int = 10000
+    subscription_cache_ttl_seconds: int = 60
+    subscription_cache_redis_url: str = ""  # Share across workers, requires redis
+
+    # Signed entitlement tokens (tier and limits, checked without a lookup)
+    entitlement_token_secret: str = ""  # Derived from the Supabase key if empty
+    entitlement_token_ttl_seconds: int = 300
+
     # OpenAI
     openai_api_key: str
 
@@ -47,8 +56,40 @@ class Settings(BaseSettings):
     youtube_cookies_file: str = ""  # Path to Netscape format cookies.txt file
     youtube_cookies_base64: str = ""  # Base64 encoded cookies (for cloud deployment)
 
+    # Review sessions (in-memory due-card snapshots)
+    review_session_ttl_seconds: int = 1800
+    review_session_max_sessions: int = 10000
+
+    # Chat retrieval (passages sent per question instead of the full text)
+    chat_chunk_chars: int = 1000
+    chat_context_chunks: int = 4
+    chat_retrieval_embeddings: bool = False  # Requires numpy
+
+    # Chat prompt size (running summary + recent turns within a token budget)
+    chat_prompt_token_budget: int = 3000
+    chat_recent_messages: int = 4
+
+    # Chat prompt caching (static per-material prefix + in-process index cache)
+    chat_static_context_chars: int = 4000
+    chat_context_cache_size: int = 256
+    chat_context_cache_ttl_seconds: int = 3600
+
+    # Chat answer cache (first-turn answers shared across identical materials)
+    chat_answer_cache_size: int = 1000
+    chat_answer_cache_ttl_seconds: int = 86400
+    chat_answer_cache_similarity: float = 0.0  # 0 disables near-duplicate matching
+
+    # Quiz generation
+    quiz_generation_timeout_seconds: int = 60
+    quiz_pool_size: int = 2  # Pre-generated quizzes per material, 0 disables
+
+    # Write quiz question seeds in the vocabulary extraction call; quizzes
+    # are then assembled from them instead of re-reading the text
+    processing_quiz_seeds: bool = False
+
     # Application
     debug: bool = False
+    metrics_token: str = ""  # X-Metrics-Token for GET /metrics; empty disables it
     cors_origins: Union[str, List[str]] = ["http://localhost:5173", "http://localhost:3000"]
 
     @field_validator("cors_origins", mode="before")
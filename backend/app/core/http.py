@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Awaitable, Optional, Tuple, TypeVar
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+
+T = TypeVar("T")
+
+# Non-standard status for a request the client abandoned (nginx convention)
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+
+def compute_etag(body: bytes) -> str:
+    """Compute a weak ETag for a serialized response body."""
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # Weak comparison: W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    return any(c.removeprefix("W/") == opaque for c in candidates)
+
+
+def json_response_with_etag(request: Request, content: Any) -> Response:
+    """
+    Serialize content as JSON with an ETag, or answer 304 if the client has it.
+
+    The body is serialized once and hashed, so unchanged lists cost the
+    client a 304 with no payload.
+    """
+    body = json.dumps(
+        jsonable_encoder(content), separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def parse_range_header(range_header: Optional[str], total: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Returns:
+        Inclusive (start, end) byte positions, or None if no range was requested
+
+    Raises:
+        ValueError: If the range is malformed or not satisfiable
+    """
+    if not range_header:
+        return None
+
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header)
+    if not match or match.group(1) == match.group(2) == "":
+        raise ValueError(f"Invalid range: {range_header}")
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(f"Unsatisfiable range: {range_header}")
+        start, end = max(total - length, 0), total - 1
+    else:
+        start = int(first)
+        end = min(int(last), total - 1) if last else total - 1
+
+    if start >= total or start > end:
+        raise ValueError(f"Unsatisfiable range: {range_header}")
+
+    return start, end
+
+
+def text_response_with_range(
+    request: Request, text: str, media_type: str = "text/plain; charset=utf-8"
+) -> Response:
+    """
+    Serve text honouring a ``Range`` header.
+
+    Ranges are in bytes of the UTF-8 encoded text, as for any HTTP resource.
+    """
+    body = text.encode("utf-8")
+    total = len(body)
+    headers = {"Accept-Ranges": "bytes"}
+
+    try:
+        byte_range = parse_range_header(request.headers.get("range"), total)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{total}"},
+        )
+
+    if byte_range is None:
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    return Response(
+        content=body[start:end + 1],
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{total}"},
+    )
+
+
+def format_sse(event: str, data: str) -> str:
+    """Format a single Server-Sent Events message."""
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+
+# Headers for text/event-stream responses (disable proxy buffering)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+async def cancel_on_disconnect(
+    request: Request, awaitable: Awaitable[T], poll_seconds: float = 0.5
+) -> T:
+    """
+    Await a long-running operation, cancelling it if the client disconnects.
+
+    Raises:
+        ClientDisconnected: If the client disconnected first
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,69 @@
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+
+    Counters are plain running totals. Observations keep count/sum/max and a
+    bounded window of recent values for percentiles.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._counters: Dict[str, float] = {}
+        self._observations: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        """Record a single observation (e.g. a latency in ms)."""
+        with self._lock:
+            values = self._observations.setdefault(name, deque(maxlen=self.window))
+            values.append(value)
+            totals = self._totals.setdefault(name, {"count": 0, "sum": 0.0, "max": value})
+            totals["count"] += 1
+            totals["sum"] += value
+            totals["max"] = max(totals["max"], value)
+
+    def snapshot(self) -> dict:
+        """Get current counters and observation summaries."""
+        with self._lock:
+            observations = {}
+            for name, values in self._observations.items():
+                ordered = sorted(values)
+                totals = self._totals[name]
+                observations[name] = {
+                    "count": totals["count"],
+                    "avg": totals["sum"] / totals["count"],
+                    "max": totals["max"],
+                    "p50": _percentile(ordered, 0.50),
+                    "p95": _percentile(ordered, 0.95),
+                }
+            return {"counters": dict(self._counters), "observations": observations}
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+            self._totals.clear()
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -1,8 +1,9 @@
+import hmac
 import json
 from typing import Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
@@ -17,6 +18,7 @@ class TokenPayload(BaseModel):
     sub: str  # User ID
     email: Optional[str] = None
     role: Optional[str] = None
+    exp: Optional[int] = None  # Expiry, seconds since the epoch
 
 
 class CurrentUser(BaseModel):
@@ -38,13 +40,8 @@ def get_supabase_client(settings: Settings = Depends(get_settings)) -> Client:
     )
 
 
-def verify_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    settings: Settings = Depends(get_settings),
-) -> TokenPayload:
-    """Verify and decode JWT token from Supabase."""
-    token = credentials.credentials
-
+def decode_token(token: str, settings: Settings) -> TokenPayload:
+    """Verify and decode a Supabase JWT."""
     try:
         # Parse the JWK from settings (use active JWT secret)
         jwk = json.loads(settings.get_active_supabase_jwt_secret())
@@ -59,6 +56,7 @@ def verify_token(
             sub=payload.get("sub"),
             email=payload.get("email"),
             role=payload.get("role"),
+            exp=payload.get("exp"),
         )
     except JWTError as e:
         raise HTTPException(
@@ -73,6 +71,14 @@ def verify_token(
         )
 
 
+def verify_token(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    settings: Settings = Depends(get_settings),
+) -> TokenPayload:
+    """Verify and decode JWT token from Supabase."""
+    return decode_token(credentials.credentials, settings)
+
+
 def get_current_user(token: TokenPayload = Depends(verify_token)) -> CurrentUser:
     """Get current authenticated user from token."""
     if not token.sub:
@@ -81,3 +87,21 @@ def get_current_user(token: TokenPayload = Depends(verify_token)) -> CurrentUser
             detail="Invalid user identity",
         )
     return CurrentUser(id=UUID(token.sub), email=token.email)
+
+
+def require_metrics_token(
+    x_metrics_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings),
+) -> None:
+    """
+    Guard operational endpoints with the X-Metrics-Token header.
+
+    Without METRICS_TOKEN configured the endpoints are disabled (404).
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_metrics_token or not hmac.compare_digest(x_metrics_token, settings.metrics_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
@@ -1,9 +1,12 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.cache import RequestCacheMiddleware
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.security import require_metrics_token
 from app.routers import auth, cards, chat, materials, payments, quizzes
 
 
@@ -36,11 +39,19 @@ def create_app() -> FastAPI:
         expose_headers=["*"],
     )
 
+    # Per-request memo for lookups such as the user's subscription
+    app.add_middleware(RequestCacheMiddleware)
+
     # Health check endpoint
     @app.get("/health")
     async def health_check():
         return {"status": "healthy", "version": "0.1.0"}
 
+    # In-process metrics (latencies, cache ratios), admin only
+    @app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+    async def get_metrics():
+        return metrics.snapshot()
+
     # Include routers
     app.include_router(auth.router, prefix=settings.api_v1_prefix)
     app.include_router(materials.router, prefix=settings.api_v1_prefix)
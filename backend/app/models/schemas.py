@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field, HttpUrl
@@ -47,28 +47,44 @@ class MaterialCreateFile(MaterialBase):
     pass  # File is handled separately via multipart form
 
 
-class MaterialResponse(BaseModel):
+class MaterialSummary(BaseModel):
+    """Material without its processed text, for list views."""
+
     id: UUID
     user_id: UUID
     title: str
     source_type: SourceType
     source_url: Optional[str] = None
     file_path: Optional[str] = None
-    processed_text: Optional[str] = None
     processing_status: ProcessingStatus
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class MaterialResponse(MaterialSummary):
+    processed_text: Optional[str] = None
+
+
 class MaterialStatus(BaseModel):
     id: UUID
     processing_status: ProcessingStatus
 
 
+class MaterialSync(BaseModel):
+    """Materials changed or deleted since a sync cursor."""
+
+    changed: List[MaterialSummary]
+    deleted: List[UUID]
+    next_cursor: str
+    has_more: bool
+
+
 class MaterialWithFlashcards(MaterialResponse):
     flashcards: List["FlashcardResponse"] = []
+    flashcards_next_cursor: Optional[str] = None
 
 
 # Flashcard Schemas
@@ -93,11 +109,28 @@ class FlashcardResponse(FlashcardBase):
     learning_stage: int
     next_review_at: datetime
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class FlashcardPage(BaseModel):
+    """A page of flashcards, optionally projected to a subset of fields."""
+
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class FlashcardSync(BaseModel):
+    """Flashcards changed or deleted since a sync cursor."""
+
+    changed: List[FlashcardResponse]
+    deleted: List[UUID]
+    next_cursor: str
+    has_more: bool
+
+
 class FlashcardReview(BaseModel):
     quality: ReviewQuality
 
@@ -108,6 +141,14 @@ class FlashcardReviewResponse(BaseModel):
     next_review_at: datetime
 
 
+class ReviewSessionResponse(BaseModel):
+    session_id: str
+    cards: List[FlashcardResponse]
+    prefetch: List[FlashcardResponse] = []
+    remaining: int
+    expires_at: datetime
+
+
 # OpenAI Tool Calling Schema
 class ExtractedFlashcard(BaseModel):
     """Schema for OpenAI tool calling - vocabulary extraction."""
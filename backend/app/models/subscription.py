@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class SubscriptionStatus(str, Enum):
@@ -23,10 +23,23 @@ class SubscriptionResponse(BaseModel):
     cancel_at_period_end: bool = False
     uploads_used: int
     uploads_limit: int
+    uploads_reset_at: Optional[datetime] = None
     quizzes_per_material_limit: int
     can_use_chat: bool
 
 
+class Entitlements(BaseModel):
+    """What the user's tier allows, as carried in entitlement tokens."""
+
+    tier: Literal["free", "pro"]
+    uploads_limit: int
+    quizzes_per_material_limit: int
+    can_use_chat: bool
+
+    # A newly issued token to hand back to the client, if any
+    _token: Optional[str] = PrivateAttr(default=None)
+
+
 class CheckoutSessionResponse(BaseModel):
     """Response model for checkout session creation."""
 
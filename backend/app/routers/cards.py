@@ -1,19 +1,47 @@
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from supabase import Client
 
+from app.core.http import json_response_with_etag
 from app.core.security import CurrentUser, get_current_user, get_supabase_client
 from app.models.schemas import (
+    FlashcardPage,
     FlashcardResponse,
     FlashcardReview,
+    FlashcardSync,
     FlashcardReviewResponse,
     ReviewQuality,
+    ReviewSessionResponse,
 )
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    apply_keyset,
+    paginate_rows,
+    parse_fields,
+)
+from app.services.review_session import (
+    ReviewSession,
+    ReviewSessionStore,
+    get_review_session_store,
+)
+from app.services.sync import SyncCursorExpired, fetch_delta
 
 router = APIRouter(prefix="/cards", tags=["Flashcards"])
 
+# Columns that can be requested via the fields= projection
+FLASHCARD_FIELDS = list(FlashcardResponse.model_fields.keys())
+
+# Keyset columns are always returned so the client can page further
+FLASHCARD_KEYSET_FIELDS = ["id", "created_at"]
+
+# Compact mode drops the long text fields that list views don't render
+FLASHCARD_COMPACT_FIELDS = [
+    f for f in FLASHCARD_FIELDS if f not in ("context_original", "definition")
+]
+
 
 def calculate_next_review(
     current_stage: int, quality: ReviewQuality
@@ -76,14 +104,96 @@ async def get_cards_for_review(
     return [FlashcardResponse(**card) for card in result.data]
 
 
+def build_session_response(
+    session: ReviewSession, store: ReviewSessionStore, page_size: int
+) -> ReviewSessionResponse:
+    """Build the current page of a review session plus the batch after it."""
+    cards, prefetch = store.page(session, page_size)
+    return ReviewSessionResponse(
+        session_id=session.id,
+        cards=[FlashcardResponse(**card) for card in cards],
+        prefetch=[FlashcardResponse(**card) for card in prefetch],
+        remaining=len(session.queue),
+        expires_at=session.expires_at,
+    )
+
+
+@router.post("/review/sessions", response_model=ReviewSessionResponse)
+async def start_review_session(
+    limit: int = Query(200, ge=1, le=1000),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+    store: ReviewSessionStore = Depends(get_review_session_store),
+) -> ReviewSessionResponse:
+    """
+    Start a review session by snapshotting the due queue once.
+
+    Subsequent pages are served from memory; cards reviewed with the
+    session_id are removed from the queue without re-querying.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+
+    result = (
+        supabase.table("flashcards")
+        .select("*")
+        .eq("user_id", str(current_user.id))
+        .lte("next_review_at", now)
+        .order("next_review_at", desc=False)
+        .limit(limit)
+        .execute()
+    )
+
+    session = store.create(str(current_user.id), result.data)
+    return build_session_response(session, store, page_size)
+
+
+@router.get("/review/sessions/{session_id}", response_model=ReviewSessionResponse)
+async def get_review_session(
+    session_id: str,
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user),
+    store: ReviewSessionStore = Depends(get_review_session_store),
+) -> ReviewSessionResponse:
+    """Get the next page of a review session and the batch after it."""
+    session = store.get(session_id, str(current_user.id))
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review session not found or expired",
+        )
+
+    return build_session_response(session, store, page_size)
+
+
+@router.delete("/review/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def end_review_session(
+    session_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    store: ReviewSessionStore = Depends(get_review_session_store),
+):
+    """End a review session and release its snapshot."""
+    if not store.end(session_id, str(current_user.id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Review session not found or expired",
+        )
+
+
 @router.post("/{card_id}/review", response_model=FlashcardReviewResponse)
 async def review_card(
     card_id: str,
     review: FlashcardReview,
+    session_id: Optional[str] = None,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
+    store: ReviewSessionStore = Depends(get_review_session_store),
 ) -> FlashcardReviewResponse:
-    """Submit a review for a flashcard and update SRS data."""
+    """Submit a review for a flashcard and update SRS data.
+
+    When session_id is given, the card is also removed from that review
+    session's queue.
+    """
     # Get the card and verify ownership
     result = (
         supabase.table("flashcards")
@@ -116,6 +226,9 @@ async def review_card(
         .execute()
     )
 
+    if session_id:
+        store.remove_card(session_id, str(current_user.id), card_id)
+
     return FlashcardReviewResponse(
         id=card_id,
         learning_stage=new_stage,
@@ -123,25 +236,99 @@ async def review_card(
     )
 
 
-@router.get("", response_model=List[FlashcardResponse])
+@router.get("", response_model=FlashcardPage)
 async def list_all_cards(
+    request: Request,
     material_id: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    compact: bool = False,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
-) -> List[FlashcardResponse]:
-    """List all flashcards, optionally filtered by material."""
+) -> FlashcardPage:
+    """
+    List flashcards newest first, optionally filtered by material.
+
+    Pages are keyed on (created_at, id); pass the returned next_cursor to
+    fetch the following page. Use fields= (comma-separated) to project
+    specific columns, or compact=true to drop definition/context_original.
+    Supports If-None-Match; unchanged pages are answered with 304.
+    """
+    try:
+        columns = parse_fields(fields, FLASHCARD_FIELDS, FLASHCARD_KEYSET_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if columns is None:
+        columns = FLASHCARD_COMPACT_FIELDS if compact else FLASHCARD_FIELDS
+
     query = (
         supabase.table("flashcards")
-        .select("*")
+        .select(", ".join(columns))
         .eq("user_id", str(current_user.id))
     )
 
     if material_id:
         query = query.eq("material_id", material_id)
 
-    result = query.order("created_at", desc=True).execute()
+    try:
+        query = apply_keyset(query, cursor, desc=True)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    result = query.limit(limit + 1).execute()
+    items, next_cursor = paginate_rows(result.data, limit)
 
-    return [FlashcardResponse(**card) for card in result.data]
+    return json_response_with_etag(
+        request, FlashcardPage(items=items, next_cursor=next_cursor)
+    )
+
+
+@router.get("/sync", response_model=FlashcardSync)
+async def sync_cards(
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+) -> FlashcardSync:
+    """
+    Get flashcards changed or deleted since the given sync cursor.
+
+    Omit the cursor for a full initial sync. Store next_cursor and keep
+    calling while has_more is true. A 410 means the cursor is older than
+    the tombstone retention: discard local data and sync from scratch.
+
+    No ETag is sent: every response carries a new cursor, which the client
+    must store even when nothing changed.
+    """
+    try:
+        delta = fetch_delta(
+            supabase,
+            "flashcards",
+            str(current_user.id),
+            FLASHCARD_FIELDS,
+            cursor,
+            limit,
+        )
+    except SyncCursorExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return FlashcardSync(**delta)
 
 
 @router.get("/stats")
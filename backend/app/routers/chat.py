@@ -1,19 +1,67 @@
+import asyncio
+import json
 import logging
-from datetime import datetime
-from typing import List
-from uuid import UUID
-
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from supabase import Client
 
-from app.core.security import CurrentUser, get_current_user, get_supabase_client
-from app.services.subscription import check_chat_access
-from app.services.chat import get_chat_response
+from app.core.config import Settings, get_settings
+from app.core.http import SSE_HEADERS, format_sse
+from app.core.security import (
+    CurrentUser,
+    decode_token,
+    get_current_user,
+    get_supabase_client,
+)
+from app.models.subscription import Entitlements
+from app.services.chat import (
+    MAX_HISTORY_MESSAGES,
+    get_chat_response,
+    stream_chat_response,
+)
+from app.services.chat_summary import update_conversation_summary
+from app.services.entitlements import (
+    entitlement_headers,
+    get_entitlements,
+    resolve_entitlements,
+    verify_entitlement_token,
+)
+from app.services.pagination import (
+    MAX_PAGE_SIZE,
+    apply_keyset,
+    paginate_rows,
+    parse_timestamp,
+)
+from app.services.retrieval import MaterialIndex, get_material_index
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 logger = logging.getLogger(__name__)
 
+# Seconds a new WebSocket connection has to send its auth frame
+WS_AUTH_TIMEOUT_SECONDS = 10
+
+# WebSocket close codes (4000-4999 are application-defined)
+WS_CLOSE_UNAUTHORIZED = 4401
+WS_CLOSE_FORBIDDEN = 4403
+
 
 class ChatMessage(BaseModel):
     id: UUID
@@ -35,10 +83,17 @@ class ChatResponse(BaseModel):
 @router.get("/{material_id}", response_model=List[ChatMessage])
 async def get_chat_history(
     material_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
 ) -> List[ChatMessage]:
-    """Get chat history for a material."""
+    """Get chat history for a material, oldest first.
+
+    Pass limit to load the most recent messages only; the cursor for the
+    previous (older) page is returned in the X-Next-Cursor header.
+    """
     # Verify material ownership
     material_result = (
         supabase.table("materials")
@@ -56,28 +111,57 @@ async def get_chat_history(
         )
 
     # Get chat messages
-    result = (
+    query = (
         supabase.table("chat_messages")
         .select("*")
         .eq("material_id", material_id)
         .eq("user_id", str(current_user.id))
-        .order("created_at", desc=False)
-        .execute()
     )
 
-    return [ChatMessage(**msg) for msg in result.data]
+    if not limit:
+        result = query.order("created_at", desc=False).order("id", desc=False).execute()
+        return [ChatMessage(**msg) for msg in result.data]
 
+    # Page backwards from the newest message
+    try:
+        query = apply_keyset(query, cursor, desc=True)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
-@router.post("/{material_id}", response_model=ChatResponse)
-async def send_message(
+    result = query.limit(limit + 1).execute()
+    rows, next_cursor = paginate_rows(result.data, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [ChatMessage(**msg) for msg in reversed(rows)]
+
+
+def get_recent_history(
     material_id: str,
-    data: ChatSend,
-    current_user: CurrentUser = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase_client),
-) -> ChatResponse:
-    """Send a message and get AI response."""
-    # Check chat access (Pro only)
-    if not check_chat_access(current_user.id, supabase):
+    user_id: UUID,
+    supabase: Client,
+) -> List[dict]:
+    """Get the trailing window of chat history used for prompts, oldest first."""
+    result = (
+        supabase.table("chat_messages")
+        .select("role, content, created_at")
+        .eq("material_id", material_id)
+        .eq("user_id", str(user_id))
+        .order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(MAX_HISTORY_MESSAGES)
+        .execute()
+    )
+
+    return list(reversed(result.data))
+
+
+def require_chat_access(entitlements: Entitlements) -> None:
+    """Raise 403 unless the user has chat access (Pro only)."""
+    if not entitlements.can_use_chat:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -87,17 +171,29 @@ async def send_message(
             },
         )
 
-    # Get material and verify ownership
+
+def get_chat_material(
+    material_id: str, user_id: UUID, supabase: Client
+) -> tuple[dict, MaterialIndex]:
+    """Get a processed material owned by the user and its retrieval index.
+
+    The index comes from the in-process cache unless the material changed
+    since it was built. The material's running chat summary, if any, is
+    returned as material["chat_summary"].
+    """
     material_result = (
         supabase.table("materials")
-        .select("id, title, processed_text, processing_status")
+        .select(
+            "id, title, processing_status, updated_at, "
+            "chat_summaries(summary, summarized_until)"
+        )
         .eq("id", material_id)
-        .eq("user_id", str(current_user.id))
-        .single()
+        .eq("user_id", str(user_id))
+        .maybe_single()
         .execute()
     )
 
-    if not material_result.data:
+    if not material_result or not material_result.data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Material not found",
@@ -111,45 +207,93 @@ async def send_message(
             detail="Material must be processed before chatting",
         )
 
-    if not material.get("processed_text"):
+    summaries = material.pop("chat_summaries", None) or []
+    material["chat_summary"] = summaries[0] if summaries else None
+
+    index = get_material_index(
+        material_id, str(user_id), material.get("updated_at"), supabase
+    )
+
+    if not index.chunks:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Material has no processed text",
         )
 
-    # Get existing chat history
-    history_result = (
-        supabase.table("chat_messages")
-        .select("role, content")
-        .eq("material_id", material_id)
-        .eq("user_id", str(current_user.id))
-        .order("created_at", desc=False)
-        .execute()
-    )
+    return material, index
 
-    chat_history = history_result.data
 
-    # Save user message
-    user_msg_result = (
-        supabase.table("chat_messages")
-        .insert({
-            "material_id": material_id,
-            "user_id": str(current_user.id),
-            "role": "user",
-            "content": data.message,
-        })
-        .execute()
+async def prepare_chat_turn(
+    material_id: str, user_id: UUID, supabase: Client
+) -> tuple[dict, MaterialIndex, dict, List[dict]]:
+    """Load everything a chat turn needs, with the queries run concurrently.
+
+    Returns:
+        Tuple of (material, retrieval index, running summary, recent
+        messages not yet covered by the summary)
+    """
+    (material, material_index), history = await asyncio.gather(
+        run_in_threadpool(get_chat_material, material_id, user_id, supabase),
+        run_in_threadpool(get_recent_history, material_id, user_id, supabase),
     )
 
-    user_message = ChatMessage(**user_msg_result.data[0])
+    summary = material["chat_summary"] or {}
+    since = summary.get("summarized_until")
+    if since:
+        since_at = parse_timestamp(since)
+        history = [
+            msg for msg in history
+            if parse_timestamp(msg["created_at"]) > since_at
+        ]
+
+    return material, material_index, summary, history
+
+
+def new_message_row(material_id: str, user_id: UUID, role: str, content: str) -> dict:
+    """Build a chat message row, stamped now so a turn's messages keep their order."""
+    return {
+        "id": str(uuid4()),
+        "material_id": material_id,
+        "user_id": str(user_id),
+        "role": role,
+        "content": content,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def save_messages(supabase: Client, rows: List[dict]) -> List[ChatMessage]:
+    """Save chat messages in a single insert."""
+    result = supabase.table("chat_messages").insert(rows).execute()
+    return [ChatMessage(**row) for row in result.data]
+
+
+@router.post("/{material_id}", response_model=ChatResponse)
+async def send_message(
+    material_id: str,
+    data: ChatSend,
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(get_current_user),
+    entitlements: Entitlements = Depends(get_entitlements),
+    supabase: Client = Depends(get_supabase_client),
+) -> ChatResponse:
+    """Send a message and get AI response.
+
+    Both messages are saved together once the response is ready.
+    """
+    require_chat_access(entitlements)
+    material, material_index, summary, chat_history = await prepare_chat_turn(
+        material_id, current_user.id, supabase
+    )
+    user_row = new_message_row(material_id, current_user.id, "user", data.message)
 
     # Generate AI response
     try:
         assistant_content = get_chat_response(
-            material_text=material["processed_text"],
+            material_index=material_index,
             material_title=material["title"],
             chat_history=chat_history,
             user_message=data.message,
+            summary=summary.get("summary"),
         )
     except Exception as e:
         logger.error(f"Failed to generate chat response: {e}")
@@ -158,26 +302,372 @@ async def send_message(
             detail="Failed to generate response",
         )
 
-    # Save assistant message
-    assistant_msg_result = (
-        supabase.table("chat_messages")
-        .insert({
-            "material_id": material_id,
-            "user_id": str(current_user.id),
-            "role": "assistant",
-            "content": assistant_content,
-        })
-        .execute()
+    user_message, assistant_message = save_messages(supabase, [
+        user_row,
+        new_message_row(material_id, current_user.id, "assistant", assistant_content),
+    ])
+
+    # Fold older turns into the running summary after responding
+    background_tasks.add_task(
+        update_conversation_summary,
+        material_id=material_id,
+        user_id=str(current_user.id),
+        material_title=material["title"],
+        supabase=supabase,
     )
 
-    assistant_message = ChatMessage(**assistant_msg_result.data[0])
-
     return ChatResponse(
         user_message=user_message,
         assistant_message=assistant_message,
     )
 
 
+@router.post("/{material_id}/stream")
+async def stream_message(
+    material_id: str,
+    data: ChatSend,
+    current_user: CurrentUser = Depends(get_current_user),
+    entitlements: Entitlements = Depends(get_entitlements),
+    supabase: Client = Depends(get_supabase_client),
+):
+    """Send a message and stream the AI response over Server-Sent Events.
+
+    Events: user_message (the user's message), token ({"delta": ...}) for
+    each content delta, then done (saved assistant message) or error. Both
+    messages are saved together once the stream completes. If the client
+    disconnects or generation fails, the upstream completion is cancelled
+    and only the user's message is saved.
+    """
+    require_chat_access(entitlements)
+    material, material_index, summary, chat_history = await prepare_chat_turn(
+        material_id, current_user.id, supabase
+    )
+    user_row = new_message_row(material_id, current_user.id, "user", data.message)
+
+    async def event_stream():
+        yield format_sse("user_message", ChatMessage(**user_row).model_dump_json())
+
+        parts: List[str] = []
+        try:
+            async for delta in stream_chat_response(
+                material_index=material_index,
+                material_title=material["title"],
+                chat_history=chat_history,
+                user_message=data.message,
+                summary=summary.get("summary"),
+            ):
+                parts.append(delta)
+                yield format_sse("token", json.dumps({"delta": delta}))
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected: keep the question, drop the partial answer.
+            # Called directly: an await here wouldn't run once the stream is cancelled
+            logger.info(f"Client disconnected from chat stream for {material_id}")
+            save_messages(supabase, [user_row])
+            raise
+        except Exception as e:
+            logger.error(f"Failed to stream chat response: {e}")
+            save_messages(supabase, [user_row])
+            yield format_sse("error", json.dumps({"detail": "Failed to generate response"}))
+            return
+
+        _, assistant_message = save_messages(supabase, [
+            user_row,
+            new_message_row(material_id, current_user.id, "assistant", "".join(parts)),
+        ])
+        yield format_sse("done", assistant_message.model_dump_json())
+
+    # Fold older turns into the running summary once the stream is done
+    summary_task = BackgroundTask(
+        update_conversation_summary,
+        material_id=material_id,
+        user_id=str(current_user.id),
+        material_title=material["title"],
+        supabase=supabase,
+    )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **entitlement_headers(entitlements)},
+        background=summary_task,
+    )
+
+
+class ChatSocket:
+    """One authenticated WebSocket connection multiplexing chats on several materials."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user: CurrentUser,
+        supabase: Client,
+        settings: Settings,
+        entitlement_token: str,
+        auth_expires_at: Optional[int] = None,
+    ):
+        self.websocket = websocket
+        self.user = user
+        self.supabase = supabase
+        self.settings = settings
+        self.entitlement_token = entitlement_token
+        self.auth_expires_at = auth_expires_at
+        self.turns: dict[str, asyncio.Task] = {}
+        # Conversation summaries run after their turn, outside self.turns
+        self.summaries: dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event: str, material_id: str, request_id: Optional[str], **data) -> None:
+        """Send one event frame; frames from concurrent turns never interleave."""
+        async with self._send_lock:
+            await self.websocket.send_json({
+                "type": event,
+                "material_id": material_id,
+                "request_id": request_id,
+                **data,
+            })
+
+    async def check_access(self) -> None:
+        """
+        Re-check the connection's JWT and chat access.
+
+        The entitlement token is verified again, so a revoked subscription
+        is noticed; once it is revoked or expired, entitlements are
+        resolved again from the subscription.
+
+        Raises:
+            HTTPException: 401 if the JWT has expired, 403 if the user no
+                longer has chat access
+        """
+        if self.auth_expires_at is not None and time.time() >= self.auth_expires_at:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Authentication token expired",
+            )
+
+        entitlements = await run_in_threadpool(
+            verify_entitlement_token, self.entitlement_token, self.user.id, self.settings
+        )
+        if entitlements is None:
+            entitlements = await run_in_threadpool(
+                resolve_entitlements, self.user.id, None, self.supabase, self.settings
+            )
+            self.entitlement_token = entitlements._token
+        require_chat_access(entitlements)
+
+    async def start_turn(self, material_id: str, message: str, request_id: Optional[str]) -> bool:
+        """
+        Start answering a message; one turn per material runs at a time.
+
+        Raises:
+            HTTPException: If check_access fails
+        """
+        await self.check_access()
+        running = self.turns.get(material_id)
+        if running and not running.done():
+            return False
+        self.turns[material_id] = asyncio.create_task(
+            self.run_turn(material_id, message, request_id)
+        )
+        return True
+
+    async def run_turn(self, material_id: str, message: str, request_id: Optional[str]) -> None:
+        """Stream one chat turn back as user_message, token and done/error frames."""
+        try:
+            material, material_index, summary, chat_history = await prepare_chat_turn(
+                material_id, self.user.id, self.supabase
+            )
+        except HTTPException as e:
+            await self.send("error", material_id, request_id, detail=e.detail)
+            return
+        except Exception as e:
+            # Every request gets an answer, even if the database is unreachable
+            logger.error(f"Failed to prepare chat turn for {material_id}: {e}")
+            await self.send("error", material_id, request_id, detail="Failed to load the chat")
+            return
+
+        user_row = new_message_row(material_id, self.user.id, "user", message)
+        await self.send(
+            "user_message", material_id, request_id,
+            message=json.loads(ChatMessage(**user_row).model_dump_json()),
+        )
+
+        parts: List[str] = []
+        try:
+            async for delta in stream_chat_response(
+                material_index=material_index,
+                material_title=material["title"],
+                chat_history=chat_history,
+                user_message=message,
+                summary=summary.get("summary"),
+            ):
+                parts.append(delta)
+                await self.send("token", material_id, request_id, delta=delta)
+        except asyncio.CancelledError:
+            # Connection closed mid-stream: keep the question, drop the partial answer
+            await run_in_threadpool(save_messages, self.supabase, [user_row])
+            raise
+        except Exception as e:
+            logger.error(f"Failed to stream chat response: {e}")
+            await run_in_threadpool(save_messages, self.supabase, [user_row])
+            await self.send("error", material_id, request_id, detail="Failed to generate response")
+            return
+
+        _, assistant_message = await run_in_threadpool(save_messages, self.supabase, [
+            user_row,
+            new_message_row(material_id, self.user.id, "assistant", "".join(parts)),
+        ])
+        await self.send(
+            "done", material_id, request_id,
+            message=json.loads(assistant_message.model_dump_json()),
+        )
+
+        self.start_summary(material_id, material["title"])
+
+    def start_summary(self, material_id: str, material_title: str) -> None:
+        """
+        Fold older turns into the running summary in the background.
+
+        The turn is over once "done" is sent, so the next message on the
+        material isn't held up by the summary call. A summary already
+        running for the material covers this turn on its next run.
+        """
+        running = self.summaries.get(material_id)
+        if running and not running.done():
+            return
+        self.summaries[material_id] = asyncio.create_task(run_in_threadpool(
+            update_conversation_summary,
+            material_id=material_id,
+            user_id=str(self.user.id),
+            material_title=material_title,
+            supabase=self.supabase,
+        ))
+
+    async def close(self) -> None:
+        """Cancel turns still streaming and let started summaries finish."""
+        for task in self.turns.values():
+            task.cancel()
+        await asyncio.gather(*self.turns.values(), return_exceptions=True)
+        await asyncio.gather(*self.summaries.values(), return_exceptions=True)
+
+
+async def authenticate_websocket(
+    websocket: WebSocket, settings: Settings
+) -> tuple[CurrentUser, Optional[int], Optional[str]]:
+    """Read the auth frame ({"type": "auth", "token": ...}) and verify its JWT.
+
+    Returns:
+        The user, the JWT's expiry and the entitlement token sent with the
+        frame, if any
+    """
+    frame = await asyncio.wait_for(websocket.receive_json(), WS_AUTH_TIMEOUT_SECONDS)
+    if not isinstance(frame, dict) or frame.get("type") != "auth" or not frame.get("token"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Expected an auth frame",
+        )
+    payload = decode_token(frame["token"], settings)
+    return get_current_user(payload), payload.exp, frame.get("entitlement_token")
+
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    settings: Settings = Depends(get_settings),
+    supabase: Client = Depends(get_supabase_client),
+):
+    """Chat over a single WebSocket for any number of materials.
+
+    The first frame must be {"type": "auth", "token": "<JWT>"}, optionally
+    with the client's "entitlement_token"; the ready frame carries a fresh
+    entitlement token if one was issued. Chat access is checked on connect
+    and again before every message: the connection is closed with 4401
+    once the JWT expires and with 4403 once chat access is revoked. Then send
+    {"type": "message", "material_id": ..., "message": ..., "request_id": ...}
+    frames. Each is answered with user_message, token ({"delta": ...}) and
+    done or error frames tagged with its material_id and request_id. Turns
+    on different materials stream concurrently.
+    """
+    await websocket.accept()
+
+    try:
+        user, auth_expires_at, entitlement_token = await authenticate_websocket(
+            websocket, settings
+        )
+    except (HTTPException, asyncio.TimeoutError, ValueError) as e:
+        detail = e.detail if isinstance(e, HTTPException) else "Authentication required"
+        await websocket.send_json({"type": "error", "detail": detail})
+        await websocket.close(code=WS_CLOSE_UNAUTHORIZED)
+        return
+    except WebSocketDisconnect:
+        return
+
+    entitlements = await run_in_threadpool(
+        resolve_entitlements, user.id, entitlement_token, supabase, settings
+    )
+    try:
+        require_chat_access(entitlements)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=WS_CLOSE_FORBIDDEN)
+        return
+
+    connection = ChatSocket(
+        websocket, user, supabase, settings,
+        entitlement_token=entitlements._token or entitlement_token,
+        auth_expires_at=auth_expires_at,
+    )
+    ready = {"type": "ready"}
+    if entitlements._token:
+        ready["entitlement_token"] = entitlements._token
+    await websocket.send_json(ready)
+
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            if not isinstance(frame, dict):
+                frame = {}
+            material_id = frame.get("material_id")
+            request_id = frame.get("request_id")
+            message = frame.get("message")
+
+            if frame.get("type") != "message" or not material_id or not message:
+                await connection.send(
+                    "error", material_id, request_id,
+                    detail="Expected a message frame with material_id and message",
+                )
+                continue
+
+            try:
+                UUID(str(material_id))
+            except ValueError:
+                await connection.send(
+                    "error", material_id, request_id, detail="Material not found"
+                )
+                continue
+
+            try:
+                started = await connection.start_turn(material_id, message, request_id)
+            except HTTPException as e:
+                await connection.send("error", material_id, request_id, detail=e.detail)
+                await websocket.close(
+                    code=WS_CLOSE_UNAUTHORIZED
+                    if e.status_code == status.HTTP_401_UNAUTHORIZED
+                    else WS_CLOSE_FORBIDDEN
+                )
+                break
+
+            if not started:
+                await connection.send(
+                    "error", material_id, request_id,
+                    detail="A response for this material is still streaming",
+                )
+    except (WebSocketDisconnect, ValueError):
+        # ValueError: a frame that is not valid JSON ends the connection
+        pass
+    finally:
+        await connection.close()
+
+
 @router.delete("/{material_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_chat_history(
     material_id: str,
@@ -201,7 +691,10 @@ async def clear_chat_history(
             detail="Material not found",
         )
 
-    # Delete all chat messages for this material
+    # Delete all chat messages and the running summary for this material
     supabase.table("chat_messages").delete().eq(
         "material_id", material_id
     ).eq("user_id", str(current_user.id)).execute()
+    supabase.table("chat_summaries").delete().eq(
+        "material_id", material_id
+    ).eq("user_id", str(current_user.id)).execute()
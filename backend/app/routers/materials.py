@@ -1,8 +1,10 @@
+import asyncio
 import logging
 import tempfile
 import uuid
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
 from fastapi import (
     APIRouter,
@@ -11,29 +13,46 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Query,
+    Request,
     UploadFile,
     status,
 )
 from supabase import Client
 
 from app.core.config import Settings, get_settings
+from app.core.http import json_response_with_etag, text_response_with_range
 from app.core.security import CurrentUser, get_current_user, get_supabase_client
-from app.services.subscription import check_upload_limit, increment_upload_count
+from app.services.subscription import release_upload_slot, reserve_upload_slot
 from app.models.schemas import (
     MaterialCreateYouTube,
     MaterialResponse,
     MaterialStatus,
+    MaterialSummary,
+    MaterialSync,
     MaterialWithFlashcards,
     ProcessingStatus,
     SourceType,
 )
 from app.services.doc_parser import is_supported_file, parse_document
-from app.services.vocabulary import extract_keywords_from_text
+from app.services.quiz_pool import clear_quiz_pool, refill_quiz_pool
+from app.services.quiz_seeds import save_quiz_seeds
+from app.services.retrieval import build_material_index, embeddings_path
+from app.services.pagination import (
+    MAX_PAGE_SIZE,
+    apply_keyset,
+    paginate_rows,
+)
+from app.services.sync import SyncCursorExpired, fetch_delta
+from app.services.vocabulary import extract_study_material
 from app.services.yt_parser import extract_transcript
 
 router = APIRouter(prefix="/materials", tags=["Materials"])
 logger = logging.getLogger(__name__)
 
+# List views never need processed_text, which can be up to 50,000 chars
+MATERIAL_SUMMARY_FIELDS = list(MaterialSummary.model_fields.keys())
+
 
 def process_material_background(
     material_id: str,
@@ -73,8 +92,10 @@ def process_material_background(
         else:
             raise ValueError(f"Invalid source type or missing source: {source_type}")
 
-        # Extract vocabulary
-        flashcards = extract_keywords_from_text(text)
+        # Extract vocabulary (and quiz seeds, in the combined mode)
+        flashcards, quiz_seeds = extract_study_material(
+            text, with_quiz_seeds=get_settings().processing_quiz_seeds
+        )
         logger.info(f"Extracted {len(flashcards)} flashcards for material {material_id}")
 
         # Save flashcards to database
@@ -91,6 +112,19 @@ def process_material_background(
                 }
             ).execute()
 
+        # Quizzes fall back to generation if the seeds can't be stored
+        try:
+            save_quiz_seeds(material_id, user_id, quiz_seeds, supabase)
+        except Exception as e:
+            logger.warning(f"Failed to save quiz seeds for material {material_id}: {e}")
+            quiz_seeds = []
+
+        # Build the chat retrieval index (chat falls back to the text if this fails)
+        try:
+            build_material_index(material_id, user_id, text[:50000], supabase)
+        except Exception as e:
+            logger.warning(f"Failed to index material {material_id}: {e}")
+
         # Update material status and save processed text
         supabase.table("materials").update(
             {
@@ -101,6 +135,17 @@ def process_material_background(
 
         logger.info(f"Successfully completed processing for material {material_id}")
 
+        # Quizzes pooled before a reprocess were generated from the old text
+        try:
+            clear_quiz_pool(material_id, supabase)
+        except Exception as e:
+            logger.warning(f"Failed to clear quiz pool for material {material_id}: {e}")
+
+        # Pre-generate quizzes so the first one is handed out instantly
+        # (with seeds, the pool is filled once quiz creation runs out of them)
+        if not quiz_seeds:
+            asyncio.run(refill_quiz_pool(material_id, user_id, supabase, text=text[:50000]))
+
     except Exception as e:
         logger.error(f"Error processing material {material_id}: {e}")
         supabase.table("materials").update(
@@ -108,17 +153,15 @@ def process_material_background(
         ).eq("id", material_id).execute()
 
 
-@router.post("/upload/youtube", response_model=MaterialResponse)
-async def upload_youtube_material(
-    data: MaterialCreateYouTube,
-    current_user: CurrentUser = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase_client),
-    settings: Settings = Depends(get_settings),
-) -> MaterialResponse:
-    """Create a new material from a YouTube URL."""
-    # Check upload limit
-    can_upload, current, limit = check_upload_limit(current_user.id, supabase, settings)
-    if not can_upload:
+def require_upload_slot(user_id: UUID, supabase: Client, settings: Settings) -> None:
+    """
+    Reserve one of the user's weekly uploads.
+
+    Raises:
+        HTTPException: 403 if the weekly upload limit is reached
+    """
+    reserved, current, limit = reserve_upload_slot(user_id, supabase, settings)
+    if not reserved:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -130,22 +173,34 @@ async def upload_youtube_material(
             },
         )
 
-    result = (
-        supabase.table("materials")
-        .insert(
-            {
-                "user_id": str(current_user.id),
-                "title": data.title,
-                "source_type": SourceType.YOUTUBE,
-                "source_url": str(data.url),
-                "processing_status": ProcessingStatus.PENDING,
-            }
-        )
-        .execute()
-    )
 
-    # Increment upload count after successful creation
-    increment_upload_count(current_user.id, supabase)
+@router.post("/upload/youtube", response_model=MaterialResponse)
+async def upload_youtube_material(
+    data: MaterialCreateYouTube,
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+    settings: Settings = Depends(get_settings),
+) -> MaterialResponse:
+    """Create a new material from a YouTube URL."""
+    require_upload_slot(current_user.id, supabase, settings)
+
+    try:
+        result = (
+            supabase.table("materials")
+            .insert(
+                {
+                    "user_id": str(current_user.id),
+                    "title": data.title,
+                    "source_type": SourceType.YOUTUBE,
+                    "source_url": str(data.url),
+                    "processing_status": ProcessingStatus.PENDING,
+                }
+            )
+            .execute()
+        )
+    except Exception:
+        release_upload_slot(current_user.id, supabase)
+        raise
 
     return MaterialResponse(**result.data[0])
 
@@ -159,20 +214,6 @@ async def upload_file_material(
     settings: Settings = Depends(get_settings),
 ) -> MaterialResponse:
     """Upload a file (PDF, DOCX) and create a new material."""
-    # Check upload limit
-    can_upload, current, limit = check_upload_limit(current_user.id, supabase, settings)
-    if not can_upload:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "message": "Upload limit reached",
-                "code": "UPLOAD_LIMIT_REACHED",
-                "limit": limit,
-                "current": current,
-                "upgrade_url": "/api/v1/payments/create-checkout-session",
-            },
-        )
-
     # Validate file type
     file_ext = Path(file.filename or "").suffix.lower()
     if not is_supported_file(file.filename or ""):
@@ -181,35 +222,38 @@ async def upload_file_material(
             detail=f"Unsupported file type: {file_ext}",
         )
 
-    # Generate unique file path
-    file_id = str(uuid.uuid4())
-    storage_path = f"{current_user.id}/{file_id}{file_ext}"
+    require_upload_slot(current_user.id, supabase, settings)
 
-    # Upload to Supabase Storage
-    content = await file.read()
-    supabase.storage.from_("storage").upload(
-        storage_path,
-        content,
-        file_options={"content-type": file.content_type or "application/octet-stream"},
-    )
-
-    # Create material record
-    result = (
-        supabase.table("materials")
-        .insert(
-            {
-                "user_id": str(current_user.id),
-                "title": title,
-                "source_type": SourceType.FILE,
-                "file_path": storage_path,
-                "processing_status": ProcessingStatus.PENDING,
-            }
+    try:
+        # Generate unique file path
+        file_id = str(uuid.uuid4())
+        storage_path = f"{current_user.id}/{file_id}{file_ext}"
+
+        # Upload to Supabase Storage
+        content = await file.read()
+        supabase.storage.from_("storage").upload(
+            storage_path,
+            content,
+            file_options={"content-type": file.content_type or "application/octet-stream"},
         )
-        .execute()
-    )
 
-    # Increment upload count after successful creation
-    increment_upload_count(current_user.id, supabase)
+        # Create material record
+        result = (
+            supabase.table("materials")
+            .insert(
+                {
+                    "user_id": str(current_user.id),
+                    "title": title,
+                    "source_type": SourceType.FILE,
+                    "file_path": storage_path,
+                    "processing_status": ProcessingStatus.PENDING,
+                }
+            )
+            .execute()
+        )
+    except Exception:
+        release_upload_slot(current_user.id, supabase)
+        raise
 
     return MaterialResponse(**result.data[0])
 
@@ -294,60 +338,175 @@ async def get_material_status(
     return MaterialStatus(**result.data)
 
 
-@router.get("", response_model=List[MaterialResponse])
+@router.get("", response_model=List[MaterialSummary])
 async def list_materials(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
-) -> List[MaterialResponse]:
-    """List all materials for the current user."""
-    result = (
+) -> List[MaterialSummary]:
+    """List materials for the current user, newest first, without their text.
+
+    Pass limit to page the list; the cursor for the next page is returned in
+    the X-Next-Cursor header. Supports If-None-Match; an unchanged list is
+    answered with 304.
+    """
+    query = (
         supabase.table("materials")
-        .select("*")
+        .select(", ".join(MATERIAL_SUMMARY_FIELDS))
         .eq("user_id", str(current_user.id))
-        .order("created_at", desc=True)
-        .execute()
     )
 
-    return [MaterialResponse(**m) for m in result.data]
+    try:
+        query = apply_keyset(query, cursor, desc=True)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    next_cursor = None
+    if limit:
+        result = query.limit(limit + 1).execute()
+        rows, next_cursor = paginate_rows(result.data, limit)
+    else:
+        rows = query.execute().data
+
+    response = json_response_with_etag(
+        request, [MaterialSummary(**m) for m in rows]
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+@router.get("/sync", response_model=MaterialSync)
+async def sync_materials(
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+) -> MaterialSync:
+    """
+    Get materials changed or deleted since the given sync cursor.
+
+    Omit the cursor for a full initial sync. Store next_cursor and keep
+    calling while has_more is true. A 410 means the cursor is older than
+    the tombstone retention: discard local data and sync from scratch.
+
+    No ETag is sent: every response carries a new cursor, which the client
+    must store even when nothing changed.
+    """
+    try:
+        delta = fetch_delta(
+            supabase,
+            "materials",
+            str(current_user.id),
+            MATERIAL_SUMMARY_FIELDS,
+            cursor,
+            limit,
+        )
+    except SyncCursorExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e),
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    return MaterialSync(**delta)
 
 
 @router.get("/{material_id}", response_model=MaterialWithFlashcards)
 async def get_material(
     material_id: str,
+    include_text: bool = True,
+    flashcards_limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    flashcards_cursor: Optional[str] = None,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
 ) -> MaterialWithFlashcards:
-    """Get a material with its flashcards."""
-    # Get material
-    material_result = (
+    """Get a material with its flashcards in a single embedded query.
+
+    Flashcards are ordered oldest first; pass flashcards_limit to page them
+    (the next page starts at flashcards_next_cursor). Set include_text=false
+    to omit processed_text.
+    """
+    columns = MATERIAL_SUMMARY_FIELDS + (["processed_text"] if include_text else [])
+
+    query = (
         supabase.table("materials")
-        .select("*")
+        .select(f"{', '.join(columns)}, flashcards(*)")
         .eq("id", material_id)
         .eq("user_id", str(current_user.id))
-        .single()
-        .execute()
     )
 
-    if not material_result.data:
+    try:
+        query = apply_keyset(
+            query, flashcards_cursor, desc=False, reference_table="flashcards"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    if flashcards_limit:
+        query = query.limit(flashcards_limit + 1, foreign_table="flashcards")
+
+    result = query.single().execute()
+
+    if not result.data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Material not found",
         )
 
-    # Get flashcards
-    flashcards_result = (
-        supabase.table("flashcards")
-        .select("*")
-        .eq("material_id", material_id)
-        .order("created_at", desc=False)
-        .execute()
-    )
+    material = result.data
+    flashcards = material.pop("flashcards", None) or []
+    next_cursor = None
+    if flashcards_limit:
+        flashcards, next_cursor = paginate_rows(flashcards, flashcards_limit)
 
     return MaterialWithFlashcards(
-        **material_result.data, flashcards=flashcards_result.data
+        **material, flashcards=flashcards, flashcards_next_cursor=next_cursor
     )
 
 
+@router.get("/{material_id}/text")
+async def get_material_text(
+    material_id: str,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+):
+    """Get the processed text of a material as text/plain.
+
+    Supports HTTP Range requests (bytes of the UTF-8 text) so clients can
+    load long materials incrementally.
+    """
+    result = (
+        supabase.table("materials")
+        .select("processed_text")
+        .eq("id", material_id)
+        .eq("user_id", str(current_user.id))
+        .single()
+        .execute()
+    )
+
+    if not result.data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Material not found",
+        )
+
+    return text_response_with_range(request, result.data.get("processed_text") or "")
+
+
 @router.delete("/{material_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_material(
     material_id: str,
@@ -371,12 +530,14 @@ async def delete_material(
             detail="Material not found",
         )
 
-    # Delete file from storage if exists
+    # Delete file and retrieval embeddings from storage if they exist
+    storage_paths = [embeddings_path(str(current_user.id), material_id)]
     if result.data.get("file_path"):
-        try:
-            supabase.storage.from_("storage").remove([result.data["file_path"]])
-        except Exception as e:
-            logger.warning(f"Failed to delete file from storage: {e}")
+        storage_paths.append(result.data["file_path"])
+    try:
+        supabase.storage.from_("storage").remove(storage_paths)
+    except Exception as e:
+        logger.warning(f"Failed to delete file from storage: {e}")
 
     # Delete material (cascades to flashcards)
     supabase.table("materials").delete().eq("id", material_id).execute()
@@ -6,11 +6,20 @@ from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from supabase import Client
 
 from app.core.config import Settings, get_settings
+from app.core.http import json_response_with_etag
 from app.core.security import CurrentUser, get_current_user, get_supabase_client
 from app.models.subscription import CheckoutSessionResponse, SubscriptionResponse
+from app.services.entitlements import (
+    ENTITLEMENT_HEADER,
+    build_entitlements,
+    issue_entitlement_token,
+    revoke_entitlements,
+)
 from app.services.subscription import (
     get_or_create_subscription,
     get_subscription_response,
+    invalidate_subscription,
+    remember_subscription,
     update_subscription_from_stripe,
 )
 
@@ -50,6 +59,7 @@ async def create_checkout_session(
         supabase.table("subscriptions").update({
             "stripe_customer_id": customer_id,
         }).eq("id", subscription["id"]).execute()
+        invalidate_subscription(current_user.id)
 
     # Create checkout session
     checkout_session = stripe.checkout.Session.create(
@@ -161,7 +171,7 @@ async def handle_checkout_completed(session: dict, supabase: Client):
 
         status = "trialing" if stripe_sub.status == "trialing" else "active"
 
-        update_subscription_from_stripe(
+        updated = update_subscription_from_stripe(
             user_id=user_id,
             stripe_customer_id=customer_id,
             stripe_subscription_id=subscription_id,
@@ -171,6 +181,7 @@ async def handle_checkout_completed(session: dict, supabase: Client):
             current_period_end=period_end,
             supabase=supabase,
         )
+        revoke_entitlements(user_id, updated["updated_at"])
 
         logger.info(f"Subscription created for user {user_id}: {status}")
 
@@ -215,6 +226,7 @@ async def handle_subscription_updated(subscription: dict, supabase: Client):
     period_end = datetime.fromtimestamp(subscription["current_period_end"], tz=timezone.utc)
 
     # Update subscription with cancel_at_period_end
+    updated_at = datetime.now(timezone.utc).isoformat()
     supabase.table("subscriptions").update({
         "stripe_subscription_id": subscription_id,
         "status": status,
@@ -222,8 +234,10 @@ async def handle_subscription_updated(subscription: dict, supabase: Client):
         "current_period_start": period_start.isoformat(),
         "current_period_end": period_end.isoformat(),
         "cancel_at_period_end": cancel_at_period_end,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": updated_at,
     }).eq("user_id", user_id).execute()
+    invalidate_subscription(user_id)
+    revoke_entitlements(user_id, updated_at)
 
     logger.info(f"Subscription updated for user {user_id}: {status}, cancel_at_period_end={cancel_at_period_end}")
 
@@ -248,14 +262,17 @@ async def handle_subscription_deleted(subscription: dict, supabase: Client):
     user_id = result.data["user_id"]
 
     # Downgrade to free
+    updated_at = datetime.now(timezone.utc).isoformat()
     supabase.table("subscriptions").update({
         "status": "free",
         "stripe_subscription_id": None,
         "trial_end": None,
         "current_period_start": None,
         "current_period_end": None,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": updated_at,
     }).eq("user_id", user_id).execute()
+    invalidate_subscription(user_id)
+    revoke_entitlements(user_id, updated_at)
 
     logger.info(f"Subscription deleted for user {user_id}, downgraded to free")
 
@@ -281,10 +298,13 @@ async def handle_payment_succeeded(invoice: dict, supabase: Client):
         return
 
     # Update status to active
+    updated_at = datetime.now(timezone.utc).isoformat()
     supabase.table("subscriptions").update({
         "status": "active",
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": updated_at,
     }).eq("user_id", result.data["user_id"]).execute()
+    invalidate_subscription(result.data["user_id"])
+    revoke_entitlements(result.data["user_id"], updated_at)
 
     logger.info(f"Payment succeeded for user {result.data['user_id']}")
 
@@ -310,23 +330,42 @@ async def handle_payment_failed(invoice: dict, supabase: Client):
         return
 
     # Set to past_due (Stripe will retry)
+    updated_at = datetime.now(timezone.utc).isoformat()
     supabase.table("subscriptions").update({
         "status": "past_due",
-        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "updated_at": updated_at,
     }).eq("user_id", result.data["user_id"]).execute()
+    invalidate_subscription(result.data["user_id"])
+    revoke_entitlements(result.data["user_id"], updated_at)
 
     logger.info(f"Payment failed for user {result.data['user_id']}, set to past_due")
 
 
 @router.get("/subscription", response_model=SubscriptionResponse)
 async def get_subscription_status(
+    request: Request,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
     settings: Settings = Depends(get_settings),
-) -> SubscriptionResponse:
-    """Get current user's subscription status."""
+):
+    """Get current user's subscription status.
+
+    Read-only: weekly usage is computed from the cached subscription, so
+    this usually makes no database query. Returns an ETag and answers
+    304 when the status hasn't changed, plus a fresh entitlement token
+    in the X-Entitlement-Token header.
+    """
     data = get_subscription_response(current_user.id, supabase, settings)
-    return SubscriptionResponse(**data)
+    response = json_response_with_etag(request, SubscriptionResponse(**data))
+
+    subscription = get_or_create_subscription(current_user.id, supabase)
+    response.headers[ENTITLEMENT_HEADER] = issue_entitlement_token(
+        current_user.id,
+        build_entitlements(subscription, settings),
+        subscription.get("updated_at"),
+        settings,
+    )
+    return response
 
 
 @router.post("/cancel", response_model=SubscriptionResponse)
@@ -362,10 +401,11 @@ async def cancel_user_subscription(
             )
 
     # Update local status to reflect pending cancellation
-    supabase.table("subscriptions").update({
+    result = supabase.table("subscriptions").update({
         "cancel_at_period_end": True,
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }).eq("id", subscription["id"]).execute()
+    remember_subscription(current_user.id, result.data[0])
 
     # Return updated status
     data = get_subscription_response(current_user.id, supabase, settings)
@@ -411,10 +451,11 @@ async def reactivate_subscription(
             )
 
     # Update local status
-    supabase.table("subscriptions").update({
+    result = supabase.table("subscriptions").update({
         "cancel_at_period_end": False,
         "updated_at": datetime.now(timezone.utc).isoformat(),
     }).eq("id", subscription["id"]).execute()
+    remember_subscription(current_user.id, result.data[0])
 
     # Return updated status
     data = get_subscription_response(current_user.id, supabase, settings)
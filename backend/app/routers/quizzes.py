@@ -1,16 +1,43 @@
+import json
 import logging
+from contextlib import aclosing
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 from supabase import Client
 
 from app.core.config import Settings, get_settings
+from app.core.http import (
+    HTTP_499_CLIENT_CLOSED_REQUEST,
+    SSE_HEADERS,
+    ClientDisconnected,
+    cancel_on_disconnect,
+    format_sse,
+    json_response_with_etag,
+)
 from app.core.security import CurrentUser, get_current_user, get_supabase_client
-from app.services.subscription import check_quiz_limit, increment_quiz_count
-from app.services.quiz import generate_quiz
+from app.models.subscription import Entitlements
+from app.services.entitlements import entitlement_headers, get_entitlements
+from app.services.subscription import release_quiz_slot, reserve_quiz_slot
+from app.services.flashcard_quiz import generate_flashcard_quiz
+from app.services.pagination import MAX_PAGE_SIZE, apply_keyset, paginate_rows
+from app.services.quiz import generate_quiz, stream_quiz
+from app.services.quiz_pool import claim_pooled_quiz, refill_quiz_pool
+from app.services.quiz_seeds import assemble_quiz_from_seeds
 
 router = APIRouter(prefix="/quizzes", tags=["Quizzes"])
 logger = logging.getLogger(__name__)
@@ -39,9 +66,23 @@ class QuizResponse(BaseModel):
     created_at: datetime
 
 
+class QuizSummary(BaseModel):
+    id: UUID
+    material_id: UUID
+    score: Optional[int] = None
+    total_questions: int
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+
+
+QUIZ_SUMMARY_FIELDS = list(QuizSummary.model_fields.keys())
+
+
 class QuizCreate(BaseModel):
     material_id: UUID
     num_questions: int = 5
+    # "flashcards" builds the quiz from the material's cards without the model
+    source: Literal["llm", "flashcards"] = "llm"
 
 
 class QuizSubmit(BaseModel):
@@ -55,19 +96,32 @@ class QuizResult(BaseModel):
     results: List[dict]  # Per-question results
 
 
-@router.post("", response_model=QuizResponse)
-async def create_quiz(
-    data: QuizCreate,
-    current_user: CurrentUser = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase_client),
-    settings: Settings = Depends(get_settings),
-) -> QuizResponse:
-    """Generate a new quiz for a material."""
-    # Check quiz limit
-    can_create, current, limit = check_quiz_limit(
-        current_user.id, str(data.material_id), supabase, settings
+def require_quiz_slot(
+    user_id: UUID,
+    material_id: str,
+    entitlements: Entitlements,
+    supabase: Client,
+    settings: Settings,
+) -> None:
+    """
+    Count a quiz against the material's limit.
+
+    Raises:
+        HTTPException: 404 if the material doesn't exist, 403 if the
+            material's quiz limit is reached
+    """
+    reservation = reserve_quiz_slot(
+        user_id, material_id, supabase, settings,
+        limit=entitlements.quizzes_per_material_limit,
     )
-    if not can_create:
+    if reservation is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Material not found",
+        )
+
+    reserved, current, limit = reservation
+    if not reserved:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -79,12 +133,14 @@ async def create_quiz(
             },
         )
 
-    # Get material and verify ownership
+
+def get_quiz_material_text(material_id: str, user_id: UUID, supabase: Client) -> str:
+    """Get the processed text of a material owned by the user."""
     material_result = (
         supabase.table("materials")
         .select("id, processed_text, processing_status")
-        .eq("id", str(data.material_id))
-        .eq("user_id", str(current_user.id))
+        .eq("id", material_id)
+        .eq("user_id", str(user_id))
         .single()
         .execute()
     )
@@ -109,60 +165,312 @@ async def create_quiz(
             detail="Material has no processed text",
         )
 
-    # Generate quiz questions
+    return material["processed_text"]
+
+
+@router.post("", response_model=QuizResponse)
+async def create_quiz(
+    data: QuizCreate,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(get_current_user),
+    entitlements: Entitlements = Depends(get_entitlements),
+    supabase: Client = Depends(get_supabase_client),
+    settings: Settings = Depends(get_settings),
+) -> QuizResponse:
+    """Generate a new quiz for a material.
+
+    With source "flashcards" the quiz is built locally from the material's
+    flashcards. Otherwise it is assembled from the quiz seeds written during
+    processing that the user hasn't been served yet (when that mode is
+    enabled), or a pre-generated quiz from the material's pool is handed out
+    when one is available, and the pool is refilled in the background;
+    failing that the quiz is generated on demand, and cancelled
+    if the client disconnects while waiting (it is then neither saved nor
+    counted).
+
+    The quiz is counted against the material's limit up front, and
+    uncounted again if it can't be created.
+    """
+    material_id = str(data.material_id)
+    await run_in_threadpool(
+        require_quiz_slot, current_user.id, material_id, entitlements, supabase, settings
+    )
+
+    try:
+        if data.source == "flashcards":
+            try:
+                questions = await run_in_threadpool(
+                    generate_flashcard_quiz,
+                    material_id, str(current_user.id), data.num_questions, supabase,
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e),
+                )
+            return await run_in_threadpool(
+                save_quiz, material_id, current_user.id, questions, supabase
+            )
+
+        # Assemble from the seeds written during processing if there are enough
+        if settings.processing_quiz_seeds:
+            questions = await run_in_threadpool(
+                assemble_quiz_from_seeds,
+                material_id, current_user.id, data.num_questions, supabase,
+            )
+            if questions:
+                return await run_in_threadpool(
+                    save_quiz, material_id, current_user.id, questions, supabase
+                )
+
+        # Hand out a pre-generated quiz if there is one
+        pooled_quiz = await run_in_threadpool(
+            claim_pooled_quiz, material_id, current_user.id, data.num_questions, supabase
+        )
+        if pooled_quiz:
+            background_tasks.add_task(
+                refill_quiz_pool,
+                material_id=material_id,
+                user_id=str(current_user.id),
+                supabase=supabase,
+            )
+            return QuizResponse(**pooled_quiz)
+
+        text = await run_in_threadpool(
+            get_quiz_material_text, material_id, current_user.id, supabase
+        )
+
+        # Generate quiz questions
+        try:
+            questions = await cancel_on_disconnect(
+                request, generate_quiz(text, data.num_questions)
+            )
+        except ClientDisconnected:
+            logger.info(f"Client disconnected during quiz generation for {material_id}")
+            raise HTTPException(
+                status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+                detail="Client closed request",
+            )
+        except TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Quiz generation timed out",
+            )
+        except Exception as e:
+            logger.error(f"Failed to generate quiz: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to generate quiz questions",
+            )
+
+        quiz = await run_in_threadpool(
+            save_quiz, material_id, current_user.id, questions, supabase
+        )
+
+        # Pool was empty: have quizzes ready for next time, once this one is saved
+        background_tasks.add_task(
+            refill_quiz_pool,
+            material_id=material_id,
+            user_id=str(current_user.id),
+            supabase=supabase,
+            text=text,
+        )
+        return quiz
+    except Exception:
+        # Nothing was created, so it doesn't count against the limit
+        await run_in_threadpool(release_quiz_slot, material_id, supabase)
+        raise
+
+
+@router.post("/stream")
+async def stream_quiz_creation(
+    data: QuizCreate,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    entitlements: Entitlements = Depends(get_entitlements),
+    supabase: Client = Depends(get_supabase_client),
+    settings: Settings = Depends(get_settings),
+):
+    """Generate a new quiz, streaming questions over Server-Sent Events.
+
+    Events: question ({"index": ..., "question": QuizQuestion}) as soon as
+    each question is complete, then done (the saved quiz) or error. A quiz
+    built from flashcards or seeds, or taken from the pool, is sent at once. The quiz is
+    counted up front and saved when generation finishes; if the client
+    disconnects first or generation fails, nothing is saved and the quiz
+    is uncounted again.
+    """
+    material_id = str(data.material_id)
+    await run_in_threadpool(
+        require_quiz_slot, current_user.id, material_id, entitlements, supabase, settings
+    )
+
+    def question_event(index: int, question: dict) -> str:
+        return format_sse("question", json.dumps({"index": index, "question": question}))
+
+    ready_quiz: Optional[QuizResponse] = None
+    from_pool = False
     try:
-        questions = generate_quiz(material["processed_text"], data.num_questions)
-    except Exception as e:
-        logger.error(f"Failed to generate quiz: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to generate quiz questions",
+        if data.source == "flashcards":
+            try:
+                questions = await run_in_threadpool(
+                    generate_flashcard_quiz,
+                    material_id, str(current_user.id), data.num_questions, supabase,
+                )
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e),
+                )
+            ready_quiz = await run_in_threadpool(
+                save_quiz, material_id, current_user.id, questions, supabase
+            )
+        else:
+            if settings.processing_quiz_seeds:
+                questions = await run_in_threadpool(
+                    assemble_quiz_from_seeds,
+                    material_id, current_user.id, data.num_questions, supabase,
+                )
+                if questions:
+                    ready_quiz = await run_in_threadpool(
+                        save_quiz, material_id, current_user.id, questions, supabase
+                    )
+
+            if not ready_quiz:
+                pooled_quiz = await run_in_threadpool(
+                    claim_pooled_quiz,
+                    material_id, current_user.id, data.num_questions, supabase,
+                )
+                if pooled_quiz:
+                    ready_quiz = QuizResponse(**pooled_quiz)
+                    from_pool = True
+
+        text = None if ready_quiz else await run_in_threadpool(
+            get_quiz_material_text, material_id, current_user.id, supabase
         )
+    except Exception:
+        await run_in_threadpool(release_quiz_slot, material_id, supabase)
+        raise
+
+    refill_task = BackgroundTask(
+        refill_quiz_pool,
+        material_id=material_id,
+        user_id=str(current_user.id),
+        supabase=supabase,
+    )
 
-    # Save quiz to database
+    if ready_quiz:
+        async def ready_stream():
+            for i, question in enumerate(ready_quiz.questions):
+                yield question_event(i, question.model_dump())
+            yield format_sse("done", ready_quiz.model_dump_json())
+
+        return StreamingResponse(
+            ready_stream(),
+            media_type="text/event-stream",
+            headers={**SSE_HEADERS, **entitlement_headers(entitlements)},
+            background=refill_task if from_pool else None,
+        )
+
+    async def event_stream():
+        questions: List[dict] = []
+        saved = False
+        try:
+            # aclosing cancels the upstream requests as soon as we stop reading
+            async with aclosing(stream_quiz(text, data.num_questions)) as generated:
+                async for question in generated:
+                    if await request.is_disconnected():
+                        logger.info(f"Client disconnected from quiz stream for {material_id}")
+                        return
+                    yield question_event(len(questions), question)
+                    questions.append(question)
+
+            quiz = await run_in_threadpool(
+                save_quiz, material_id, current_user.id, questions, supabase
+            )
+            saved = True
+            yield format_sse("done", quiz.model_dump_json())
+        except Exception as e:
+            logger.error(f"Failed to stream quiz: {e}")
+            detail = (
+                "Quiz generation timed out"
+                if isinstance(e, TimeoutError)
+                else "Failed to generate quiz questions"
+            )
+            yield format_sse("error", json.dumps({"detail": detail}))
+        finally:
+            # Called directly: an await here wouldn't run once the stream is cancelled
+            if not saved:
+                release_quiz_slot(material_id, supabase)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **entitlement_headers(entitlements)},
+        background=refill_task,
+    )
+
+
+def save_quiz(
+    material_id: str, user_id: UUID, questions: List[dict], supabase: Client
+) -> QuizResponse:
+    """Save a generated quiz, already counted with require_quiz_slot."""
     result = (
         supabase.table("quizzes")
         .insert({
-            "material_id": str(data.material_id),
-            "user_id": str(current_user.id),
+            "material_id": material_id,
+            "user_id": str(user_id),
             "questions": questions,
             "total_questions": len(questions),
         })
         .execute()
     )
 
-    # Increment quiz count for material
-    increment_quiz_count(str(data.material_id), supabase)
-
-    quiz_data = result.data[0]
-    return QuizResponse(
-        id=quiz_data["id"],
-        material_id=quiz_data["material_id"],
-        questions=quiz_data["questions"],
-        score=quiz_data.get("score"),
-        total_questions=quiz_data["total_questions"],
-        completed_at=quiz_data.get("completed_at"),
-        created_at=quiz_data["created_at"],
-    )
+    return QuizResponse(**result.data[0])
 
 
-@router.get("/material/{material_id}", response_model=List[QuizResponse])
+@router.get("/material/{material_id}", response_model=List[QuizSummary])
 async def list_quizzes(
     material_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     current_user: CurrentUser = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_client),
-) -> List[QuizResponse]:
-    """List all quizzes for a material."""
-    result = (
+) -> List[QuizSummary]:
+    """List quizzes for a material, newest first, without their questions.
+
+    Load a quiz's questions with GET /quizzes/{quiz_id}. Pass limit to page
+    the list; the cursor for the next page is returned in the X-Next-Cursor
+    header. Supports If-None-Match; an unchanged list is answered with 304.
+    """
+    query = (
         supabase.table("quizzes")
-        .select("*")
+        .select(", ".join(QUIZ_SUMMARY_FIELDS))
         .eq("material_id", material_id)
         .eq("user_id", str(current_user.id))
-        .order("created_at", desc=True)
-        .execute()
     )
 
-    return [QuizResponse(**q) for q in result.data]
+    try:
+        query = apply_keyset(query, cursor, desc=True)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    next_cursor = None
+    if limit:
+        result = query.limit(limit + 1).execute()
+        rows, next_cursor = paginate_rows(result.data, limit)
+    else:
+        rows = query.execute().data
+
+    response = json_response_with_etag(request, [QuizSummary(**q) for q in rows])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @router.get("/{quiz_id}", response_model=QuizResponse)
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Most answers kept per material
+MAX_ANSWERS_PER_MATERIAL = 50
+
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and drop punctuation and extra whitespace."""
+    return " ".join(PUNCTUATION_PATTERN.sub(" ", question.lower()).split())
+
+
+def material_answer_key(content_hash: str, material_title: str) -> str:
+    """
+    Key a material's cached answers by its content and title.
+
+    The prompt quotes the user-chosen title, so materials with the same
+    text but different titles don't share answers.
+    """
+    return hashlib.sha256(f"{content_hash}\0{material_title}".encode("utf-8")).hexdigest()
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    """Cosine similarity of two term-frequency vectors."""
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm
+
+
+class AnswerCache:
+    """
+    In-process cache of first-turn chat answers per material content.
+
+    Answers are keyed by material_answer_key, so identical materials with
+    the same title uploaded by different users share them. Lookups match the normalized
+    question exactly first; with a similarity threshold set, the closest
+    cached question by term-vector cosine similarity is used as a fallback.
+    """
+
+    def __init__(self, max_materials: int, ttl_seconds: int, similarity_threshold: float = 0.0):
+        self.similarity_threshold = similarity_threshold
+        self._materials: TTLCache[Dict[str, Tuple[Counter, str]]] = TTLCache(
+            max_materials, ttl_seconds
+        )
+        self._lock = threading.Lock()
+
+    def get(self, material_key: str, question: str) -> Optional[str]:
+        """Get a cached answer for a question about a material."""
+        normalized = normalize_question(question)
+        answers = self._materials.get(material_key)
+
+        with self._lock:
+            if answers and normalized in answers:
+                metrics.increment("chat.answer_cache.hits")
+                return answers[normalized][1]
+
+            if answers and self.similarity_threshold > 0:
+                vector = Counter(tokenize(normalized))
+                best_score, best_answer = 0.0, None
+                for cached_vector, answer in answers.values():
+                    score = cosine_similarity(vector, cached_vector)
+                    if score > best_score:
+                        best_score, best_answer = score, answer
+                if best_answer is not None and best_score >= self.similarity_threshold:
+                    metrics.increment("chat.answer_cache.similar_hits")
+                    return best_answer
+
+        metrics.increment("chat.answer_cache.misses")
+        return None
+
+    def set(self, material_key: str, question: str, answer: str) -> None:
+        """Cache the answer to a question about a material."""
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+
+        with self._lock:
+            answers = self._materials.get(material_key)
+            if answers is None:
+                answers = {}
+            answers.pop(normalized, None)
+            answers[normalized] = (Counter(tokenize(normalized)), answer)
+            while len(answers) > MAX_ANSWERS_PER_MATERIAL:
+                del answers[next(iter(answers))]
+            self._materials.set(material_key, answers)
+
+
+@lru_cache
+def get_answer_cache() -> AnswerCache:
+    """Get the process-wide answer cache."""
+    settings = get_settings()
+    return AnswerCache(
+        max_materials=settings.chat_answer_cache_size,
+        ttl_seconds=settings.chat_answer_cache_ttl_seconds,
+        similarity_threshold=settings.chat_answer_cache_similarity,
+    )
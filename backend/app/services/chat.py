@@ -1,80 +1,338 @@
 import logging
-from typing import List
+import time
+from typing import AsyncIterator, List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.answer_cache import get_answer_cache, material_answer_key
+from app.services.retrieval import MaterialIndex, embed_query, embed_query_async
 
 logger = logging.getLogger(__name__)
 
+CHAT_MODEL = "gpt-4o-mini"
+CHAT_MAX_TOKENS = 1000
+MAX_HISTORY_MESSAGES = 10
+CHARS_PER_TOKEN_ESTIMATE = 4  # Rough estimate for English text
+
+# Share of the prompt budget the user's own message may take
+MAX_USER_MESSAGE_SHARE = 0.25
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text."""
+    return len(text) // CHARS_PER_TOKEN_ESTIMATE + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to roughly max_tokens."""
+    max_chars = max_tokens * CHARS_PER_TOKEN_ESTIMATE
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 3, 0)] + "..."
+
+
+def build_retrieval_query(chat_history: List[dict], user_message: str) -> str:
+    """Build the retrieval query from the question and the previous user turn.
+
+    Including the previous question helps follow-ups like "explain more".
+    """
+    previous = [m["content"] for m in chat_history if m["role"] == "user"][-1:]
+    return " ".join(previous + [user_message])
+
+
+# Instructions come first so the static prefix of every prompt is identical
+SYSTEM_INSTRUCTIONS = """You are a helpful tutor discussing the following learning material.
+Help the user understand the content, answer questions, explain concepts, and provide insights.
+
+Guidelines:
+- Answer questions based on the material content
+- Explain concepts clearly and simply
+- Provide examples when helpful
+- If asked about something not in the material, say so but offer related insights
+- Be encouraging and supportive
+- Use markdown formatting for better readability"""
+
+
+def build_static_prompt(material_title: str, overview: str = "") -> str:
+    """
+    Build the per-material system prompt.
+
+    It depends only on the material, so it is byte-identical across turns
+    and users and forms the cacheable prefix of every request.
+    """
+    static_prompt = f"""{SYSTEM_INSTRUCTIONS}
+
+Material Title: {material_title}"""
+
+    if overview:
+        static_prompt += f"""
+
+Beginning of the material:
+{overview}"""
+
+    return static_prompt
+
+
+def build_context_prompt(passages: List[str], summary: Optional[str] = None) -> str:
+    """Build the per-turn context: retrieved passages and the conversation summary."""
+    context_prompt = "Relevant excerpts from the material:\n" + "\n\n---\n\n".join(passages)
+
+    if summary:
+        context_prompt += f"""
+
+Summary of the earlier conversation:
+{summary}"""
+
+    return context_prompt
+
+
+def build_chat_messages(
+    passages: List[str],
+    material_title: str,
+    chat_history: List[dict],
+    user_message: str,
+    summary: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    overview: str = "",
+) -> List[dict]:
+    """
+    Build the OpenAI messages list for a chat turn.
+
+    The static prompt (instructions, title, overview) comes first and never
+    changes between turns, so the provider can serve it from its prompt
+    cache; per-turn context follows in a second system message.
+
+    With a token budget, the static prompt, the user's message and the
+    summary are always kept (the message capped to a share of the budget),
+    then the retrieved passages in relevance order, then as many recent
+    history messages as still fit, newest first.
+    """
+    history = chat_history[-MAX_HISTORY_MESSAGES:]
+    static_prompt = build_static_prompt(material_title, overview)
+
+    # Passages already in the overview would only repeat it
+    passages = [p for p in passages if p not in overview]
+
+    if token_budget is not None:
+        user_message = truncate_to_tokens(
+            user_message, int(token_budget * MAX_USER_MESSAGE_SHARE)
+        )
+        remaining = (
+            token_budget
+            - estimate_tokens(static_prompt)
+            - estimate_tokens(build_context_prompt([], summary))
+            - estimate_tokens(user_message)
+        )
+
+        # Passages in relevance order until the budget runs out
+        kept_passages = []
+        for passage in passages:
+            cost = estimate_tokens(passage)
+            if cost > remaining:
+                break
+            kept_passages.append(passage)
+            remaining -= cost
+
+        # Recent history, newest first, until the budget runs out
+        kept_history: List[dict] = []
+        for msg in reversed(history):
+            cost = estimate_tokens(msg["content"])
+            if cost > remaining:
+                break
+            kept_history.insert(0, msg)
+            remaining -= cost
+
+        passages, history = kept_passages, kept_history
+
+    messages = [
+        {"role": "system", "content": static_prompt},
+        {"role": "system", "content": build_context_prompt(passages, summary)},
+    ]
+    for msg in history:
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    messages.append({"role": "user", "content": user_message})
+
+    return messages
+
+
+def record_usage(usage) -> None:
+    """Record prompt size and how much of it the provider served from cache."""
+    prompt_tokens = usage.prompt_tokens or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+    metrics.observe("chat.prompt_tokens", prompt_tokens)
+    metrics.increment("chat.prompt_tokens_total", prompt_tokens)
+    metrics.increment("chat.cached_tokens_total", cached_tokens)
+    if prompt_tokens:
+        metrics.observe("chat.cached_token_ratio", cached_tokens / prompt_tokens)
+
 
 def get_chat_response(
-    material_text: str,
+    material_index: MaterialIndex,
     material_title: str,
     chat_history: List[dict],
     user_message: str,
+    summary: Optional[str] = None,
 ) -> str:
     """
     Generate a chat response about the material using OpenAI.
 
+    Only the passages most relevant to the question are sent to the model.
+    The first question of a conversation is answered from the answer cache
+    when possible, since no history can change the answer.
+
     Args:
-        material_text: The processed text from the material
+        material_index: Retrieval index of the material's passages
         material_title: Title of the material
-        chat_history: Previous messages in the conversation
+        chat_history: Recent messages not covered by the summary
         user_message: The user's new message
+        summary: Running summary of the earlier conversation
 
     Returns:
         AI assistant's response
     """
+    first_turn = not chat_history and not summary
+    answer_key = material_answer_key(material_index.content_hash, material_title)
+    if first_turn:
+        cached = get_answer_cache().get(answer_key, user_message)
+        if cached is not None:
+            return cached
+
     settings = get_settings()
     client = OpenAI(api_key=settings.openai_api_key)
 
-    # Truncate material text if too long
-    max_chars = 10000
-    if len(material_text) > max_chars:
-        material_text = material_text[:max_chars] + "..."
-
-    system_prompt = f"""You are a helpful tutor discussing the following learning material.
-Help the user understand the content, answer questions, explain concepts, and provide insights.
-
-Material Title: {material_title}
+    query = build_retrieval_query(chat_history, user_message)
+    query_embedding = None
+    if material_index.embeddings is not None:
+        try:
+            query_embedding = embed_query(client, query)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, using BM25 only: {e}")
 
-Material Content:
-{material_text}
-
-Guidelines:
-- Answer questions based on the material content
-- Explain concepts clearly and simply
-- Provide examples when helpful
-- If asked about something not in the material, say so but offer related insights
-- Be encouraging and supportive
-- Use markdown formatting for better readability"""
-
-    # Build messages list
-    messages = [{"role": "system", "content": system_prompt}]
-
-    # Add chat history (limit to last 10 messages to save tokens)
-    for msg in chat_history[-10:]:
-        messages.append({
-            "role": msg["role"],
-            "content": msg["content"]
-        })
-
-    # Add the new user message
-    messages.append({"role": "user", "content": user_message})
+    passages = material_index.search(
+        query, settings.chat_context_chunks, query_embedding, ranked=True
+    )
+    messages = build_chat_messages(
+        passages,
+        material_title,
+        chat_history,
+        user_message,
+        summary=summary,
+        token_budget=settings.chat_prompt_token_budget,
+        overview=material_index.overview(settings.chat_static_context_chars),
+    )
 
     try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=CHAT_MODEL,
             messages=messages,
             temperature=0.7,
-            max_tokens=1000,
+            max_tokens=CHAT_MAX_TOKENS,
         )
 
         assistant_message = response.choices[0].message.content
+        if response.usage:
+            record_usage(response.usage)
+        if first_turn and assistant_message:
+            get_answer_cache().set(answer_key, user_message, assistant_message)
         logger.info(f"Generated chat response for material: {material_title}")
         return assistant_message
 
     except Exception as e:
         logger.error(f"Error generating chat response: {e}")
         raise ValueError(f"Failed to generate response: {str(e)}")
+
+
+async def stream_chat_response(
+    material_index: MaterialIndex,
+    material_title: str,
+    chat_history: List[dict],
+    user_message: str,
+    summary: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a chat response about the material token by token.
+
+    Time-to-first-token is recorded as the chat.ttft_ms metric. Closing the
+    generator (e.g. on client disconnect) closes the upstream completion.
+    A cached first-turn answer is yielded as a single delta.
+
+    Yields:
+        Content deltas as the model produces them
+    """
+    first_turn = not chat_history and not summary
+    answer_key = material_answer_key(material_index.content_hash, material_title)
+    if first_turn:
+        cached = get_answer_cache().get(answer_key, user_message)
+        if cached is not None:
+            yield cached
+            return
+
+    settings = get_settings()
+    client = AsyncOpenAI(api_key=settings.openai_api_key)
+
+    started = time.perf_counter()
+
+    query = build_retrieval_query(chat_history, user_message)
+    query_embedding = None
+    if material_index.embeddings is not None:
+        try:
+            query_embedding = await embed_query_async(client, query)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, using BM25 only: {e}")
+
+    passages = material_index.search(
+        query, settings.chat_context_chunks, query_embedding, ranked=True
+    )
+    messages = build_chat_messages(
+        passages,
+        material_title,
+        chat_history,
+        user_message,
+        summary=summary,
+        token_budget=settings.chat_prompt_token_budget,
+        overview=material_index.overview(settings.chat_static_context_chars),
+    )
+
+    try:
+        stream = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=CHAT_MAX_TOKENS,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+    except Exception as e:
+        logger.error(f"Error starting chat stream: {e}")
+        raise ValueError(f"Failed to generate response: {str(e)}")
+
+    first_token = True
+    parts: List[str] = []
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                record_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first_token:
+                ttft_ms = (time.perf_counter() - started) * 1000
+                metrics.observe("chat.ttft_ms", ttft_ms)
+                logger.info(f"Chat first token after {ttft_ms:.0f} ms: {material_title}")
+                first_token = False
+            parts.append(delta)
+            yield delta
+    finally:
+        # Stops the upstream completion if we exit early
+        await stream.close()
+
+    metrics.observe("chat.stream_total_ms", (time.perf_counter() - started) * 1000)
+    if first_turn and parts:
+        get_answer_cache().set(answer_key, user_message, "".join(parts))
+    logger.info(f"Streamed chat response for material: {material_title}")
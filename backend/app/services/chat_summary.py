@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from openai import OpenAI
+from supabase import Client
+
+from app.core.config import get_settings
+from app.services.chat import CHAT_MODEL
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MAX_TOKENS = 300
+
+# Summarize once this many messages have fallen out of the recent window
+SUMMARY_BATCH_MESSAGES = 2
+
+# Most messages folded in one run (long legacy conversations catch up over turns)
+SUMMARY_MAX_MESSAGES = 40
+
+
+def summarize_conversation(
+    client: OpenAI,
+    material_title: str,
+    previous_summary: Optional[str],
+    messages: List[dict],
+) -> str:
+    """Fold older messages into the running conversation summary."""
+    transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+
+    system_prompt = """You maintain a compact running summary of a tutoring conversation about a learning material.
+Update the summary with the new messages. Keep the questions the user asked, the key explanations given,
+and anything the user said about their level or goals. Drop greetings and formatting.
+Write at most 150 words in plain prose."""
+
+    user_prompt = f"""Material Title: {material_title}
+
+Current summary:
+{previous_summary or "(none yet)"}
+
+New messages:
+{transcript}
+
+Return the updated summary."""
+
+    response = client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS,
+    )
+
+    return response.choices[0].message.content.strip()
+
+
+def update_conversation_summary(
+    material_id: str,
+    user_id: str,
+    material_title: str,
+    supabase: Client,
+) -> None:
+    """
+    Background task: fold messages that left the recent window into the summary.
+
+    Only messages after the summary's watermark are read, so the work per
+    turn stays bounded however long the conversation runs.
+    """
+    settings = get_settings()
+
+    try:
+        summary_result = (
+            supabase.table("chat_summaries")
+            .select("summary, summarized_until")
+            .eq("material_id", material_id)
+            .eq("user_id", user_id)
+            .maybe_single()
+            .execute()
+        )
+        existing = summary_result.data if summary_result else None
+
+        query = (
+            supabase.table("chat_messages")
+            .select("role, content, created_at")
+            .eq("material_id", material_id)
+            .eq("user_id", user_id)
+        )
+        if existing and existing.get("summarized_until"):
+            query = query.gt("created_at", existing["summarized_until"])
+        unsummarized = (
+            query.order("created_at", desc=False)
+            .order("id", desc=False)
+            .limit(SUMMARY_MAX_MESSAGES)
+            .execute()
+            .data
+        )
+
+        if len(unsummarized) == SUMMARY_MAX_MESSAGES:
+            # A full batch means a backlog (e.g. a long pre-existing conversation):
+            # fold it entirely and continue on the next turn
+            to_summarize = unsummarized
+        else:
+            to_summarize = unsummarized[:-settings.chat_recent_messages or None]
+        if len(to_summarize) < SUMMARY_BATCH_MESSAGES:
+            return
+
+        client = OpenAI(api_key=settings.openai_api_key)
+        summary = summarize_conversation(
+            client,
+            material_title,
+            existing.get("summary") if existing else None,
+            to_summarize,
+        )
+
+        supabase.table("chat_summaries").upsert(
+            {
+                "material_id": material_id,
+                "user_id": user_id,
+                "summary": summary,
+                "summarized_until": to_summarize[-1]["created_at"],
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            },
+            on_conflict="material_id,user_id",
+        ).execute()
+
+        logger.info(
+            f"Updated chat summary for material {material_id} "
+            f"with {len(to_summarize)} messages"
+        )
+
+    except Exception as e:
+        # The prompt still works from recent messages; retry on the next turn
+        logger.error(f"Failed to update chat summary for material {material_id}: {e}")
@@ -0,0 +1,204 @@
+import hashlib
+import hmac
+import logging
+import time
+from typing import Dict, Optional, Union
+from uuid import UUID
+
+from fastapi import Depends, Request, Response
+from jose import JWTError, jwt
+from supabase import Client
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import metrics
+from app.core.security import CurrentUser, get_current_user, get_supabase_client
+from app.models.subscription import Entitlements
+from app.services.pagination import parse_timestamp
+from app.services.subscription import (
+    fetch_or_create_subscription,
+    get_or_create_subscription,
+    get_subscription_cache,
+    get_user_tier,
+    remember_subscription,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request/response header carrying the signed entitlement token
+ENTITLEMENT_HEADER = "X-Entitlement-Token"
+
+ENTITLEMENT_ALGORITHM = "HS256"
+ENTITLEMENT_AUDIENCE = "entitlements"
+
+
+def get_entitlement_secret(settings: Settings) -> str:
+    """Signing key for entitlement tokens, derived from the service key if unset."""
+    if settings.entitlement_token_secret:
+        return settings.entitlement_token_secret
+    return hmac.new(
+        settings.get_active_supabase_key().encode("utf-8"),
+        b"entitlements",
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def build_entitlements(subscription: dict, settings: Settings) -> Entitlements:
+    """Derive a subscription's tier and limits."""
+    tier = get_user_tier(subscription)
+    return Entitlements(
+        tier=tier,
+        uploads_limit=settings.pro_uploads_per_week if tier == "pro" else settings.free_uploads_per_week,
+        quizzes_per_material_limit=settings.pro_quizzes_per_material if tier == "pro" else settings.free_quizzes_per_material,
+        can_use_chat=tier == "pro",
+    )
+
+
+def issue_entitlement_token(
+    user_id: Union[UUID, str],
+    entitlements: Entitlements,
+    version: Optional[str],
+    settings: Settings,
+) -> str:
+    """
+    Sign a short-lived token carrying the user's entitlements.
+
+    Args:
+        version: updated_at of the subscription row the entitlements were
+            built from, checked against revocations
+    """
+    now = time.time()
+    claims = {
+        **entitlements.model_dump(),
+        "sub": str(user_id),
+        "aud": ENTITLEMENT_AUDIENCE,
+        "ver": version,
+        "iat": now,
+        "exp": int(now + settings.entitlement_token_ttl_seconds),
+    }
+    return jwt.encode(claims, get_entitlement_secret(settings), algorithm=ENTITLEMENT_ALGORITHM)
+
+
+def get_revoked_version(user_id: Union[UUID, str]) -> Optional[str]:
+    """Subscription version the user's tokens were last revoked at, if any."""
+    revoked = get_subscription_cache().get(f"entitlements_revoked:{user_id}")
+    return revoked["version"] if revoked else None
+
+
+def is_stale_version(version: Optional[str], revoked_version: Optional[str]) -> bool:
+    """Whether a subscription version predates the last revocation."""
+    if revoked_version is None:
+        return False
+    if not version:
+        return True
+    return parse_timestamp(version) < parse_timestamp(revoked_version)
+
+
+def revoke_entitlements(user_id: Union[UUID, str], version: str) -> None:
+    """
+    Reject the user's entitlement tokens built from older subscription versions.
+
+    Called when a webhook changes the subscription, with the updated_at it
+    wrote; the client gets a fresh token with its next request. Comparing
+    versions rather than issue times also rejects a token signed just
+    after this from a subscription read just before it.
+
+    The marker lives in the subscription cache, so it is shared between
+    workers when that is backed by Redis. It is kept for two token
+    lifetimes, to outlive tokens signed from a stale read shortly after
+    the revocation.
+    """
+    if is_stale_version(version, get_revoked_version(user_id)):
+        # A webhook delivered out of order doesn't move the marker back
+        return
+    get_subscription_cache().set(
+        f"entitlements_revoked:{user_id}",
+        {"version": version},
+        ttl_seconds=2 * get_settings().entitlement_token_ttl_seconds,
+    )
+
+
+def verify_entitlement_token(
+    token: str, user_id: Union[UUID, str], settings: Settings
+) -> Optional[Entitlements]:
+    """
+    Verify an entitlement token in-process.
+
+    Returns:
+        The token's entitlements, or None if it is invalid, expired,
+        issued to another user or revoked
+    """
+    try:
+        claims = jwt.decode(
+            token,
+            get_entitlement_secret(settings),
+            algorithms=[ENTITLEMENT_ALGORITHM],
+            audience=ENTITLEMENT_AUDIENCE,
+        )
+    except JWTError:
+        return None
+
+    if claims.get("sub") != str(user_id):
+        return None
+
+    if is_stale_version(claims.get("ver"), get_revoked_version(user_id)):
+        return None
+
+    try:
+        return Entitlements(**claims)
+    except ValueError:
+        return None
+
+
+def resolve_entitlements(
+    user_id: UUID, token: Optional[str], supabase: Client, settings: Settings
+) -> Entitlements:
+    """
+    Get the user's entitlements, from their token when it is still valid.
+
+    Without a valid token the subscription is looked up and a fresh token
+    is attached to the result for the client to send next time.
+    """
+    if token:
+        entitlements = verify_entitlement_token(token, user_id, settings)
+        if entitlements:
+            metrics.increment("entitlements.token_hits")
+            return entitlements
+
+    metrics.increment("entitlements.token_misses")
+    subscription = get_or_create_subscription(user_id, supabase)
+    if is_stale_version(subscription.get("updated_at"), get_revoked_version(user_id)):
+        # Cached before the revoking webhook's write landed
+        subscription = fetch_or_create_subscription(user_id, supabase)
+        remember_subscription(user_id, subscription)
+    entitlements = build_entitlements(subscription, settings)
+    entitlements._token = issue_entitlement_token(
+        user_id, entitlements, subscription.get("updated_at"), settings
+    )
+    return entitlements
+
+
+def entitlement_headers(entitlements: Entitlements) -> Dict[str, str]:
+    """Response headers handing a newly issued token back to the client."""
+    return {ENTITLEMENT_HEADER: entitlements._token} if entitlements._token else {}
+
+
+def get_entitlements(
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    supabase: Client = Depends(get_supabase_client),
+    settings: Settings = Depends(get_settings),
+) -> Entitlements:
+    """
+    Dependency: the current user's entitlements.
+
+    Reads the X-Entitlement-Token request header and only falls back to
+    the subscription when it is missing or no longer valid. A new token
+    is set on the response; endpoints returning their own Response (e.g.
+    streams) must add entitlement_headers themselves.
+    """
+    entitlements = resolve_entitlements(
+        current_user.id, request.headers.get(ENTITLEMENT_HEADER), supabase, settings
+    )
+    response.headers.update(entitlement_headers(entitlements))
+    return entitlements
@@ -0,0 +1,183 @@
+import logging
+import random
+import re
+from typing import Callable, List, Optional
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Options per multiple choice question (1 correct)
+CHOICES_PER_QUESTION = 4
+
+# Most of the user's other cards loaded as distractors
+MAX_DISTRACTOR_CARDS = 200
+
+BLANK = "_____"
+
+FLASHCARD_QUIZ_FIELDS = "id, term, translation, definition, context_original"
+
+
+def pick_distractors(
+    correct: str, candidates: List[str], rng: random.Random, count: int
+) -> List[str]:
+    """Pick distinct wrong answers, never equal to the correct one."""
+    seen = {correct.strip().lower()}
+    unique = []
+    for candidate in candidates:
+        key = (candidate or "").strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(candidate.strip())
+    return rng.sample(unique, min(count, len(unique)))
+
+
+def multiple_choice(
+    question: str, correct: str, distractors: List[str], explanation: str, rng: random.Random
+) -> Optional[dict]:
+    """Build a multiple choice question, or None without enough distractors."""
+    if len(distractors) < CHOICES_PER_QUESTION - 1:
+        return None
+    options = [{"text": correct, "is_correct": True}] + [
+        {"text": d, "is_correct": False} for d in distractors
+    ]
+    rng.shuffle(options)
+    return {
+        "question": question,
+        "question_type": "multiple_choice",
+        "options": options,
+        "correct_answer": correct,
+        "explanation": explanation,
+    }
+
+
+def definition_question(card: dict, pool: List[dict], rng: random.Random) -> Optional[dict]:
+    """Which term matches a definition."""
+    if not card.get("definition"):
+        return None
+    distractors = pick_distractors(
+        card["term"], [c["term"] for c in pool], rng, CHOICES_PER_QUESTION - 1
+    )
+    return multiple_choice(
+        f"Which term means: {card['definition']}",
+        card["term"],
+        distractors,
+        f"\"{card['term']}\" means {card['definition']}",
+        rng,
+    )
+
+
+def translation_question(card: dict, pool: List[dict], rng: random.Random) -> Optional[dict]:
+    """Match a term to its translation."""
+    if not card.get("translation"):
+        return None
+    distractors = pick_distractors(
+        card["translation"], [c.get("translation") for c in pool], rng, CHOICES_PER_QUESTION - 1
+    )
+    return multiple_choice(
+        f"What is the translation of \"{card['term']}\"?",
+        card["translation"],
+        distractors,
+        f"\"{card['term']}\" translates as \"{card['translation']}\"",
+        rng,
+    )
+
+
+def cloze_question(card: dict, pool: List[dict], rng: random.Random) -> Optional[dict]:
+    """Fill the term back into its original context."""
+    context = card.get("context_original") or ""
+    pattern = re.compile(rf"(?<!\w){re.escape(card['term'])}(?!\w)", re.IGNORECASE)
+    if not pattern.search(context):
+        return None
+    return {
+        "question": pattern.sub(BLANK, context),
+        "question_type": "fill_blank",
+        "options": [],
+        "correct_answer": card["term"],
+        "explanation": f"The missing word is \"{card['term']}\""
+        + (f" ({card['translation']})" if card.get("translation") else ""),
+    }
+
+
+QUESTION_BUILDERS: List[Callable[[dict, List[dict], random.Random], Optional[dict]]] = [
+    definition_question,
+    cloze_question,
+    translation_question,
+]
+
+
+def build_flashcard_quiz(
+    cards: List[dict],
+    distractor_cards: List[dict],
+    num_questions: int,
+    rng: Optional[random.Random] = None,
+) -> List[dict]:
+    """
+    Build quiz questions from flashcards without calling a model.
+
+    Each card is asked once, rotating through definition, cloze and
+    translation questions; a card that can't support a type (e.g. its
+    term isn't in its context) falls through to the next one.
+
+    Args:
+        cards: The material's flashcards
+        distractor_cards: The user's other flashcards, used for wrong answers
+        num_questions: Number of questions to build
+        rng: Random source (for reproducible quizzes in tests)
+
+    Returns:
+        List of quiz question dictionaries in the QuizQuestion shape
+    """
+    rng = rng or random.Random()
+    cards = [c for c in cards if c.get("term")]
+    selected = rng.sample(cards, len(cards))
+    pool = cards + [c for c in distractor_cards if c.get("term")]
+
+    questions = []
+    for i, card in enumerate(selected):
+        if len(questions) >= num_questions:
+            break
+        for offset in range(len(QUESTION_BUILDERS)):
+            builder = QUESTION_BUILDERS[(i + offset) % len(QUESTION_BUILDERS)]
+            question = builder(card, pool, rng)
+            if question:
+                questions.append(question)
+                break
+
+    return questions
+
+
+def generate_flashcard_quiz(
+    material_id: str, user_id: str, num_questions: int, supabase: Client
+) -> List[dict]:
+    """
+    Generate a quiz for a material from the user's flashcards.
+
+    Raises:
+        ValueError: If the cards can't support a single question
+    """
+    cards = (
+        supabase.table("flashcards")
+        .select(FLASHCARD_QUIZ_FIELDS)
+        .eq("material_id", material_id)
+        .eq("user_id", user_id)
+        .execute()
+        .data
+    )
+    distractor_cards = (
+        supabase.table("flashcards")
+        .select(FLASHCARD_QUIZ_FIELDS)
+        .eq("user_id", user_id)
+        .neq("material_id", material_id)
+        .order("created_at", desc=True)
+        .limit(MAX_DISTRACTOR_CARDS)
+        .execute()
+        .data
+    )
+
+    questions = build_flashcard_quiz(cards, distractor_cards, num_questions)
+    if not questions:
+        raise ValueError("Not enough flashcards to build a quiz")
+
+    logger.info(f"Built {len(questions)} quiz questions from flashcards for {material_id}")
+    return questions
@@ -0,0 +1,130 @@
+import base64
+import binascii
+import re
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+# Default and maximum page sizes for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Fractional seconds and a UTC offset without minutes, as Postgres may emit them
+_FRACTION_PATTERN = re.compile(r"\.(\d+)")
+_SHORT_OFFSET_PATTERN = re.compile(r"(\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?[+-]\d{2})$")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse a Postgres/PostgREST timestamp.
+
+    Before Python 3.11 datetime.fromisoformat only accepts offsets with
+    minutes (no "Z") and 3 or 6 fractional digits, while Postgres trims
+    trailing zeros (e.g. ".12345+00"), so the value is normalized first.
+
+    Raises:
+        ValueError: If the value is not a timestamp
+    """
+    normalized = value.strip().replace("Z", "+00:00")
+    normalized = _FRACTION_PATTERN.sub(
+        lambda m: "." + m.group(1)[:6].ljust(6, "0"), normalized, count=1
+    )
+    normalized = _SHORT_OFFSET_PATTERN.sub(r"\1:00", normalized)
+    return datetime.fromisoformat(normalized)
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Encode a (created_at, id) keyset position into an opaque cursor."""
+    raw = f"{created_at}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode an opaque cursor back into its (created_at, id) keyset position.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        # Validate both parts so they are safe to embed in a PostgREST filter
+        parse_timestamp(created_at)
+        UUID(row_id)
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    return created_at, row_id
+
+
+def apply_keyset(
+    query: Any,
+    cursor: Optional[str],
+    desc: bool = True,
+    column: str = "created_at",
+    reference_table: Optional[str] = None,
+) -> Any:
+    """
+    Order a PostgREST query by (column, id) and resume after the cursor.
+
+    The query is ordered on the composite key so that rows sharing the same
+    timestamp are still returned exactly once across pages. Pass
+    reference_table to page an embedded resource instead of the main table.
+    """
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f'{column}.{op}."{value}",'
+            f'and({column}.eq."{value}",id.{op}.{row_id})',
+            reference_table=reference_table,
+        )
+
+    return query.order(column, desc=desc, foreign_table=reference_table).order(
+        "id", desc=desc, foreign_table=reference_table
+    )
+
+
+def paginate_rows(
+    rows: List[dict], limit: int, column: str = "created_at"
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Trim a result fetched with ``limit + 1`` rows and compute the next cursor.
+
+    Returns:
+        Tuple of (page_rows, next_cursor) where next_cursor is None on the last page
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(str(last[column]), str(last["id"]))
+
+
+def parse_fields(
+    fields: Optional[str], allowed: List[str], required: List[str]
+) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ``fields=`` projection.
+
+    Required fields (e.g. the keyset columns) are always included.
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return None
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    columns = list(required)
+    for field in requested:
+        if field not in columns:
+            columns.append(field)
+    return columns
@@ -1,11 +1,16 @@
+import asyncio
 import json
 import logging
-from typing import List
+import math
+import random
+from itertools import zip_longest
+from typing import AsyncIterator, List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
 
 from app.core.config import get_settings
+from app.services.retrieval import chunk_text
 
 logger = logging.getLogger(__name__)
 
@@ -30,26 +35,18 @@ class QuizQuestions(BaseModel):
     questions: List[QuizQuestion]
 
 
-def generate_quiz(text: str, num_questions: int = 5) -> List[dict]:
-    """
-    Generate quiz questions from material text using OpenAI.
+QUIZ_MODEL = "gpt-4o-mini"
 
-    Args:
-        text: The material text to generate questions from
-        num_questions: Number of questions to generate
+# Texts up to this size are quizzed in a single call
+QUIZ_SECTION_CHARS = 6000
 
-    Returns:
-        List of quiz question dictionaries
-    """
-    settings = get_settings()
-    client = OpenAI(api_key=settings.openai_api_key)
+# Most sections quizzed in parallel for one quiz
+MAX_QUIZ_SECTIONS = 5
 
-    # Truncate text if too long
-    max_chars = 12000
-    if len(text) > max_chars:
-        text = text[:max_chars] + "..."
+# Extra questions asked per section to make up for duplicates
+SECTION_EXTRA_QUESTIONS = 1
 
-    system_prompt = """You are an expert educator creating quiz questions to test comprehension.
+QUIZ_SYSTEM_PROMPT = """You are an expert educator creating quiz questions to test comprehension.
 Generate varied question types:
 - Multiple choice (4 options, 1 correct)
 - True/False
@@ -59,7 +56,10 @@ Questions should test understanding, not just memorization.
 Include explanations for why each answer is correct.
 Make questions progressively harder."""
 
-    user_prompt = f"""Based on this content, generate {num_questions} quiz questions:
+
+def build_quiz_prompt(text: str, num_questions: int) -> str:
+    """Build the user prompt asking for num_questions about a text."""
+    return f"""Based on this content, generate {num_questions} quiz questions:
 
 {text}
 
@@ -81,23 +81,300 @@ Return as JSON with this structure:
   ]
 }}"""
 
+
+def sample_sections(text: str, num_questions: int) -> List[str]:
+    """
+    Pick evenly spaced sections of a text to quiz on.
+
+    Short texts are a single section. Longer ones are split into sections
+    of about QUIZ_SECTION_CHARS and up to MAX_QUIZ_SECTIONS of them are
+    sampled across the whole text, so quizzes cover more than the beginning.
+    """
+    sections = chunk_text(text, QUIZ_SECTION_CHARS, overlap_chars=0)
+    count = min(len(sections), num_questions, MAX_QUIZ_SECTIONS)
+    if count <= 1:
+        return sections[:1]
+
+    step = len(sections) / count
+    offset = random.random() * step
+    return [sections[int(offset + i * step)] for i in range(count)]
+
+
+def merge_questions(batches: List[List[dict]], num_questions: int) -> List[dict]:
+    """
+    Interleave per-section questions, dropping duplicates.
+
+    Taking one question from each section in turn keeps the quiz spread
+    across the material when there are more questions than needed.
+    """
+    merged: List[dict] = []
+    seen = set()
+    for round_questions in zip_longest(*batches):
+        for question in round_questions:
+            if not isinstance(question, dict) or not question.get("question"):
+                continue
+            key = " ".join(question["question"].lower().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(question)
+    return merged[:num_questions]
+
+
+async def generate_questions(client: AsyncOpenAI, text: str, num_questions: int) -> List[dict]:
+    """Ask the model for num_questions questions about a text."""
+    response = await client.chat.completions.create(
+        model=QUIZ_MODEL,
+        messages=[
+            {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+            {"role": "user", "content": build_quiz_prompt(text, num_questions)}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.7,
+    )
+
+    result = json.loads(response.choices[0].message.content)
+    return result.get("questions", [])
+
+
+class QuestionStreamParser:
+    """
+    Incrementally extract question objects from streamed quiz JSON.
+
+    Feed it the model's output as it arrives; each question object in the
+    "questions" array is returned as soon as its closing brace is seen.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.in_array = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[dict]:
+        """Add streamed text and get the questions completed by it."""
+        self.buffer += text
+        completed = []
+
+        while self.position < len(self.buffer):
+            if not self.in_array:
+                key = self.buffer.find('"questions"', self.position)
+                if key == -1:
+                    break
+                bracket = self.buffer.find("[", key)
+                if bracket == -1:
+                    break
+                self.in_array = True
+                self.position = bracket + 1
+                continue
+
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.object_start = self.position
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    raw = self.buffer[self.object_start:self.position + 1]
+                    self.object_start = None
+                    try:
+                        completed.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping malformed streamed quiz question")
+            elif char == "]" and self.depth == 0:
+                # End of the questions array
+                self.in_array = False
+                self.position = len(self.buffer)
+                break
+            self.position += 1
+
+        return completed
+
+
+def validate_question(raw: dict) -> Optional[dict]:
+    """Validate a generated question, or None if it doesn't fit QuizQuestion."""
+    try:
+        return QuizQuestion(**raw).model_dump()
+    except Exception:
+        logger.warning("Skipping invalid generated quiz question")
+        return None
+
+
+async def stream_section_questions(
+    client: AsyncOpenAI, text: str, num_questions: int
+) -> AsyncIterator[dict]:
+    """Stream the questions generated for one text as each one completes."""
+    stream = await client.chat.completions.create(
+        model=QUIZ_MODEL,
+        messages=[
+            {"role": "system", "content": QUIZ_SYSTEM_PROMPT},
+            {"role": "user", "content": build_quiz_prompt(text, num_questions)}
+        ],
+        response_format={"type": "json_object"},
+        temperature=0.7,
+        stream=True,
+    )
+
+    parser = QuestionStreamParser()
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7,
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            for raw in parser.feed(chunk.choices[0].delta.content):
+                question = validate_question(raw)
+                if question:
+                    yield question
+    finally:
+        # Stops the upstream completion if we exit early
+        await stream.close()
+
+
+# Marks a section stream as finished on the merge queue
+_SECTION_DONE = object()
+
+
+async def stream_quiz(text: str, num_questions: int = 5) -> AsyncIterator[dict]:
+    """
+    Generate quiz questions, yielding each one as soon as it is complete.
+
+    Sections are sampled as in generate_quiz and streamed concurrently;
+    questions are yielded in arrival order, de-duplicated, until
+    num_questions is reached. Closing the generator cancels the upstream
+    requests.
+
+    Raises:
+        TimeoutError: If generation took longer than the timeout
+        ValueError: If no question could be generated
+    """
+    settings = get_settings()
+    client = AsyncOpenAI(api_key=settings.openai_api_key)
+
+    sections = sample_sections(text, num_questions)
+    if not sections:
+        raise ValueError("Failed to generate quiz: material has no text")
+
+    per_section = math.ceil(num_questions / len(sections))
+    if len(sections) > 1:
+        per_section += SECTION_EXTRA_QUESTIONS
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce(section: str) -> None:
+        try:
+            async for question in stream_section_questions(client, section, per_section):
+                await queue.put(question)
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(_SECTION_DONE)
+
+    tasks = [asyncio.create_task(produce(section)) for section in sections]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.quiz_generation_timeout_seconds
+
+    emitted = 0
+    finished = 0
+    seen = set()
+    errors: List[Exception] = []
+    try:
+        while finished < len(tasks) and emitted < num_questions:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=deadline - loop.time())
+            except asyncio.TimeoutError:
+                logger.error("Quiz generation timed out")
+                raise TimeoutError("Quiz generation timed out")
+
+            if item is _SECTION_DONE:
+                finished += 1
+            elif isinstance(item, Exception):
+                errors.append(item)
+            else:
+                key = " ".join(item["question"].lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                emitted += 1
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if not emitted:
+        error = errors[0] if errors else "no questions returned"
+        logger.error(f"Error generating quiz: {error}")
+        raise ValueError(f"Failed to generate quiz: {error}")
+
+    logger.info(f"Streamed {emitted} quiz questions from {len(sections)} sections")
+
+
+async def generate_quiz(text: str, num_questions: int = 5) -> List[dict]:
+    """
+    Generate quiz questions from material text using OpenAI.
+
+    Long materials are split into sections; sampled sections are quizzed
+    concurrently with smaller prompts and the results merged. The calls
+    run on the async client so they never block the event loop, and are
+    abandoned after quiz_generation_timeout_seconds. Cancelling the
+    awaiting task cancels the upstream requests.
+
+    Args:
+        text: The material text to generate questions from
+        num_questions: Number of questions to generate
+
+    Returns:
+        List of quiz question dictionaries
+
+    Raises:
+        TimeoutError: If generation took longer than the timeout
+        ValueError: If generation failed
+    """
+    settings = get_settings()
+    client = AsyncOpenAI(api_key=settings.openai_api_key)
+
+    sections = sample_sections(text, num_questions)
+    if not sections:
+        raise ValueError("Failed to generate quiz: material has no text")
+
+    per_section = math.ceil(num_questions / len(sections))
+    if len(sections) > 1:
+        per_section += SECTION_EXTRA_QUESTIONS
+
+    try:
+        batches = await asyncio.wait_for(
+            asyncio.gather(
+                *(generate_questions(client, section, per_section) for section in sections),
+                return_exceptions=True,
+            ),
+            timeout=settings.quiz_generation_timeout_seconds,
         )
+    except asyncio.TimeoutError:
+        logger.error("Quiz generation timed out")
+        raise TimeoutError("Quiz generation timed out")
+
+    errors = [b for b in batches if isinstance(b, Exception)]
+    questions = merge_questions([b for b in batches if isinstance(b, list)], num_questions)
 
-        result = json.loads(response.choices[0].message.content)
-        questions = result.get("questions", [])
+    if not questions:
+        error = errors[0] if errors else "no questions returned"
+        logger.error(f"Error generating quiz: {error}")
+        raise ValueError(f"Failed to generate quiz: {error}")
 
-        logger.info(f"Generated {len(questions)} quiz questions")
-        return questions
+    if errors:
+        logger.warning(f"{len(errors)} of {len(sections)} quiz sections failed: {errors[0]}")
 
-    except Exception as e:
-        logger.error(f"Error generating quiz: {e}")
-        raise ValueError(f"Failed to generate quiz: {str(e)}")
+    logger.info(f"Generated {len(questions)} quiz questions from {len(sections)} sections")
+    return questions
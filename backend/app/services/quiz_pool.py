@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+from typing import Optional, Set
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+from supabase import Client
+
+from app.core.config import get_settings
+from app.services.quiz import generate_quiz
+
+logger = logging.getLogger(__name__)
+
+# Pooled quizzes have the default question count of POST /quizzes
+POOL_QUIZ_QUESTIONS = 5
+
+# Materials with a refill in progress in this process
+_refilling: Set[str] = set()
+_refilling_lock = threading.Lock()
+
+
+def claim_pooled_quiz(
+    material_id: str, user_id: UUID, num_questions: int, supabase: Client
+) -> Optional[dict]:
+    """
+    Claim a pre-generated quiz for the user, moving it into quizzes.
+
+    Returns:
+        The new quiz row, or None if the pool has no matching quiz
+    """
+    if num_questions != POOL_QUIZ_QUESTIONS:
+        return None
+
+    result = supabase.rpc(
+        "claim_pooled_quiz",
+        {
+            "p_material_id": material_id,
+            "p_user_id": str(user_id),
+            "p_num_questions": num_questions,
+        },
+    ).execute()
+
+    return result.data[0] if result.data else None
+
+
+def clear_quiz_pool(material_id: str, supabase: Client) -> None:
+    """Delete a material's pooled quizzes, e.g. when it is reprocessed."""
+    supabase.table("quiz_pool").delete().eq("material_id", material_id).execute()
+
+
+async def refill_quiz_pool(
+    material_id: str,
+    user_id: str,
+    supabase: Client,
+    text: Optional[str] = None,
+) -> int:
+    """
+    Background task: top the material's quiz pool up to quiz_pool_size.
+
+    Missing quizzes are generated concurrently; the database calls run in
+    the threadpool so the event loop isn't blocked. A refill already
+    running for the material in this process makes this a no-op.
+
+    Args:
+        text: The material's processed text, fetched if not given
+
+    Returns:
+        Number of quizzes added
+    """
+    pool_size = get_settings().quiz_pool_size
+    if pool_size <= 0:
+        return 0
+
+    with _refilling_lock:
+        if material_id in _refilling:
+            return 0
+        _refilling.add(material_id)
+
+    try:
+        pooled = await run_in_threadpool(
+            supabase.table("quiz_pool")
+            .select("id", count="exact")
+            .eq("material_id", material_id)
+            .eq("user_id", user_id)
+            .eq("total_questions", POOL_QUIZ_QUESTIONS)
+            .execute
+        )
+        missing = pool_size - (pooled.count or 0)
+        if missing <= 0:
+            return 0
+
+        if text is None:
+            material = await run_in_threadpool(
+                supabase.table("materials")
+                .select("processed_text")
+                .eq("id", material_id)
+                .single()
+                .execute
+            )
+            text = material.data.get("processed_text") if material.data else None
+        if not text:
+            return 0
+
+        results = await asyncio.gather(
+            *(generate_quiz(text, POOL_QUIZ_QUESTIONS) for _ in range(missing)),
+            return_exceptions=True,
+        )
+        rows = [
+            {
+                "material_id": material_id,
+                "user_id": user_id,
+                "questions": questions[:POOL_QUIZ_QUESTIONS],
+                "total_questions": POOL_QUIZ_QUESTIONS,
+            }
+            for questions in results
+            if isinstance(questions, list) and len(questions) >= POOL_QUIZ_QUESTIONS
+        ]
+        if rows:
+            await run_in_threadpool(supabase.table("quiz_pool").insert(rows).execute)
+
+        logger.info(f"Added {len(rows)} pooled quizzes for material {material_id}")
+        return len(rows)
+
+    except Exception as e:
+        # Quiz creation falls back to generating on demand
+        logger.error(f"Failed to refill quiz pool for material {material_id}: {e}")
+        return 0
+
+    finally:
+        with _refilling_lock:
+            _refilling.discard(material_id)
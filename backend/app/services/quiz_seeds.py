@@ -0,0 +1,105 @@
+import logging
+import random
+from datetime import datetime, timezone
+from itertools import zip_longest
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+
+def save_quiz_seeds(
+    material_id: str, user_id: str, seeds: List[dict], supabase: Client
+) -> None:
+    """Store the quiz seeds extracted while processing a material.
+
+    Seeds from an earlier processing run of the material are replaced.
+    """
+    supabase.table("quiz_seeds").delete().eq("material_id", material_id).execute()
+    if not seeds:
+        return
+
+    supabase.table("quiz_seeds").insert([
+        {
+            "material_id": material_id,
+            "user_id": user_id,
+            "chunk_index": seed["chunk_index"],
+            "question": seed["question"],
+        }
+        for seed in seeds
+    ]).execute()
+
+    logger.info(f"Saved {len(seeds)} quiz seeds for material {material_id}")
+
+
+def pick_seeds(
+    seeds: List[dict], num_seeds: int, rng: Optional[random.Random] = None
+) -> List[dict]:
+    """
+    Pick seeds spread across the material's chunks.
+
+    Seeds are shuffled within each chunk and taken one chunk at a time in
+    turn, so every part of the material is asked about.
+    """
+    rng = rng or random.Random()
+
+    by_chunk: Dict[int, List[dict]] = {}
+    for seed in seeds:
+        by_chunk.setdefault(seed["chunk_index"], []).append(seed)
+    for chunk_seeds in by_chunk.values():
+        rng.shuffle(chunk_seeds)
+
+    picked = []
+    for round_seeds in zip_longest(*(by_chunk[i] for i in sorted(by_chunk))):
+        picked.extend(seed for seed in round_seeds if seed is not None)
+    return picked[:num_seeds]
+
+
+def assemble_quiz_from_seeds(
+    material_id: str, user_id: UUID, num_questions: int, supabase: Client
+) -> Optional[List[dict]]:
+    """
+    Assemble a quiz from a material's stored seeds the user hasn't been served.
+
+    The picked seeds are marked served, so each quiz asks new questions.
+    A seed taken by a concurrent request makes this return None rather
+    than repeat a question.
+
+    Returns:
+        The quiz questions, or None if too few unserved seeds remain
+    """
+    seeds = (
+        supabase.table("quiz_seeds")
+        .select("id, chunk_index, question")
+        .eq("material_id", material_id)
+        .eq("user_id", str(user_id))
+        .is_("served_at", "null")
+        .execute()
+        .data
+    )
+    if len(seeds) < num_questions:
+        return None
+
+    picked = pick_seeds(seeds, num_questions)
+    picked_ids = [seed["id"] for seed in picked]
+    # Only seeds still unserved are claimed
+    claimed = (
+        supabase.table("quiz_seeds")
+        .update({"served_at": datetime.now(timezone.utc).isoformat()})
+        .in_("id", picked_ids)
+        .is_("served_at", "null")
+        .execute()
+        .data
+    )
+    if len(claimed) < len(picked_ids):
+        # Hand back the seeds this request did claim
+        claimed_ids = [seed["id"] for seed in claimed]
+        if claimed_ids:
+            supabase.table("quiz_seeds").update({"served_at": None}).in_(
+                "id", claimed_ids
+            ).execute()
+        return None
+
+    return [seed["question"] for seed in picked]
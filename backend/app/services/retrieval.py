@@ -0,0 +1,350 @@
+import hashlib
+import io
+import logging
+import math
+import re
+from collections import Counter
+from functools import cached_property, lru_cache
+from typing import List, Optional
+
+from openai import AsyncOpenAI, OpenAI
+from supabase import Client
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:  # Embeddings are optional; BM25 works without numpy
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Weight of the embedding similarity when both scores are available
+EMBEDDING_WEIGHT = 0.5
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "do", "does",
+    "for", "from", "has", "have", "how", "i", "in", "is", "it", "its", "me",
+    "of", "on", "or", "so", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "why", "with", "you",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_chars: int, overlap_chars: int = 200) -> List[str]:
+    """
+    Split text into overlapping passages, preferring sentence boundaries.
+
+    Same approach as vocabulary chunking, but with much smaller passages
+    suited for retrieval.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= chunk_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+
+        if end < len(text):
+            for marker in (". ", "? ", "! ", "\n"):
+                break_point = text.rfind(marker, start + chunk_chars // 2, end)
+                if break_point != -1:
+                    end = break_point + 1
+                    break
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap_chars, start + 1)
+
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 index over a list of passages."""
+
+    def __init__(self, chunks: List[str]):
+        self.chunks = chunks
+        self.doc_tokens = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.doc_lengths = [sum(tokens.values()) for tokens in self.doc_tokens]
+        self.avg_length = (
+            sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        )
+
+        doc_freq: Counter = Counter()
+        for tokens in self.doc_tokens:
+            doc_freq.update(tokens.keys())
+
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every passage for the query."""
+        terms = tokenize(query)
+        scores = []
+        for tokens, length in zip(self.doc_tokens, self.doc_lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+            for term in terms:
+                tf = tokens.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+
+class MaterialIndex:
+    """Retrieval index of a material: passages, BM25 and optional embeddings."""
+
+    def __init__(self, chunks: List[str], embeddings=None):
+        self.chunks = chunks
+        self.bm25 = BM25Index(chunks)
+        self.embeddings = embeddings
+
+    @cached_property
+    def content_hash(self) -> str:
+        """SHA-256 of the passages, identical for identical materials."""
+        digest = hashlib.sha256()
+        for chunk in self.chunks:
+            digest.update(chunk.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def overview(self, max_chars: int) -> str:
+        """
+        Leading passages of the material, up to max_chars.
+
+        Deterministic for a given index, so it can sit in the static
+        prompt prefix.
+        """
+        parts: List[str] = []
+        used = 0
+        for chunk in self.chunks:
+            if used + len(chunk) > max_chars:
+                break
+            parts.append(chunk)
+            used += len(chunk)
+        return "\n\n".join(parts)
+
+    def search(
+        self, query: str, top_k: int, query_embedding=None, ranked: bool = False
+    ) -> List[str]:
+        """
+        Get the top-k passages for a query.
+
+        BM25 scores are max-normalized and, when embeddings are available,
+        blended with cosine similarity. Passages are returned in document
+        order, or best first when ranked is set.
+        """
+        if not self.chunks:
+            return []
+        if len(self.chunks) <= top_k:
+            return list(self.chunks)
+
+        scores = self.bm25.scores(query)
+        best = max(scores)
+        if best > 0:
+            scores = [s / best for s in scores]
+
+        if self.embeddings is not None and query_embedding is not None and np is not None:
+            similarities = self.embeddings @ query_embedding
+            scores = [
+                (1 - EMBEDDING_WEIGHT) * s + EMBEDDING_WEIGHT * float(sim)
+                for s, sim in zip(scores, similarities)
+            ]
+
+        if max(scores) <= 0:
+            # Nothing matched: fall back to the beginning of the material
+            return self.chunks[:top_k]
+
+        best_first = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        selected = best_first[:top_k]
+        if not ranked:
+            selected = sorted(selected)
+        return [self.chunks[i] for i in selected]
+
+
+def normalize_rows(matrix):
+    """L2-normalize embedding rows so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embed_texts(client: OpenAI, texts: List[str]):
+    """Embed texts with OpenAI as a normalized float32 NumPy array."""
+    response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    matrix = np.array([item.embedding for item in response.data], dtype=np.float32)
+    return normalize_rows(matrix)
+
+
+async def embed_query_async(client: AsyncOpenAI, text: str):
+    """Embed a single query with the async client."""
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=[text])
+    return normalize_rows(np.array(response.data[0].embedding, dtype=np.float32))
+
+
+def embed_query(client: OpenAI, text: str):
+    """Embed a single query."""
+    return embed_texts(client, [text])[0]
+
+
+def embeddings_enabled() -> bool:
+    """Whether embedding retrieval is configured and numpy is available."""
+    return get_settings().chat_retrieval_embeddings and np is not None
+
+
+def embeddings_path(user_id: str, material_id: str) -> str:
+    """Storage path of a material's embeddings array."""
+    return f"{user_id}/indexes/{material_id}.npy"
+
+
+def build_material_index(
+    material_id: str, user_id: str, text: str, supabase: Client
+) -> int:
+    """
+    Chunk a material's text and persist its retrieval index.
+
+    Passages go to the material_chunks table; if embeddings are enabled
+    they are stored as a .npy array in Supabase Storage.
+
+    Returns:
+        Number of passages indexed
+    """
+    settings = get_settings()
+    chunks = chunk_text(text, settings.chat_chunk_chars)
+    if not chunks:
+        return 0
+
+    supabase.table("material_chunks").delete().eq("material_id", material_id).execute()
+    supabase.table("material_chunks").insert([
+        {
+            "material_id": material_id,
+            "user_id": user_id,
+            "chunk_index": i,
+            "content": chunk,
+        }
+        for i, chunk in enumerate(chunks)
+    ]).execute()
+
+    if embeddings_enabled():
+        try:
+            client = OpenAI(api_key=settings.openai_api_key)
+            buffer = io.BytesIO()
+            np.save(buffer, embed_texts(client, chunks))
+            supabase.storage.from_("storage").upload(
+                embeddings_path(user_id, material_id),
+                buffer.getvalue(),
+                file_options={"content-type": "application/octet-stream", "upsert": "true"},
+            )
+        except Exception as e:
+            # BM25 still works without embeddings
+            logger.warning(f"Failed to build embeddings for material {material_id}: {e}")
+
+    logger.info(f"Indexed {len(chunks)} passages for material {material_id}")
+    return len(chunks)
+
+
+def load_material_index(
+    material_id: str, user_id: str, supabase: Client
+) -> MaterialIndex:
+    """
+    Build the in-memory index of a material from its stored passages.
+
+    Materials processed before passages were stored are chunked on the fly
+    from their processed text.
+    """
+    chunks_result = (
+        supabase.table("material_chunks")
+        .select("content")
+        .eq("material_id", material_id)
+        .order("chunk_index")
+        .execute()
+    )
+    chunks = [row["content"] for row in chunks_result.data]
+
+    if not chunks:
+        text_result = (
+            supabase.table("materials")
+            .select("processed_text")
+            .eq("id", material_id)
+            .single()
+            .execute()
+        )
+        fallback_text = text_result.data.get("processed_text") if text_result.data else None
+        if fallback_text:
+            chunks = chunk_text(fallback_text, get_settings().chat_chunk_chars)
+
+    embeddings = None
+    if chunks and embeddings_enabled():
+        try:
+            data = supabase.storage.from_("storage").download(
+                embeddings_path(user_id, material_id)
+            )
+            embeddings = np.load(io.BytesIO(data))
+            if len(embeddings) != len(chunks):
+                embeddings = None
+        except Exception as e:
+            logger.info(f"No embeddings for material {material_id}: {e}")
+
+    return MaterialIndex(chunks, embeddings)
+
+
+@lru_cache
+def get_material_index_cache() -> TTLCache[MaterialIndex]:
+    """Process-wide LRU of material indexes."""
+    settings = get_settings()
+    return TTLCache(
+        max_size=settings.chat_context_cache_size,
+        ttl_seconds=settings.chat_context_cache_ttl_seconds,
+    )
+
+
+def get_material_index(
+    material_id: str,
+    user_id: str,
+    updated_at: Optional[str],
+    supabase: Client,
+) -> MaterialIndex:
+    """
+    Get a material's index, loading it only when not cached.
+
+    Entries are keyed by the material's updated_at, so reprocessing a
+    material (which bumps it) is never served a stale index.
+    """
+    cache = get_material_index_cache()
+    key = (material_id, updated_at)
+
+    index = cache.get(key)
+    if index is not None:
+        metrics.increment("chat.context_cache_hits")
+        return index
+
+    metrics.increment("chat.context_cache_misses")
+    index = load_material_index(material_id, user_id, supabase)
+    if index.chunks:
+        cache.set(key, index)
+    return index
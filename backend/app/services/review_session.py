@@ -0,0 +1,101 @@
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewSession(BaseModel):
+    """A snapshot of a user's due-card queue held in memory."""
+
+    id: str
+    user_id: str
+    queue: List[dict]
+    created_at: datetime
+    expires_at: datetime
+
+
+class ReviewSessionStore:
+    """
+    In-memory store of review sessions.
+
+    The due queue is snapshotted once when the session starts; afterwards
+    pages are served from memory and reviewed cards are simply dropped from
+    the queue, so no ordered due query runs between cards.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._sessions: TTLCache[ReviewSession] = TTLCache(max_sessions, ttl_seconds)
+        self._lock = threading.Lock()
+
+    def create(self, user_id: str, cards: List[dict]) -> ReviewSession:
+        """Start a new session from an already ordered list of due cards."""
+        now = datetime.now(timezone.utc)
+        session = ReviewSession(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            queue=list(cards),
+            created_at=now,
+            expires_at=now + timedelta(seconds=self.ttl_seconds),
+        )
+        self._sessions.set(session.id, session)
+        logger.info(f"Started review session {session.id} with {len(cards)} cards")
+        return session
+
+    def get(self, session_id: str, user_id: str) -> Optional[ReviewSession]:
+        """Get a live session owned by the user."""
+        session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        return session
+
+    def page(
+        self, session: ReviewSession, page_size: int
+    ) -> Tuple[List[dict], List[dict]]:
+        """
+        Get the current page and the batch after it.
+
+        Returns:
+            Tuple of (cards, prefetch)
+        """
+        with self._lock:
+            cards = session.queue[:page_size]
+            prefetch = session.queue[page_size:page_size * 2]
+        return cards, prefetch
+
+    def remove_card(self, session_id: str, user_id: str, card_id: str) -> bool:
+        """Drop a reviewed card from the session queue. Returns True if removed."""
+        session = self.get(session_id, user_id)
+        if session is None:
+            return False
+
+        with self._lock:
+            before = len(session.queue)
+            session.queue = [c for c in session.queue if str(c["id"]) != card_id]
+            return len(session.queue) < before
+
+    def end(self, session_id: str, user_id: str) -> bool:
+        """End a session. Returns True if it existed."""
+        if self.get(session_id, user_id) is None:
+            return False
+        self._sessions.pop(session_id)
+        return True
+
+
+@lru_cache
+def get_review_session_store() -> ReviewSessionStore:
+    """Get the process-wide review session store."""
+    settings = get_settings()
+    return ReviewSessionStore(
+        max_sessions=settings.review_session_max_sessions,
+        ttl_seconds=settings.review_session_ttl_seconds,
+    )
@@ -1,17 +1,82 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Literal, Optional
+from functools import lru_cache
+from typing import Literal, Optional, Union
 from uuid import UUID
 
 from supabase import Client
 
-from app.core.config import Settings
+from app.core.cache import RedisCache, TTLCache, request_cache
+from app.core.config import Settings, get_settings
+from app.core.metrics import metrics
+from app.services.pagination import parse_timestamp
 
 logger = logging.getLogger(__name__)
 
+USAGE_WEEK = timedelta(days=7)
+
+
+@lru_cache
+def get_subscription_cache() -> Union[TTLCache[dict], RedisCache]:
+    """Process-wide subscription cache, shared through Redis if configured."""
+    settings = get_settings()
+    if settings.subscription_cache_redis_url:
+        return RedisCache(
+            settings.subscription_cache_redis_url,
+            ttl_seconds=settings.subscription_cache_ttl_seconds,
+            prefix="subscription:",
+        )
+    return TTLCache(
+        max_size=settings.subscription_cache_size,
+        ttl_seconds=settings.subscription_cache_ttl_seconds,
+    )
+
+
+def remember_subscription(user_id: Union[UUID, str], subscription: dict) -> None:
+    """Store a freshly read or written subscription row in the caches."""
+    memo = request_cache()
+    if memo is not None:
+        memo[("subscription", str(user_id))] = subscription
+    get_subscription_cache().set(str(user_id), subscription)
+
+
+def invalidate_subscription(user_id: Union[UUID, str]) -> None:
+    """Drop a user's cached subscription after it changed in the database."""
+    memo = request_cache()
+    if memo is not None:
+        memo.pop(("subscription", str(user_id)), None)
+    get_subscription_cache().pop(str(user_id))
+
 
 def get_or_create_subscription(user_id: UUID, supabase: Client) -> dict:
-    """Get user's subscription, creating a free one if it doesn't exist."""
+    """
+    Get user's subscription, creating a free one if it doesn't exist.
+
+    Reads through the request memo and the subscription cache, so a
+    request reads the row from the database at most once. Anything that
+    writes the row must call remember_subscription or
+    invalidate_subscription.
+    """
+    memo = request_cache()
+    memo_key = ("subscription", str(user_id))
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    cached = get_subscription_cache().get(str(user_id))
+    if cached is not None:
+        metrics.increment("subscription.cache_hits")
+        if memo is not None:
+            memo[memo_key] = cached
+        return cached
+
+    metrics.increment("subscription.cache_misses")
+    subscription = fetch_or_create_subscription(user_id, supabase)
+    remember_subscription(user_id, subscription)
+    return subscription
+
+
+def fetch_or_create_subscription(user_id: UUID, supabase: Client) -> dict:
+    """Read the user's subscription from the database, creating a free one."""
     result = (
         supabase.table("subscriptions")
         .select("*")
@@ -29,7 +94,7 @@ def get_or_create_subscription(user_id: UUID, supabase: Client) -> dict:
         "user_id": str(user_id),
         "status": "free",
         "uploads_this_week": 0,
-        "week_reset_at": (now + timedelta(days=7)).isoformat(),
+        "week_reset_at": (now + USAGE_WEEK).isoformat(),
     }
 
     create_result = (
@@ -49,122 +114,119 @@ def get_user_tier(subscription: dict) -> Literal["free", "pro"]:
     return "free"
 
 
-def maybe_reset_weekly_usage(subscription: dict, supabase: Client) -> dict:
-    """Reset weekly usage if the reset time has passed. Returns updated subscription."""
+def weekly_usage(
+    subscription: dict, now: Optional[datetime] = None
+) -> tuple[int, Optional[datetime]]:
+    """
+    Compute the user's uploads this week in memory, without writing.
+
+    week_reset_at anchors a fixed weekly grid: uploads_this_week counts
+    the week ending at week_reset_at, so once that has passed usage is
+    zero, and the current week ends a whole number of weeks after the
+    anchor. Only reserve_upload_slot moves the anchor forward.
+
+    Returns:
+        (uploads_used, resets_at)
+    """
+    uploads = subscription.get("uploads_this_week", 0)
     week_reset_at = subscription.get("week_reset_at")
     if not week_reset_at:
-        return subscription
+        return uploads, None
 
-    # Parse the reset time
     if isinstance(week_reset_at, str):
-        reset_time = datetime.fromisoformat(week_reset_at.replace("Z", "+00:00"))
+        anchor = parse_timestamp(week_reset_at)
     else:
-        reset_time = week_reset_at
-
-    now = datetime.now(timezone.utc)
-
-    if now >= reset_time:
-        # Reset usage and set next reset time
-        new_reset_at = now + timedelta(days=7)
-
-        result = (
-            supabase.table("subscriptions")
-            .update({
-                "uploads_this_week": 0,
-                "week_reset_at": new_reset_at.isoformat(),
-            })
-            .eq("id", subscription["id"])
-            .execute()
-        )
+        anchor = week_reset_at
 
-        return result.data[0]
+    now = now or datetime.now(timezone.utc)
+    if now < anchor:
+        return uploads, anchor
 
-    return subscription
+    elapsed_weeks = (now - anchor) // USAGE_WEEK + 1
+    return 0, anchor + elapsed_weeks * USAGE_WEEK
 
 
-def check_upload_limit(user_id: UUID, supabase: Client, settings: Settings) -> tuple[bool, int, int]:
+def reserve_upload_slot(user_id: UUID, supabase: Client, settings: Settings) -> tuple[bool, int, int]:
     """
-    Check if user can upload.
-    Returns: (can_upload, current_count, limit)
-    """
-    subscription = get_or_create_subscription(user_id, supabase)
-    subscription = maybe_reset_weekly_usage(subscription, supabase)
+    Reserve one of the user's weekly uploads.
 
-    tier = get_user_tier(subscription)
-    limit = settings.pro_uploads_per_week if tier == "pro" else settings.free_uploads_per_week
-    current = subscription.get("uploads_this_week", 0)
+    Weekly reset, tier limit check and increment happen atomically in the
+    database, so concurrent uploads can't exceed the limit. Release the
+    slot with release_upload_slot if the upload then fails.
 
-    return current < limit, current, limit
+    Returns:
+        (reserved, current_count, limit) - current_count includes the
+        reserved upload
+    """
+    result = supabase.rpc(
+        "reserve_upload_slot",
+        {
+            "p_user_id": str(user_id),
+            "p_free_limit": settings.free_uploads_per_week,
+            "p_pro_limit": settings.pro_uploads_per_week,
+        },
+    ).execute()
+    invalidate_subscription(user_id)
 
+    row = result.data[0]
+    return row["allowed"], row["uploads_this_week"], row["upload_limit"]
 
-def increment_upload_count(user_id: UUID, supabase: Client) -> None:
-    """Increment the user's weekly upload count."""
-    subscription = get_or_create_subscription(user_id, supabase)
 
-    supabase.table("subscriptions").update({
-        "uploads_this_week": subscription.get("uploads_this_week", 0) + 1,
-    }).eq("id", subscription["id"]).execute()
+def release_upload_slot(user_id: UUID, supabase: Client) -> None:
+    """Give back an upload reserved with reserve_upload_slot."""
+    supabase.rpc("release_upload_slot", {"p_user_id": str(user_id)}).execute()
+    invalidate_subscription(user_id)
 
 
-def check_quiz_limit(
+def reserve_quiz_slot(
     user_id: UUID,
     material_id: str,
     supabase: Client,
-    settings: Settings
-) -> tuple[bool, int, int]:
-    """
-    Check if user can create a quiz for the material.
-    Returns: (can_create, current_count, limit)
+    settings: Settings,
+    limit: Optional[int] = None,
+) -> Optional[tuple[bool, int, int]]:
     """
-    subscription = get_or_create_subscription(user_id, supabase)
-    tier = get_user_tier(subscription)
-    limit = settings.pro_quizzes_per_material if tier == "pro" else settings.free_quizzes_per_material
-
-    # Get current quiz count for material
-    result = (
-        supabase.table("materials")
-        .select("quiz_count")
-        .eq("id", material_id)
-        .single()
-        .execute()
-    )
+    Count a quiz against the material's limit.
 
-    if not result.data:
-        return False, 0, limit
+    The tier limit check and increment happen atomically in the database,
+    so concurrent quizzes can't exceed the limit or lose updates. Release
+    the slot with release_quiz_slot if the quiz then isn't created.
 
-    current = result.data.get("quiz_count", 0) or 0
-    return current < limit, current, limit
+    Args:
+        limit: The user's quiz limit if already known (e.g. from their
+            entitlements); otherwise it is looked up from the subscription
 
+    Returns:
+        (reserved, current_count, limit), or None if the user doesn't own
+        the material
+    """
+    params = {
+        "p_material_id": material_id,
+        "p_user_id": str(user_id),
+        "p_free_limit": settings.free_quizzes_per_material,
+        "p_pro_limit": settings.pro_quizzes_per_material,
+    }
+    if limit is not None:
+        params["p_limit"] = limit
 
-def increment_quiz_count(material_id: str, supabase: Client) -> None:
-    """Increment the quiz count for a material."""
-    # Get current count
-    result = (
-        supabase.table("materials")
-        .select("quiz_count")
-        .eq("id", material_id)
-        .single()
-        .execute()
-    )
+    result = supabase.rpc("reserve_quiz_slot", params).execute()
 
-    current = (result.data.get("quiz_count", 0) or 0) if result.data else 0
+    if not result.data:
+        return None
 
-    supabase.table("materials").update({
-        "quiz_count": current + 1,
-    }).eq("id", material_id).execute()
+    row = result.data[0]
+    return row["allowed"], row["quiz_count"], row["quiz_limit"]
 
 
-def check_chat_access(user_id: UUID, supabase: Client) -> bool:
-    """Check if user has chat access (Pro tier only)."""
-    subscription = get_or_create_subscription(user_id, supabase)
-    tier = get_user_tier(subscription)
-    return tier == "pro"
+def release_quiz_slot(material_id: str, supabase: Client) -> None:
+    """Give back a quiz reserved with reserve_quiz_slot."""
+    supabase.rpc("release_quiz_slot", {"p_material_id": material_id}).execute()
 
 
 def get_subscription_response(user_id: UUID, supabase: Client, settings: Settings) -> dict:
-    """Get full subscription status for API response."""
+    """Get full subscription status for API response. Never writes."""
     subscription = get_or_create_subscription(user_id, supabase)
-    subscription = maybe_reset_weekly_usage(subscription, supabase)
+    uploads_used, uploads_reset_at = weekly_usage(subscription)
 
     tier = get_user_tier(subscription)
 
@@ -174,7 +236,8 @@ def get_subscription_response(user_id: UUID, supabase: Client, settings: Setting
         "trial_end": subscription.get("trial_end"),
         "current_period_end": subscription.get("current_period_end"),
         "cancel_at_period_end": subscription.get("cancel_at_period_end", False),
-        "uploads_used": subscription.get("uploads_this_week", 0),
+        "uploads_used": uploads_used,
+        "uploads_reset_at": uploads_reset_at,
         "uploads_limit": settings.pro_uploads_per_week if tier == "pro" else settings.free_uploads_per_week,
         "quizzes_per_material_limit": settings.pro_quizzes_per_material if tier == "pro" else settings.free_quizzes_per_material,
         "can_use_chat": tier == "pro",
@@ -225,6 +288,7 @@ def update_subscription_from_stripe(
             .eq("id", existing_data["id"])
             .execute()
         )
+        remember_subscription(user_id, update_result.data[0])
         return update_result.data[0]
     else:
         # Create new with stripe data
@@ -232,7 +296,7 @@ def update_subscription_from_stripe(
         update_data.update({
             "user_id": user_id,
             "uploads_this_week": 0,
-            "week_reset_at": (now + timedelta(days=7)).isoformat(),
+            "week_reset_at": (now + USAGE_WEEK).isoformat(),
         })
         if status == "trialing":
             update_data["trial_start"] = now.isoformat()
@@ -241,6 +305,7 @@ def update_subscription_from_stripe(
             .insert(update_data)
             .execute()
         )
+        remember_subscription(user_id, create_result.data[0])
         return create_result.data[0]
 
 
@@ -262,4 +327,5 @@ def cancel_subscription(user_id: UUID, supabase: Client) -> dict:
         .execute()
     )
 
+    remember_subscription(user_id, result.data[0])
     return result.data[0]
@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from supabase import Client
+
+from app.services.pagination import (
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    parse_timestamp,
+)
+
+logger = logging.getLogger(__name__)
+
+# Keyset id that sorts before every row at the same timestamp
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+
+# updated_at/deleted_at are stamped at transaction start, so a row can
+# commit after a client has synced past its stamp. Once caught up, the
+# cursor is set back to now - SYNC_SAFETY_WINDOW and the rows in that
+# window are sent again on the next sync.
+SYNC_SAFETY_WINDOW = timedelta(seconds=60)
+
+# How long tombstones are kept (see prune_deleted_records in migration 017)
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class SyncCursorExpired(ValueError):
+    """The cursor is older than the tombstone retention; resync from scratch."""
+
+
+def split_sync_cursor(cursor: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Split a sync cursor into its (changes_cursor, deletes_cursor) parts.
+
+    A sync cursor is two keyset cursors joined by "." - one positioned on
+    (updated_at, id) of the table and one on (deleted_at, id) of tombstones.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None, None
+
+    parts = cursor.split(".")
+    if len(parts) != 2 or not all(parts):
+        raise ValueError(f"Invalid sync cursor: {cursor}")
+    return parts[0], parts[1]
+
+
+def fetch_delta(
+    supabase: Client,
+    table: str,
+    user_id: str,
+    columns: List[str],
+    cursor: Optional[str],
+    limit: int,
+) -> dict:
+    """
+    Get rows of a table changed or deleted since a sync cursor.
+
+    Without a cursor every row is returned (paged) and no tombstones, since
+    the client has nothing to delete yet. Clients apply changes by id, so
+    rows sent again from the safety window are harmless.
+
+    Returns:
+        Dict with changed rows, deleted ids, next_cursor and has_more
+
+    Raises:
+        SyncCursorExpired: If tombstones since the cursor may have been pruned
+        ValueError: If the cursor is malformed
+    """
+    changes_cursor, deletes_cursor = split_sync_cursor(cursor)
+    now = datetime.now(timezone.utc)
+    # Position every row stamped before the window is known to be committed by
+    horizon = encode_cursor((now - SYNC_SAFETY_WINDOW).isoformat(), MIN_UUID)
+
+    if deletes_cursor is None:
+        # Initial sync: only deletions from now on are relevant
+        deletes_cursor = horizon
+    elif parse_timestamp(decode_cursor(deletes_cursor)[0]) < now - TOMBSTONE_RETENTION:
+        raise SyncCursorExpired("Sync cursor expired, start a full sync")
+
+    # Rows created or updated since the cursor
+    changes_query = (
+        supabase.table(table)
+        .select(", ".join(columns))
+        .eq("user_id", user_id)
+    )
+    changes_query = apply_keyset(
+        changes_query, changes_cursor, desc=False, column="updated_at"
+    )
+    changes = changes_query.limit(limit + 1).execute().data
+
+    # Rows deleted since the cursor
+    deletes_query = (
+        supabase.table("deleted_records")
+        .select("id, record_id, deleted_at")
+        .eq("user_id", user_id)
+        .eq("table_name", table)
+    )
+    deletes_query = apply_keyset(
+        deletes_query, deletes_cursor, desc=False, column="deleted_at"
+    )
+    deletes = deletes_query.limit(limit + 1).execute().data
+
+    more_changes = len(changes) > limit
+    more_deletes = len(deletes) > limit
+    changes = changes[:limit]
+    deletes = deletes[:limit]
+
+    # A full page continues right after its last row; once caught up the
+    # cursor drops back to the horizon so late commits are picked up
+    if more_changes:
+        last = changes[-1]
+        changes_cursor = encode_cursor(str(last["updated_at"]), str(last["id"]))
+    else:
+        changes_cursor = horizon
+    if more_deletes:
+        last = deletes[-1]
+        deletes_cursor = encode_cursor(str(last["deleted_at"]), str(last["id"]))
+    else:
+        deletes_cursor = horizon
+
+    logger.info(
+        f"Delta sync for {table}: {len(changes)} changed, {len(deletes)} deleted"
+    )
+
+    return {
+        "changed": changes,
+        "deleted": [d["record_id"] for d in deletes],
+        "next_cursor": f"{changes_cursor}.{deletes_cursor}",
+        "has_more": more_changes or more_deletes,
+    }
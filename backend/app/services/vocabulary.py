@@ -1,11 +1,12 @@
 import json
 import logging
-from typing import List
+from typing import List, Tuple
 
 from openai import OpenAI
 
 from app.core.config import get_settings
 from app.models.schemas import ExtractedFlashcard, FlashcardCreate
+from app.services.quiz import validate_question
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,39 @@ MAX_TOKENS_PER_CHUNK = 5000
 OVERLAP_TOKENS = 500
 CHARS_PER_TOKEN_ESTIMATE = 4  # Rough estimate for English text
 
+# Quiz question seeds written per chunk in the combined processing mode
+QUIZ_SEEDS_PER_CHUNK = 5
+
+QUIZ_SEEDS_SCHEMA = {
+    "type": "array",
+    "description": "Quiz questions testing comprehension of this part of the text",
+    "items": {
+        "type": "object",
+        "properties": {
+            "question": {"type": "string", "description": "The question text"},
+            "question_type": {
+                "type": "string",
+                "enum": ["multiple_choice", "true_false", "fill_blank"],
+            },
+            "options": {
+                "type": "array",
+                "description": "4 options for multiple choice, empty otherwise",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "text": {"type": "string"},
+                        "is_correct": {"type": "boolean"},
+                    },
+                    "required": ["text", "is_correct"],
+                },
+            },
+            "correct_answer": {"type": "string", "description": "The correct answer text"},
+            "explanation": {"type": "string", "description": "Why this is the correct answer"},
+        },
+        "required": ["question", "question_type", "options", "correct_answer", "explanation"],
+    },
+}
+
 
 def split_text_into_chunks(text: str) -> List[str]:
     """
@@ -54,6 +88,25 @@ def extract_vocabulary_from_chunk(
     client: OpenAI, text: str, chunk_index: int, total_chunks: int
 ) -> List[ExtractedFlashcard]:
     """Extract vocabulary from a single text chunk using OpenAI."""
+    flashcards, _ = extract_study_material_from_chunk(client, text, chunk_index, total_chunks)
+    return flashcards
+
+
+def extract_study_material_from_chunk(
+    client: OpenAI,
+    text: str,
+    chunk_index: int,
+    total_chunks: int,
+    with_quiz_seeds: bool = False,
+) -> Tuple[List[ExtractedFlashcard], List[dict]]:
+    """
+    Extract vocabulary, and optionally quiz question seeds, from a chunk.
+
+    Both come from the same tool call, so the chunk is only read once.
+
+    Returns:
+        Tuple of (flashcards, validated quiz question dicts)
+    """
 
     tools = [
         {
@@ -106,6 +159,11 @@ def extract_vocabulary_from_chunk(
         }
     ]
 
+    parameters = tools[0]["function"]["parameters"]
+    if with_quiz_seeds:
+        parameters["properties"]["quiz_questions"] = QUIZ_SEEDS_SCHEMA
+        parameters["required"].append("quiz_questions")
+
     system_prompt = """You are an expert English linguist and language teacher.
 Your task is to analyze the provided text and extract 10-15 key vocabulary terms (words or phrases)
 that would be valuable for a B2/C1 English learner.
@@ -133,6 +191,12 @@ Use the save_vocabulary function to submit your extracted vocabulary."""
 
 Extract 10-15 vocabulary terms suitable for B2/C1 English learners."""
 
+    if with_quiz_seeds:
+        user_prompt += f"""
+Also write {QUIZ_SEEDS_PER_CHUNK} quiz questions testing understanding of this part of the text:
+a mix of multiple choice (4 options, 1 correct), true/false and fill in the blank,
+each with the correct answer and a short explanation."""
+
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -150,11 +214,16 @@ Extract 10-15 vocabulary terms suitable for B2/C1 English learners."""
         args = json.loads(tool_call.function.arguments)
 
         flashcards = [ExtractedFlashcard(**card) for card in args.get("flashcards", [])]
-        return flashcards
+        quiz_seeds = [
+            question
+            for question in map(validate_question, args.get("quiz_questions", []))
+            if question
+        ]
+        return flashcards, quiz_seeds
 
     except Exception as e:
         logger.error(f"Error extracting vocabulary from chunk {chunk_index}: {e}")
-        return []
+        return [], []
 
 
 def deduplicate_flashcards(
@@ -195,6 +264,28 @@ def extract_keywords_from_text(text: str) -> List[FlashcardCreate]:
     Returns:
         List of unique FlashcardCreate objects
     """
+    flashcards, _ = extract_study_material(text)
+    return flashcards
+
+
+def extract_study_material(
+    text: str, with_quiz_seeds: bool = False
+) -> Tuple[List[FlashcardCreate], List[dict]]:
+    """
+    Extract vocabulary, and optionally quiz question seeds, from text.
+
+    Same map-reduce as extract_keywords_from_text; with quiz seeds each
+    chunk's single call also returns a few quiz questions, so quizzes can
+    later be assembled without reading the text again.
+
+    Args:
+        text: Source text to analyze
+        with_quiz_seeds: Whether to also write quiz questions per chunk
+
+    Returns:
+        Tuple of (unique FlashcardCreate objects, quiz seeds with their
+        chunk_index)
+    """
     settings = get_settings()
     client = OpenAI(api_key=settings.openai_api_key)
 
@@ -202,15 +293,20 @@ def extract_keywords_from_text(text: str) -> List[FlashcardCreate]:
     chunks = split_text_into_chunks(text)
     logger.info(f"Processing text in {len(chunks)} chunk(s)")
 
-    # Map: Extract vocabulary from each chunk
+    # Map: Extract vocabulary (and quiz seeds) from each chunk
     all_flashcards: List[ExtractedFlashcard] = []
+    quiz_seeds: List[dict] = []
     for i, chunk in enumerate(chunks):
         logger.info(f"Processing chunk {i + 1}/{len(chunks)}")
-        chunk_flashcards = extract_vocabulary_from_chunk(
-            client, chunk, i, len(chunks)
+        chunk_flashcards, chunk_seeds = extract_study_material_from_chunk(
+            client, chunk, i, len(chunks), with_quiz_seeds=with_quiz_seeds
         )
         all_flashcards.extend(chunk_flashcards)
-        logger.info(f"Extracted {len(chunk_flashcards)} terms from chunk {i + 1}")
+        quiz_seeds.extend({"chunk_index": i, "question": seed} for seed in chunk_seeds)
+        logger.info(
+            f"Extracted {len(chunk_flashcards)} terms and {len(chunk_seeds)} "
+            f"quiz seeds from chunk {i + 1}"
+        )
 
     # Reduce: Deduplicate and consolidate
     unique_flashcards = deduplicate_flashcards(all_flashcards)
@@ -219,4 +315,4 @@ def extract_keywords_from_text(text: str) -> List[FlashcardCreate]:
         f"(from {len(all_flashcards)} raw extractions)"
     )
 
-    return unique_flashcards
+    return unique_flashcards, quiz_seeds
@@ -0,0 +1,10 @@
+-- Migration: Composite index for keyset pagination of flashcard listings
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Supports GET /cards ordered by (created_at, id) per user, with or without
+-- a material filter
+create index if not exists flashcards_user_created_id_idx
+  on public.flashcards(user_id, created_at desc, id desc);
+
+create index if not exists flashcards_material_created_id_idx
+  on public.flashcards(material_id, created_at desc, id desc);
@@ -0,0 +1,80 @@
+-- Migration: updated_at tracking and tombstones for delta sync
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- updated_at columns (backfilled from created_at)
+alter table public.materials
+  add column if not exists updated_at timestamptz;
+update public.materials set updated_at = created_at where updated_at is null;
+alter table public.materials
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+alter table public.flashcards
+  add column if not exists updated_at timestamptz;
+update public.flashcards set updated_at = created_at where updated_at is null;
+alter table public.flashcards
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+-- Keep updated_at current on every update
+create or replace function public.set_updated_at()
+returns trigger as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists materials_set_updated_at on public.materials;
+create trigger materials_set_updated_at
+  before update on public.materials
+  for each row execute function public.set_updated_at();
+
+drop trigger if exists flashcards_set_updated_at on public.flashcards;
+create trigger flashcards_set_updated_at
+  before update on public.flashcards
+  for each row execute function public.set_updated_at();
+
+-- Tombstones for deleted rows
+create table if not exists public.deleted_records (
+  id uuid primary key default uuid_generate_v4(),
+  user_id uuid references auth.users(id) on delete cascade not null,
+  table_name text not null,
+  record_id uuid not null,
+  deleted_at timestamptz default now() not null
+);
+
+alter table public.deleted_records enable row level security;
+
+create policy "Users can view their own deleted records"
+  on public.deleted_records for select
+  using (auth.uid() = user_id);
+
+-- Record a tombstone for every deleted row (also fires for cascaded
+-- flashcard deletes when a material is removed)
+create or replace function public.record_deletion()
+returns trigger as $$
+begin
+  insert into public.deleted_records (user_id, table_name, record_id)
+  values (old.user_id, tg_table_name, old.id);
+  return old;
+end;
+$$ language plpgsql security definer;
+
+drop trigger if exists materials_record_deletion on public.materials;
+create trigger materials_record_deletion
+  after delete on public.materials
+  for each row execute function public.record_deletion();
+
+drop trigger if exists flashcards_record_deletion on public.flashcards;
+create trigger flashcards_record_deletion
+  after delete on public.flashcards
+  for each row execute function public.record_deletion();
+
+-- Indexes for keyset scans on (updated_at, id) / (deleted_at, id)
+create index if not exists materials_user_updated_id_idx
+  on public.materials(user_id, updated_at, id);
+create index if not exists flashcards_user_updated_id_idx
+  on public.flashcards(user_id, updated_at, id);
+create index if not exists deleted_records_user_table_deleted_idx
+  on public.deleted_records(user_id, table_name, deleted_at, id);
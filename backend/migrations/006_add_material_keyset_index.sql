@@ -0,0 +1,5 @@
+-- Migration: Composite index for keyset pagination of material listings
+-- Run this in Supabase Dashboard → SQL Editor
+
+create index if not exists materials_user_created_id_idx
+  on public.materials(user_id, created_at desc, id desc);
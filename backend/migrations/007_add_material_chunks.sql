@@ -0,0 +1,26 @@
+-- Migration: Passages for retrieval-based chat context
+-- Run this in Supabase Dashboard → SQL Editor
+
+create table if not exists public.material_chunks (
+  id uuid primary key default uuid_generate_v4(),
+  material_id uuid references public.materials(id) on delete cascade not null,
+  user_id uuid references auth.users(id) on delete cascade not null,
+  chunk_index int not null,
+  content text not null,
+  created_at timestamptz default now() not null,
+  unique (material_id, chunk_index)
+);
+
+alter table public.material_chunks enable row level security;
+
+create policy "Users can view their own material chunks"
+  on public.material_chunks for select
+  using (auth.uid() = user_id);
+
+create policy "Users can insert their own material chunks"
+  on public.material_chunks for insert
+  with check (auth.uid() = user_id);
+
+create policy "Users can delete their own material chunks"
+  on public.material_chunks for delete
+  using (auth.uid() = user_id);
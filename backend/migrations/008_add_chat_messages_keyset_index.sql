@@ -0,0 +1,5 @@
+-- Migration: Index for trailing-window and paged chat history queries
+-- Run this in Supabase Dashboard → SQL Editor
+
+create index if not exists chat_messages_material_user_created_id_idx
+  on public.chat_messages(material_id, user_id, created_at desc, id desc);
@@ -0,0 +1,24 @@
+-- Migration: Running conversation summaries for bounded chat prompts
+-- Run this in Supabase Dashboard → SQL Editor
+
+create table if not exists public.chat_summaries (
+  id uuid primary key default uuid_generate_v4(),
+  material_id uuid references public.materials(id) on delete cascade not null,
+  user_id uuid references auth.users(id) on delete cascade not null,
+  summary text not null,
+  -- created_at of the last chat message folded into the summary
+  summarized_until timestamptz not null,
+  created_at timestamptz default now() not null,
+  updated_at timestamptz default now() not null,
+  unique (material_id, user_id)
+);
+
+alter table public.chat_summaries enable row level security;
+
+create policy "Users can view their own chat summaries"
+  on public.chat_summaries for select
+  using (auth.uid() = user_id);
+
+create policy "Users can delete their own chat summaries"
+  on public.chat_summaries for delete
+  using (auth.uid() = user_id);
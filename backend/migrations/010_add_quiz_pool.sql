@@ -0,0 +1,49 @@
+-- Migration: Pre-generated quiz pool per material
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Quizzes generated ahead of time, not yet handed out
+create table if not exists public.quiz_pool (
+  id uuid primary key default uuid_generate_v4(),
+  material_id uuid references public.materials(id) on delete cascade not null,
+  user_id uuid references auth.users(id) on delete cascade not null,
+  questions jsonb not null,
+  total_questions int not null,
+  created_at timestamptz default now() not null
+);
+
+alter table public.quiz_pool enable row level security;
+
+create policy "Users can view their own pooled quizzes"
+  on public.quiz_pool for select
+  using (auth.uid() = user_id);
+
+create index if not exists quiz_pool_material_idx
+  on public.quiz_pool(material_id, total_questions, created_at);
+
+-- Move one pooled quiz into quizzes in a single statement.
+-- skip locked lets concurrent claims take different quizzes.
+create or replace function public.claim_pooled_quiz(
+  p_material_id uuid,
+  p_user_id uuid,
+  p_num_questions int
+)
+returns setof public.quizzes
+language sql
+as $$
+  with claimed as (
+    delete from public.quiz_pool
+    where id = (
+      select id from public.quiz_pool
+      where material_id = p_material_id
+        and user_id = p_user_id
+        and total_questions = p_num_questions
+      order by created_at
+      limit 1
+      for update skip locked
+    )
+    returning material_id, user_id, questions, total_questions
+  )
+  insert into public.quizzes (material_id, user_id, questions, total_questions)
+  select material_id, user_id, questions, total_questions from claimed
+  returning *;
+$$;
@@ -0,0 +1,5 @@
+-- Migration: Composite index for keyset pagination of quiz listings
+-- Run this in Supabase Dashboard → SQL Editor
+
+create index if not exists quizzes_material_user_created_id_idx
+  on public.quizzes(material_id, user_id, created_at desc, id desc);
@@ -0,0 +1,21 @@
+-- Migration: Quiz question seeds written during material processing
+-- Run this in Supabase Dashboard → SQL Editor
+
+create table if not exists public.quiz_seeds (
+  id uuid primary key default uuid_generate_v4(),
+  material_id uuid references public.materials(id) on delete cascade not null,
+  user_id uuid references auth.users(id) on delete cascade not null,
+  -- Vocabulary chunk the question was written from
+  chunk_index int not null,
+  question jsonb not null,
+  created_at timestamptz default now() not null
+);
+
+alter table public.quiz_seeds enable row level security;
+
+create policy "Users can view their own quiz seeds"
+  on public.quiz_seeds for select
+  using (auth.uid() = user_id);
+
+create index if not exists quiz_seeds_material_idx
+  on public.quiz_seeds(material_id, user_id);
@@ -0,0 +1,54 @@
+-- Migration: Atomic weekly upload quota
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Reserve one upload for the user in a single statement: resets the
+-- week when it has passed, checks the tier limit and increments.
+-- Concurrent reservations serialize on the subscription row, so
+-- parallel uploads can't all pass the check.
+create or replace function public.reserve_upload_slot(
+  p_user_id uuid,
+  p_free_limit int,
+  p_pro_limit int
+)
+returns table (allowed boolean, uploads_this_week int, upload_limit int)
+language plpgsql
+as $$
+begin
+  insert into public.subscriptions (user_id)
+  values (p_user_id)
+  on conflict (user_id) do nothing;
+
+  return query
+  update public.subscriptions s
+  set
+    uploads_this_week = case when s.week_reset_at <= now() then 1 else s.uploads_this_week + 1 end,
+    week_reset_at = case when s.week_reset_at <= now() then now() + interval '7 days' else s.week_reset_at end
+  where s.user_id = p_user_id
+    and (case when s.week_reset_at <= now() then 0 else s.uploads_this_week end)
+      < (case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end)
+  returning
+    true,
+    s.uploads_this_week,
+    case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end;
+
+  if not found then
+    return query
+    select
+      false,
+      case when s.week_reset_at <= now() then 0 else s.uploads_this_week end,
+      case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end
+    from public.subscriptions s
+    where s.user_id = p_user_id;
+  end if;
+end;
+$$;
+
+-- Give back a reserved upload when creating the material failed
+create or replace function public.release_upload_slot(p_user_id uuid)
+returns void
+language sql
+as $$
+  update public.subscriptions
+  set uploads_this_week = greatest(uploads_this_week - 1, 0)
+  where user_id = p_user_id;
+$$;
@@ -0,0 +1,51 @@
+-- Migration: Atomic per-material quiz counter
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Count one quiz against the material's tier limit in a single
+-- statement. Returns no row if the user doesn't own the material.
+create or replace function public.reserve_quiz_slot(
+  p_material_id uuid,
+  p_user_id uuid,
+  p_free_limit int,
+  p_pro_limit int
+)
+returns table (allowed boolean, quiz_count int, quiz_limit int)
+language plpgsql
+as $$
+declare
+  v_limit int;
+begin
+  select case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end
+  into v_limit
+  from public.subscriptions s
+  where s.user_id = p_user_id;
+
+  v_limit := coalesce(v_limit, p_free_limit);
+
+  return query
+  update public.materials m
+  set quiz_count = m.quiz_count + 1
+  where m.id = p_material_id
+    and m.user_id = p_user_id
+    and m.quiz_count < v_limit
+  returning true, m.quiz_count, v_limit;
+
+  if not found then
+    return query
+    select false, m.quiz_count, v_limit
+    from public.materials m
+    where m.id = p_material_id
+      and m.user_id = p_user_id;
+  end if;
+end;
+$$;
+
+-- Give back a reserved quiz when generating it failed
+create or replace function public.release_quiz_slot(p_material_id uuid)
+returns void
+language sql
+as $$
+  update public.materials
+  set quiz_count = greatest(quiz_count - 1, 0)
+  where id = p_material_id;
+$$;
@@ -0,0 +1,49 @@
+-- Migration: Weekly upload usage on a fixed grid
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- uploads_this_week counts the week ending at week_reset_at. Reads
+-- compute current usage from that anchor (zero once it has passed), so
+-- only reservations write: they move week_reset_at forward by whole
+-- weeks to the end of the current week instead of to now() + 7 days.
+create or replace function public.reserve_upload_slot(
+  p_user_id uuid,
+  p_free_limit int,
+  p_pro_limit int
+)
+returns table (allowed boolean, uploads_this_week int, upload_limit int)
+language plpgsql
+as $$
+begin
+  insert into public.subscriptions (user_id)
+  values (p_user_id)
+  on conflict (user_id) do nothing;
+
+  return query
+  update public.subscriptions s
+  set
+    uploads_this_week = case when s.week_reset_at <= now() then 1 else s.uploads_this_week + 1 end,
+    week_reset_at = case
+      when s.week_reset_at <= now() then
+        s.week_reset_at
+          + (floor(extract(epoch from now() - s.week_reset_at) / 604800) + 1) * interval '7 days'
+      else s.week_reset_at
+    end
+  where s.user_id = p_user_id
+    and (case when s.week_reset_at <= now() then 0 else s.uploads_this_week end)
+      < (case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end)
+  returning
+    true,
+    s.uploads_this_week,
+    case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end;
+
+  if not found then
+    return query
+    select
+      false,
+      case when s.week_reset_at <= now() then 0 else s.uploads_this_week end,
+      case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end
+    from public.subscriptions s
+    where s.user_id = p_user_id;
+  end if;
+end;
+$$;
@@ -0,0 +1,46 @@
+-- Migration: Let callers pass a known quiz limit
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- With p_limit set (from the user's entitlement token) the
+-- subscription isn't read at all.
+drop function if exists public.reserve_quiz_slot(uuid, uuid, int, int);
+
+create or replace function public.reserve_quiz_slot(
+  p_material_id uuid,
+  p_user_id uuid,
+  p_free_limit int,
+  p_pro_limit int,
+  p_limit int default null
+)
+returns table (allowed boolean, quiz_count int, quiz_limit int)
+language plpgsql
+as $$
+declare
+  v_limit int := p_limit;
+begin
+  if v_limit is null then
+    select case when s.status in ('trialing', 'active', 'past_due') then p_pro_limit else p_free_limit end
+    into v_limit
+    from public.subscriptions s
+    where s.user_id = p_user_id;
+
+    v_limit := coalesce(v_limit, p_free_limit);
+  end if;
+
+  return query
+  update public.materials m
+  set quiz_count = m.quiz_count + 1
+  where m.id = p_material_id
+    and m.user_id = p_user_id
+    and m.quiz_count < v_limit
+  returning true, m.quiz_count, v_limit;
+
+  if not found then
+    return query
+    select false, m.quiz_count, v_limit
+    from public.materials m
+    where m.id = p_material_id
+      and m.user_id = p_user_id;
+  end if;
+end;
+$$;
@@ -0,0 +1,32 @@
+-- Migration: Retention for delta sync tombstones
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Drop tombstones older than the retention. Clients whose sync cursor
+-- is older than that get 410 from /sync and start a full sync, so the
+-- interval must match TOMBSTONE_RETENTION in app/services/sync.py.
+create or replace function public.prune_deleted_records(
+  p_retention interval default interval '30 days'
+)
+returns bigint
+language sql
+security definer
+as $$
+  with pruned as (
+    delete from public.deleted_records
+    where deleted_at < now() - p_retention
+    returning 1
+  )
+  select count(*) from pruned;
+$$;
+
+-- Run it daily where pg_cron is available (Supabase: Database → Extensions)
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule(
+      'prune-deleted-records',
+      '17 3 * * *',
+      'select public.prune_deleted_records()'
+    );
+  end if;
+end $$;
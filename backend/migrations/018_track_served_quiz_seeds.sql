@@ -0,0 +1,12 @@
+-- Migration: Track which quiz seeds have been served
+-- Run this in Supabase Dashboard → SQL Editor
+
+-- Seeds belong to one user, so a served seed is never asked again.
+-- Once too few unserved seeds remain, quizzes come from the pool or
+-- are generated instead.
+alter table public.quiz_seeds
+  add column if not exists served_at timestamptz;
+
+create index if not exists quiz_seeds_unserved_idx
+  on public.quiz_seeds(material_id, user_id)
+  where served_at is null;
@@ -0,0 +1,105 @@
+"""
+Tests for the in-process caches.
+
+Tests cover:
+- Basic get/set/pop
+- TTL expiry
+- LRU eviction
+- Request-scoped memo
+"""
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+
+    def test_get_set(self):
+        """Test stored values are returned until removed."""
+        from app.core.cache import TTLCache
+
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert "a" in cache
+        assert cache.pop("a") == 1
+        assert cache.get("a") is None
+
+    def test_expiry(self):
+        """Test entries are dropped after their TTL."""
+        from app.core.cache import TTLCache
+
+        cache = TTLCache(max_size=10, ttl_seconds=5)
+        with patch("app.core.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("app.core.cache.time.monotonic", return_value=104.0):
+            assert cache.get("a") == 1
+        with patch("app.core.cache.time.monotonic", return_value=105.0):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full."""
+        from app.core.cache import TTLCache
+
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+class TestRequestCache:
+    """Tests for request_cache and RequestCacheMiddleware."""
+
+    def test_none_outside_request(self):
+        """Test there is no memo outside a request."""
+        from app.core.cache import request_cache
+
+        assert request_cache() is None
+
+    @pytest.mark.asyncio
+    async def test_fresh_memo_per_request(self):
+        """Test each request gets its own memo, shared with threadpool code."""
+        from fastapi import FastAPI
+
+        from app.core.cache import RequestCacheMiddleware, request_cache
+
+        app = FastAPI()
+        app.add_middleware(RequestCacheMiddleware)
+
+        @app.get("/count")
+        def count():
+            memo = request_cache()
+            memo["hits"] = memo.get("hits", 0) + 1
+            return memo["hits"]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/count")
+            second = await client.get("/count")
+
+        assert first.json() == 1
+        assert second.json() == 1
+
+    @pytest.mark.asyncio
+    async def test_no_memo_for_websockets(self):
+        """Test a WebSocket connection doesn't get a memo for its lifetime."""
+        from app.core.cache import RequestCacheMiddleware, request_cache
+
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(request_cache())
+
+        await RequestCacheMiddleware(app)({"type": "websocket"}, None, None)
+
+        assert seen == [None]
@@ -0,0 +1,142 @@
+"""
+Tests for ETag helpers.
+
+Tests cover:
+- If-None-Match matching rules
+- 304 responses for unchanged content
+"""
+
+from unittest.mock import MagicMock
+
+
+def make_request(if_none_match=None):
+    request = MagicMock()
+    request.headers = {"if-none-match": if_none_match} if if_none_match else {}
+    return request
+
+
+class TestEtagMatches:
+    """Tests for etag_matches function."""
+
+    def test_missing_header(self):
+        """Test no header never matches."""
+        from app.core.http import etag_matches
+
+        assert etag_matches(None, 'W/"abc"') is False
+
+    def test_weak_comparison(self):
+        """Test weak and strong forms of the same tag match."""
+        from app.core.http import etag_matches
+
+        assert etag_matches('"abc"', 'W/"abc"') is True
+        assert etag_matches('W/"xyz", W/"abc"', 'W/"abc"') is True
+        assert etag_matches('W/"xyz"', 'W/"abc"') is False
+
+    def test_wildcard(self):
+        """Test * matches any tag."""
+        from app.core.http import etag_matches
+
+        assert etag_matches("*", 'W/"abc"') is True
+
+
+class TestJsonResponseWithEtag:
+    """Tests for json_response_with_etag function."""
+
+    def test_returns_body_and_etag(self):
+        """Test the first request gets the full body and an ETag."""
+        from app.core.http import json_response_with_etag
+
+        response = json_response_with_etag(make_request(), [{"id": 1}])
+
+        assert response.status_code == 200
+        assert response.body == b'[{"id":1}]'
+        assert response.headers["etag"].startswith('W/"')
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match yields an empty 304."""
+        from app.core.http import json_response_with_etag
+
+        first = json_response_with_etag(make_request(), [{"id": 1}])
+        second = json_response_with_etag(
+            make_request(first.headers["etag"]), [{"id": 1}]
+        )
+
+        assert second.status_code == 304
+        assert second.body == b""
+        assert second.headers["etag"] == first.headers["etag"]
+
+    def test_changed_content(self):
+        """Test changed content gets a new ETag."""
+        from app.core.http import json_response_with_etag
+
+        first = json_response_with_etag(make_request(), [{"id": 1}])
+        second = json_response_with_etag(
+            make_request(first.headers["etag"]), [{"id": 2}]
+        )
+
+        assert second.status_code == 200
+        assert second.headers["etag"] != first.headers["etag"]
+
+
+class TestParseRangeHeader:
+    """Tests for parse_range_header function."""
+
+    def test_no_header(self):
+        """Test a missing header means the full body."""
+        from app.core.http import parse_range_header
+
+        assert parse_range_header(None, 100) is None
+
+    def test_explicit_range(self):
+        """Test an explicit range is clamped to the body size."""
+        from app.core.http import parse_range_header
+
+        assert parse_range_header("bytes=0-9", 100) == (0, 9)
+        assert parse_range_header("bytes=90-200", 100) == (90, 99)
+        assert parse_range_header("bytes=50-", 100) == (50, 99)
+
+    def test_suffix_range(self):
+        """Test a suffix range returns the last N bytes."""
+        from app.core.http import parse_range_header
+
+        assert parse_range_header("bytes=-10", 100) == (90, 99)
+        assert parse_range_header("bytes=-500", 100) == (0, 99)
+
+    def test_unsatisfiable(self):
+        """Test invalid or out-of-bounds ranges raise ValueError."""
+        import pytest
+
+        from app.core.http import parse_range_header
+
+        for header in ("bytes=100-", "bytes=5-1", "bytes=-", "items=0-1", "bytes=-0"):
+            with pytest.raises(ValueError):
+                parse_range_header(header, 100)
+
+
+class TestTextResponseWithRange:
+    """Tests for text_response_with_range function."""
+
+    def test_partial_content(self):
+        """Test a range request yields 206 with Content-Range."""
+        from app.core.http import text_response_with_range
+
+        request = MagicMock()
+        request.headers = {"range": "bytes=0-4"}
+
+        response = text_response_with_range(request, "hello world")
+
+        assert response.status_code == 206
+        assert response.body == b"hello"
+        assert response.headers["content-range"] == "bytes 0-4/11"
+
+    def test_not_satisfiable(self):
+        """Test an out-of-bounds range yields 416."""
+        from app.core.http import text_response_with_range
+
+        request = MagicMock()
+        request.headers = {"range": "bytes=50-"}
+
+        response = text_response_with_range(request, "hello world")
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == "bytes */11"
@@ -0,0 +1,64 @@
+"""
+Tests for the in-process metrics registry.
+"""
+
+
+class TestMetrics:
+    """Tests for Metrics."""
+
+    def test_counters(self):
+        """Test counters accumulate."""
+        from app.core.metrics import Metrics
+
+        registry = Metrics()
+        registry.increment("hits")
+        registry.increment("hits", 2)
+
+        assert registry.snapshot()["counters"] == {"hits": 3}
+
+    def test_observations(self):
+        """Test observations are summarized with percentiles."""
+        from app.core.metrics import Metrics
+
+        registry = Metrics(window=100)
+        for value in range(1, 101):
+            registry.observe("latency_ms", value)
+
+        summary = registry.snapshot()["observations"]["latency_ms"]
+        assert summary["count"] == 100
+        assert summary["avg"] == 50.5
+        assert summary["max"] == 100
+        assert summary["p50"] == 51
+        assert summary["p95"] == 96
+
+
+class TestRequireMetricsToken:
+    """Tests for the require_metrics_token dependency."""
+
+    def test_disabled_without_token(self, mock_settings):
+        """Test the endpoint is hidden when no token is configured."""
+        import pytest
+        from fastapi import HTTPException
+
+        from app.core.security import require_metrics_token
+
+        mock_settings.metrics_token = ""
+
+        with pytest.raises(HTTPException) as exc:
+            require_metrics_token("anything", mock_settings)
+        assert exc.value.status_code == 404
+
+    def test_token_checked(self, mock_settings):
+        """Test only the configured token is accepted."""
+        import pytest
+        from fastapi import HTTPException
+
+        from app.core.security import require_metrics_token
+
+        mock_settings.metrics_token = "secret"
+
+        require_metrics_token("secret", mock_settings)
+        for token in (None, "wrong"):
+            with pytest.raises(HTTPException) as exc:
+                require_metrics_token(token, mock_settings)
+            assert exc.value.status_code == 401
@@ -0,0 +1 @@
+# Router tests package
@@ -0,0 +1,323 @@
+"""
+Tests for the chat WebSocket connection.
+
+Tests cover:
+- Back-to-back messages on one material aren't blocked by the summary call
+- Closing the connection waits for started summaries
+- Failures loading a turn and invalid material ids answered with error frames
+- Chat access re-checked per message: expired JWTs and revoked entitlements
+- A subscription downgraded while the socket is open rejects the next message
+"""
+
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+
+class FakeWebSocket:
+    def __init__(self, incoming=()):
+        self.incoming = list(incoming)
+        self.frames = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def receive_json(self):
+        from fastapi import WebSocketDisconnect
+
+        # Callables run between frames, e.g. to change data mid-connection
+        while self.incoming and callable(self.incoming[0]):
+            self.incoming.pop(0)()
+        if not self.incoming:
+            raise WebSocketDisconnect()
+        return self.incoming.pop(0)
+
+    async def send_json(self, data):
+        self.frames.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+def make_entitlements(tier, token=None):
+    from app.models.subscription import Entitlements
+
+    entitlements = Entitlements(
+        tier=tier,
+        uploads_limit=10 if tier == "pro" else 1,
+        quizzes_per_material_limit=10 if tier == "pro" else 3,
+        can_use_chat=tier == "pro",
+    )
+    entitlements._token = token
+    return entitlements
+
+
+def make_socket(auth_expires_at=None):
+    from app.core.security import CurrentUser
+    from app.routers.chat import ChatSocket
+
+    return ChatSocket(
+        FakeWebSocket(), CurrentUser(id=uuid4()), MagicMock(), MagicMock(),
+        entitlement_token="token", auth_expires_at=auth_expires_at,
+    )
+
+
+def chat_patches(summary):
+    from app.routers.chat import ChatMessage
+
+    async def stream(**kwargs):
+        yield "Hello"
+
+    prepared = ({"title": "Doc"}, MagicMock(), {}, [])
+    return (
+        patch("app.routers.chat.prepare_chat_turn", AsyncMock(return_value=prepared)),
+        patch("app.routers.chat.stream_chat_response", stream),
+        patch(
+            "app.routers.chat.save_messages",
+            lambda supabase, rows: [ChatMessage(**row) for row in rows],
+        ),
+        patch("app.routers.chat.update_conversation_summary", summary),
+        patch(
+            "app.routers.chat.verify_entitlement_token",
+            return_value=make_entitlements("pro"),
+        ),
+    )
+
+
+class TestChatSocketTurns:
+    """Tests for ChatSocket turns and summaries."""
+
+    @pytest.mark.asyncio
+    async def test_back_to_back_messages_while_summarizing(self):
+        """Test a second message is answered while the first is being summarized."""
+        release = threading.Event()
+        summary = MagicMock(side_effect=lambda **kwargs: release.wait(5))
+        socket = make_socket()
+        material_id = str(uuid4())
+
+        prepare, stream, save, summarize, verify = chat_patches(summary)
+        with prepare, stream, save, summarize, verify:
+            assert await socket.start_turn(material_id, "First?", "r1")
+            await socket.turns[material_id]
+            # The summary for the first turn is still running
+            assert not socket.summaries[material_id].done()
+
+            assert await socket.start_turn(material_id, "Second?", "r2")
+            await socket.turns[material_id]
+
+            release.set()
+            await socket.close()
+
+        done = [f["request_id"] for f in socket.websocket.frames if f["type"] == "done"]
+        errors = [f for f in socket.websocket.frames if f["type"] == "error"]
+        assert done == ["r1", "r2"]
+        assert errors == []
+        # The second turn is folded in by the next summary run
+        assert summary.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_summary(self):
+        """Test closing the connection lets a started summary finish."""
+        finished = []
+        socket = make_socket()
+        material_id = str(uuid4())
+
+        def slow_summary(**kwargs):
+            threading.Event().wait(0.1)
+            finished.append(kwargs["material_id"])
+
+        prepare, stream, save, summarize, verify = chat_patches(slow_summary)
+        with prepare, stream, save, summarize, verify:
+            assert await socket.start_turn(material_id, "Question?", "r1")
+            await socket.turns[material_id]
+            await socket.close()
+
+        assert finished == [material_id]
+
+
+    @pytest.mark.asyncio
+    async def test_failed_preparation_sends_error(self):
+        """Test a database failure before streaming still answers the request."""
+        socket = make_socket()
+        material_id = str(uuid4())
+
+        with patch(
+            "app.routers.chat.prepare_chat_turn",
+            AsyncMock(side_effect=RuntimeError("connection reset")),
+        ):
+            await socket.run_turn(material_id, "Question?", "r1")
+
+        assert socket.websocket.frames == [{
+            "type": "error",
+            "material_id": material_id,
+            "request_id": "r1",
+            "detail": "Failed to load the chat",
+        }]
+
+    @pytest.mark.asyncio
+    async def test_unknown_material_sends_not_found(self):
+        """Test a material the user doesn't own is answered with an error frame."""
+        socket = make_socket()
+        socket.supabase.table.return_value.select.return_value.eq.return_value \
+            .eq.return_value.maybe_single.return_value.execute.return_value = None
+
+        with patch("app.routers.chat.get_recent_history", return_value=[]):
+            await socket.run_turn(str(uuid4()), "Question?", "r1")
+
+        assert socket.websocket.frames[-1]["type"] == "error"
+        assert socket.websocket.frames[-1]["detail"] == "Material not found"
+
+    @pytest.mark.asyncio
+    async def test_invalid_material_id_rejected(self):
+        """Test a material_id that isn't a UUID is answered without a query."""
+        from app.core.security import TokenPayload
+        from app.routers.chat import chat_websocket
+
+        websocket = FakeWebSocket([
+            {"type": "auth", "token": "jwt"},
+            {"type": "message", "material_id": "nope", "message": "Hi", "request_id": "r1"},
+        ])
+        payload = TokenPayload(sub=str(uuid4()), exp=int(time.time()) + 3600)
+        supabase = MagicMock()
+
+        with patch("app.routers.chat.decode_token", return_value=payload), \
+                patch(
+                    "app.routers.chat.resolve_entitlements",
+                    return_value=make_entitlements("pro", token="token"),
+                ):
+            await chat_websocket(websocket, settings=MagicMock(), supabase=supabase)
+
+        assert websocket.frames[-1] == {
+            "type": "error",
+            "material_id": "nope",
+            "request_id": "r1",
+            "detail": "Material not found",
+        }
+        supabase.table.assert_not_called()
+
+
+class TestChatSocketAccess:
+    """Tests for re-checking access on an open connection."""
+
+    @pytest.mark.asyncio
+    async def test_expired_jwt_rejected(self):
+        """Test no turn starts once the connection's JWT has expired."""
+        from fastapi import HTTPException
+
+        socket = make_socket(auth_expires_at=int(time.time()) - 1)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await socket.start_turn(str(uuid4()), "Question?", "r1")
+
+        assert exc_info.value.status_code == 401
+        assert socket.turns == {}
+
+    @pytest.mark.asyncio
+    async def test_revoked_entitlements_rejected(self):
+        """Test no turn starts once chat access is revoked."""
+        from fastapi import HTTPException
+
+        socket = make_socket()
+
+        with patch("app.routers.chat.verify_entitlement_token", return_value=None), \
+                patch(
+                    "app.routers.chat.resolve_entitlements",
+                    return_value=make_entitlements("free", token="free-token"),
+                ):
+            with pytest.raises(HTTPException) as exc_info:
+                await socket.start_turn(str(uuid4()), "Question?", "r1")
+
+        assert exc_info.value.status_code == 403
+        assert socket.turns == {}
+
+    @pytest.mark.asyncio
+    async def test_expired_entitlement_token_renewed(self):
+        """Test an expired entitlement token is replaced from the subscription."""
+        socket = make_socket()
+
+        with patch("app.routers.chat.verify_entitlement_token", return_value=None), \
+                patch(
+                    "app.routers.chat.resolve_entitlements",
+                    return_value=make_entitlements("pro", token="new-token"),
+                ):
+            await socket.check_access()
+
+        assert socket.entitlement_token == "new-token"
+
+    @pytest.mark.asyncio
+    async def test_socket_closed_once_revoked(self):
+        """Test the socket is closed with 4403 when a message arrives after revocation."""
+        from app.core.security import TokenPayload
+        from app.routers.chat import WS_CLOSE_FORBIDDEN, chat_websocket
+
+        websocket = FakeWebSocket([
+            {"type": "auth", "token": "jwt", "entitlement_token": "token"},
+            {"type": "message", "material_id": str(uuid4()), "message": "Hi", "request_id": "r1"},
+        ])
+        payload = TokenPayload(sub=str(uuid4()), exp=int(time.time()) + 3600)
+
+        with patch("app.routers.chat.decode_token", return_value=payload), \
+                patch(
+                    "app.routers.chat.resolve_entitlements",
+                    side_effect=[make_entitlements("pro"), make_entitlements("free")],
+                ), \
+                patch("app.routers.chat.verify_entitlement_token", return_value=None):
+            await chat_websocket(websocket, settings=MagicMock(), supabase=MagicMock())
+
+        assert websocket.frames[0]["type"] == "ready"
+        assert websocket.frames[-1]["type"] == "error"
+        assert websocket.frames[-1]["request_id"] == "r1"
+        assert websocket.close_code == WS_CLOSE_FORBIDDEN
+
+    @pytest.mark.asyncio
+    async def test_downgrade_mid_socket_rejects_next_message(self, mock_settings):
+        """Test a subscription downgraded after connect is seen by the next message."""
+        from app.core.cache import RequestCacheMiddleware, TTLCache
+        from app.core.security import TokenPayload
+        from app.routers.chat import WS_CLOSE_FORBIDDEN, chat_websocket
+
+        mock_settings.entitlement_token_secret = "test-secret"
+        mock_settings.entitlement_token_ttl_seconds = 300
+        mock_settings.free_uploads_per_week = 1
+        mock_settings.pro_uploads_per_week = 10
+        mock_settings.free_quizzes_per_material = 3
+        mock_settings.pro_quizzes_per_material = 10
+
+        user_id = uuid4()
+        row = {"id": "sub-1", "user_id": str(user_id), "status": "active"}
+        supabase = MagicMock()
+        subscription_query = (
+            supabase.table.return_value.select.return_value.eq.return_value.maybe_single.return_value
+        )
+        subscription_query.execute.side_effect = lambda: MagicMock(data=dict(row))
+
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+
+        def downgrade():
+            # Webhook on another worker dropped the shared entry; no revocation marker left
+            row["status"] = "free"
+            cache.pop(str(user_id))
+
+        websocket = FakeWebSocket([
+            {"type": "auth", "token": "jwt"},
+            downgrade,
+            {"type": "message", "material_id": str(uuid4()), "message": "Hi", "request_id": "r1"},
+        ])
+        payload = TokenPayload(sub=str(user_id), exp=int(time.time()) + 3600)
+
+        async def app(scope, receive, send):
+            await chat_websocket(websocket, settings=mock_settings, supabase=supabase)
+
+        with patch("app.routers.chat.decode_token", return_value=payload), \
+                patch("app.services.subscription.get_subscription_cache", return_value=cache), \
+                patch("app.services.entitlements.get_subscription_cache", return_value=cache), \
+                patch("app.routers.chat.verify_entitlement_token", return_value=None):
+            await RequestCacheMiddleware(app)({"type": "websocket"}, None, None)
+
+        assert websocket.frames[0]["type"] == "ready"
+        assert websocket.frames[-1]["type"] == "error"
+        assert websocket.close_code == WS_CLOSE_FORBIDDEN
@@ -0,0 +1,66 @@
+"""
+Tests for the Server-Sent Events chat stream.
+
+Tests cover:
+- A client disconnecting mid-stream still saves the user's message
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+
+class TestStreamMessage:
+    """Tests for stream_message endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_mid_stream_saves_question(self):
+        """Test cancelling the stream saves the user's message and re-raises."""
+        from app.core.security import CurrentUser
+        from app.models.subscription import Entitlements
+        from app.routers.chat import ChatSend, stream_message
+
+        first_token = asyncio.Event()
+
+        async def stream(**kwargs):
+            yield "Hel"
+            first_token.set()
+            await asyncio.sleep(10)
+            yield "lo"
+
+        prepared = ({"title": "Doc"}, MagicMock(), {}, [])
+        save = MagicMock()
+        material_id = str(uuid4())
+        entitlements = Entitlements(
+            tier="pro", uploads_limit=10, quizzes_per_material_limit=10, can_use_chat=True
+        )
+
+        with patch("app.routers.chat.prepare_chat_turn", AsyncMock(return_value=prepared)), \
+                patch("app.routers.chat.stream_chat_response", stream), \
+                patch("app.routers.chat.save_messages", save):
+            response = await stream_message(
+                material_id,
+                ChatSend(message="Hello?"),
+                current_user=CurrentUser(id=uuid4()),
+                entitlements=entitlements,
+                supabase=MagicMock(),
+            )
+            chunks = []
+
+            async def consume():
+                async for chunk in response.body_iterator:
+                    chunks.append(chunk)
+
+            task = asyncio.create_task(consume())
+            await first_token.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert len(chunks) == 2  # user_message and the first token
+        save.assert_called_once()
+        rows = save.call_args[0][1]
+        assert [row["role"] for row in rows] == ["user"]
+        assert rows[0]["content"] == "Hello?"
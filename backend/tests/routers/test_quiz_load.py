@@ -0,0 +1,123 @@
+"""
+Load test for quiz creation.
+
+Tests cover:
+- Other endpoints stay responsive while many quizzes are being generated,
+  with a database client that blocks its thread like the real one
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# Simulated LLM latency per quiz
+GENERATION_SECONDS = 0.3
+CONCURRENT_QUIZZES = 20
+# Simulated database round trip; the supabase client blocks its thread
+QUERY_SECONDS = 0.05
+
+
+def blocking_execute(data):
+    def execute():
+        time.sleep(QUERY_SECONDS)
+        return MagicMock(data=data)
+    return execute
+
+
+def blocking_reserve(*args, **kwargs):
+    time.sleep(QUERY_SECONDS)
+    return (True, 1, 10)
+
+
+def make_app(mock_settings):
+    from app.core.config import get_settings
+    from app.core.security import CurrentUser, get_current_user, get_supabase_client
+    from app.models.subscription import Entitlements
+    from app.routers import quizzes
+    from app.services.entitlements import get_entitlements
+
+    app = FastAPI()
+    app.include_router(quizzes.router)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    material_id = str(uuid4())
+    supabase = MagicMock()
+    material_query = supabase.table.return_value.select.return_value.eq.return_value.eq.return_value
+    material_query.single.return_value.execute.side_effect = blocking_execute({
+        "id": material_id,
+        "processed_text": "Some text",
+        "processing_status": "completed",
+    })
+    # No quiz seeds
+    material_query.is_.return_value.execute.side_effect = blocking_execute([])
+    # Empty quiz pool: every request generates
+    supabase.rpc.return_value.execute.side_effect = blocking_execute([])
+    supabase.table.return_value.insert.return_value.execute.side_effect = blocking_execute([{
+        "id": str(uuid4()),
+        "material_id": material_id,
+        "questions": [],
+        "total_questions": 0,
+        "created_at": "2024-01-01T00:00:00+00:00",
+    }])
+
+    user = CurrentUser(id=uuid4())
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_supabase_client] = lambda: supabase
+    app.dependency_overrides[get_settings] = lambda: mock_settings
+    app.dependency_overrides[get_entitlements] = lambda: Entitlements(
+        tier="pro", uploads_limit=10, quizzes_per_material_limit=10, can_use_chat=True
+    )
+    return app, material_id
+
+
+async def slow_generate_quiz(text, num_questions=5):
+    await asyncio.sleep(GENERATION_SECONDS)
+    return []
+
+
+class TestQuizGenerationLoad:
+    """Event-loop responsiveness under concurrent quiz generation."""
+
+    @pytest.mark.asyncio
+    async def test_other_endpoints_stay_fast(self, mock_settings):
+        """Test ping latency stays flat while quizzes are generated."""
+        app, material_id = make_app(mock_settings)
+
+        with patch("app.routers.quizzes.reserve_quiz_slot", side_effect=blocking_reserve), \
+                patch("app.routers.quizzes.refill_quiz_pool"), \
+                patch("app.routers.quizzes.generate_quiz", side_effect=slow_generate_quiz):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+                async def create_quiz():
+                    response = await client.post("/quizzes", json={"material_id": material_id})
+                    assert response.status_code == 200
+
+                async def measure_pings():
+                    latencies = []
+                    for _ in range(10):
+                        started = time.perf_counter()
+                        response = await client.get("/ping")
+                        latencies.append(time.perf_counter() - started)
+                        assert response.status_code == 200
+                        await asyncio.sleep(GENERATION_SECONDS / 10)
+                    return latencies
+
+                started = time.perf_counter()
+                quiz_tasks = [asyncio.create_task(create_quiz()) for _ in range(CONCURRENT_QUIZZES)]
+                latencies = await measure_pings()
+                await asyncio.gather(*quiz_tasks)
+                elapsed = time.perf_counter() - started
+
+        # Generations overlap instead of running one after another
+        assert elapsed < CONCURRENT_QUIZZES * GENERATION_SECONDS / 2
+        # A blocked loop would delay pings by a whole generation
+        assert max(latencies) < GENERATION_SECONDS / 2
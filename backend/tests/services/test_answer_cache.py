@@ -0,0 +1,73 @@
+"""
+Tests for the chat answer cache.
+
+Tests cover:
+- Question normalization
+- Exact and near-duplicate lookups
+- Per-material bounds
+"""
+
+
+class TestNormalizeQuestion:
+    """Tests for normalize_question function."""
+
+    def test_case_punctuation_whitespace(self):
+        """Test trivially different phrasings normalize to the same key."""
+        from app.services.answer_cache import normalize_question
+
+        assert normalize_question("  Summarize   THIS?! ") == "summarize this"
+
+
+class TestAnswerCache:
+    """Tests for AnswerCache."""
+
+    def test_exact_match(self):
+        """Test answers are keyed by content hash and normalized question."""
+        from app.services.answer_cache import AnswerCache
+
+        cache = AnswerCache(max_materials=10, ttl_seconds=60)
+        cache.set("hash-a", "What does photosynthesis mean?", "Answer")
+
+        assert cache.get("hash-a", "what does photosynthesis mean") == "Answer"
+        assert cache.get("hash-b", "What does photosynthesis mean?") is None
+        assert cache.get("hash-a", "What does respiration mean?") is None
+
+    def test_similarity_threshold(self):
+        """Test near-duplicate questions hit only when a threshold is set."""
+        from app.services.answer_cache import AnswerCache
+
+        exact_only = AnswerCache(max_materials=10, ttl_seconds=60)
+        similar = AnswerCache(max_materials=10, ttl_seconds=60, similarity_threshold=0.8)
+        for cache in (exact_only, similar):
+            cache.set("hash", "Summarize the main ideas of the text", "Summary")
+
+        question = "Please summarize the main ideas of this text"
+        assert exact_only.get("hash", question) is None
+        assert similar.get("hash", question) == "Summary"
+        assert similar.get("hash", "Who wrote the text?") is None
+
+    def test_stats_recorded(self):
+        """Test hits and misses are counted in metrics."""
+        from app.core.metrics import metrics
+        from app.services.answer_cache import AnswerCache
+
+        metrics.reset()
+        cache = AnswerCache(max_materials=10, ttl_seconds=60)
+        cache.set("hash", "question", "answer")
+        cache.get("hash", "question")
+        cache.get("hash", "other")
+
+        counters = metrics.snapshot()["counters"]
+        assert counters["chat.answer_cache.hits"] == 1
+        assert counters["chat.answer_cache.misses"] == 1
+
+    def test_answers_per_material_bounded(self):
+        """Test the oldest answers of a material are dropped first."""
+        from app.services.answer_cache import MAX_ANSWERS_PER_MATERIAL, AnswerCache
+
+        cache = AnswerCache(max_materials=10, ttl_seconds=60)
+        for i in range(MAX_ANSWERS_PER_MATERIAL + 1):
+            cache.set("hash", f"question {i}", f"answer {i}")
+
+        assert cache.get("hash", "question 0") is None
+        assert cache.get("hash", f"question {MAX_ANSWERS_PER_MATERIAL}") is not None
@@ -0,0 +1,291 @@
+"""
+Tests for the chat service.
+
+Tests cover:
+- Prompt/message construction and the static cacheable prefix
+- Cached-token usage metrics
+- First-turn answer caching, per material content and title
+- Token streaming, time-to-first-token metric and upstream cancellation
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+def make_chunk(content):
+    """Build a streamed completion chunk with a content delta."""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    chunk.usage = None
+    return chunk
+
+
+class FakeStream:
+    """Async iterable standing in for openai.AsyncStream."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.close = AsyncMock()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def make_answer_cache():
+    from app.services.answer_cache import AnswerCache
+
+    return AnswerCache(max_materials=10, ttl_seconds=60)
+
+
+def make_async_client(stream):
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=stream)
+    return client
+
+
+class TestBuildChatMessages:
+    """Tests for build_chat_messages function."""
+
+    def test_history_is_limited(self):
+        """Test only the last 10 history messages are sent."""
+        from app.services.chat import build_chat_messages
+
+        history = [{"role": "user", "content": f"msg {i}"} for i in range(15)]
+        messages = build_chat_messages(["passage"], "Title", history, "question")
+
+        assert messages[0]["role"] == "system"
+        assert "Title" in messages[0]["content"]
+        assert "passage" in messages[1]["content"]
+        assert len(messages) == 13
+        assert messages[2]["content"] == "msg 5"
+        assert messages[-1] == {"role": "user", "content": "question"}
+
+    def test_summary_in_system_prompt(self):
+        """Test the running summary is included in the system prompt."""
+        from app.services.chat import build_chat_messages
+
+        messages = build_chat_messages(
+            ["passage"], "Title", [], "question", summary="User asked about X."
+        )
+
+        assert "User asked about X." in messages[1]["content"]
+        assert "User asked about X." not in messages[0]["content"]
+
+    def test_static_prefix_identical_across_turns(self):
+        """Test the first message only depends on the material."""
+        from app.services.chat import build_chat_messages
+
+        first = build_chat_messages(
+            ["passage a"], "Title", [], "question 1", overview="Intro text."
+        )
+        second = build_chat_messages(
+            ["passage b"], "Title",
+            [{"role": "user", "content": "question 1"}],
+            "question 2", summary="Summary.", overview="Intro text.",
+            token_budget=3000,
+        )
+
+        assert first[0] == second[0]
+        assert first[0]["content"].startswith("You are a helpful tutor")
+        assert "Intro text." in first[0]["content"]
+
+    def test_passages_in_overview_not_repeated(self):
+        """Test retrieved passages already in the overview are skipped."""
+        from app.services.chat import build_chat_messages
+
+        messages = build_chat_messages(
+            ["Intro text.", "Later passage."], "Title", [], "question",
+            overview="Intro text.",
+        )
+
+        assert "Intro text." not in messages[1]["content"]
+        assert "Later passage." in messages[1]["content"]
+
+    def test_token_budget_bounds_prompt(self):
+        """Test the prompt stays within budget however long the history is."""
+        from app.services.chat import build_chat_messages, estimate_tokens
+
+        history = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": "word " * 500}
+            for i in range(10)
+        ]
+        passages = ["passage " * 100 for _ in range(4)]
+
+        messages = build_chat_messages(
+            passages, "Title", history, "question", summary="Summary.",
+            token_budget=1500,
+        )
+
+        total = sum(estimate_tokens(m["content"]) for m in messages)
+        assert total <= 1500
+        assert messages[-1] == {"role": "user", "content": "question"}
+        assert "Summary." in messages[1]["content"]
+        # Oldest history is dropped first
+        kept_history = messages[2:-1]
+        assert len(kept_history) < len(history)
+
+    def test_huge_user_message_is_truncated(self):
+        """Test an oversized user message is capped to its share of the budget."""
+        from app.services.chat import build_chat_messages, estimate_tokens
+
+        messages = build_chat_messages(
+            [], "Title", [], "x" * 100000, token_budget=1000
+        )
+
+        assert estimate_tokens(messages[-1]["content"]) <= 251
+
+
+class TestBuildRetrievalQuery:
+    """Tests for build_retrieval_query function."""
+
+    def test_includes_previous_question(self):
+        """Test follow-up questions are expanded with the previous user turn."""
+        from app.services.chat import build_retrieval_query
+
+        history = [
+            {"role": "user", "content": "What is photosynthesis?"},
+            {"role": "assistant", "content": "It is..."},
+        ]
+
+        assert build_retrieval_query(history, "Explain more") == (
+            "What is photosynthesis? Explain more"
+        )
+
+
+class TestRecordUsage:
+    """Tests for record_usage function."""
+
+    def test_cached_token_ratio(self):
+        """Test cached prompt tokens are tracked as totals and a ratio."""
+        from app.core.metrics import metrics
+        from app.services.chat import record_usage
+
+        metrics.reset()
+        usage = MagicMock(prompt_tokens=2000)
+        usage.prompt_tokens_details.cached_tokens = 1500
+
+        record_usage(usage)
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["chat.prompt_tokens_total"] == 2000
+        assert snapshot["counters"]["chat.cached_tokens_total"] == 1500
+        assert snapshot["observations"]["chat.cached_token_ratio"]["avg"] == 0.75
+
+    def test_missing_details(self):
+        """Test usage without prompt token details counts as uncached."""
+        from app.core.metrics import metrics
+        from app.services.chat import record_usage
+
+        metrics.reset()
+        usage = MagicMock(prompt_tokens=100, prompt_tokens_details=None)
+
+        record_usage(usage)
+
+        assert metrics.snapshot()["counters"]["chat.cached_tokens_total"] == 0
+
+
+class TestStreamChatResponse:
+    """Tests for stream_chat_response function."""
+
+    @pytest.mark.asyncio
+    async def test_yields_deltas_and_records_ttft(self, mock_settings):
+        """Test content deltas are yielded in order and TTFT is recorded."""
+        from app.core.metrics import metrics
+        from app.services.chat import stream_chat_response
+        from app.services.retrieval import MaterialIndex
+
+        metrics.reset()
+        mock_settings.chat_context_chunks = 4
+        mock_settings.chat_prompt_token_budget = 3000
+        mock_settings.chat_static_context_chars = 4000
+        stream = FakeStream([make_chunk("Hel"), make_chunk(None), make_chunk("lo")])
+
+        with patch("app.services.chat.get_settings", return_value=mock_settings), \
+                patch("app.services.chat.get_answer_cache", return_value=make_answer_cache()), \
+                patch("app.services.chat.AsyncOpenAI", return_value=make_async_client(stream)):
+            generator = stream_chat_response(MaterialIndex(["text"]), "Title", [], "hi")
+            deltas = [d async for d in generator]
+
+        assert deltas == ["Hel", "lo"]
+        assert metrics.snapshot()["observations"]["chat.ttft_ms"]["count"] == 1
+        stream.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_early_close_closes_upstream(self, mock_settings):
+        """Test abandoning the generator closes the upstream stream."""
+        from app.services.chat import stream_chat_response
+        from app.services.retrieval import MaterialIndex
+
+        mock_settings.chat_context_chunks = 4
+        mock_settings.chat_prompt_token_budget = 3000
+        mock_settings.chat_static_context_chars = 4000
+        stream = FakeStream([make_chunk("a"), make_chunk("b"), make_chunk("c")])
+
+        with patch("app.services.chat.get_settings", return_value=mock_settings), \
+                patch("app.services.chat.get_answer_cache", return_value=make_answer_cache()), \
+                patch("app.services.chat.AsyncOpenAI", return_value=make_async_client(stream)):
+            generator = stream_chat_response(MaterialIndex(["text"]), "Title", [], "hi")
+            assert await generator.__anext__() == "a"
+            await generator.aclose()
+
+        stream.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_first_turn_answer_cached(self, mock_settings):
+        """Test a repeated first question is served without calling the model."""
+        from app.services.chat import stream_chat_response
+        from app.services.retrieval import MaterialIndex
+
+        mock_settings.chat_context_chunks = 4
+        mock_settings.chat_prompt_token_budget = 3000
+        mock_settings.chat_static_context_chars = 4000
+        client = make_async_client(FakeStream([make_chunk("Sum"), make_chunk("mary")]))
+
+        with patch("app.services.chat.get_settings", return_value=mock_settings), \
+                patch("app.services.chat.get_answer_cache", return_value=make_answer_cache()), \
+                patch("app.services.chat.AsyncOpenAI", return_value=client):
+            first = [d async for d in stream_chat_response(
+                MaterialIndex(["text"]), "Title", [], "Summarize this!"
+            )]
+            second = [d async for d in stream_chat_response(
+                MaterialIndex(["text"]), "Title", [], "summarize this"
+            )]
+
+        assert first == ["Sum", "mary"]
+        assert second == ["Summary"]
+        client.chat.completions.create.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cached_answer_not_shared_across_titles(self, mock_settings):
+        """Test the same text under another title isn't answered from the cache."""
+        from app.services.chat import stream_chat_response
+        from app.services.retrieval import MaterialIndex
+
+        mock_settings.chat_context_chunks = 4
+        mock_settings.chat_prompt_token_budget = 3000
+        mock_settings.chat_static_context_chars = 4000
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=[
+            FakeStream([make_chunk("About Mine")]),
+            FakeStream([make_chunk("About Theirs")]),
+        ])
+
+        with patch("app.services.chat.get_settings", return_value=mock_settings), \
+                patch("app.services.chat.get_answer_cache", return_value=make_answer_cache()), \
+                patch("app.services.chat.AsyncOpenAI", return_value=client):
+            first = [d async for d in stream_chat_response(
+                MaterialIndex(["text"]), "Mine", [], "Summarize this!"
+            )]
+            second = [d async for d in stream_chat_response(
+                MaterialIndex(["text"]), "Theirs", [], "Summarize this!"
+            )]
+
+        assert first == ["About Mine"]
+        assert second == ["About Theirs"]
+        assert client.chat.completions.create.await_count == 2
@@ -0,0 +1,83 @@
+"""
+Tests for running chat summaries.
+
+Tests cover:
+- Skipping work while the conversation fits the recent window
+- Folding older messages and advancing the watermark
+"""
+
+from unittest.mock import MagicMock, patch
+
+
+def make_supabase(summary_row, messages):
+    """Build a mock Supabase client for chat_summaries/chat_messages."""
+    supabase = MagicMock()
+    tables = {}
+
+    def table(name):
+        if name not in tables:
+            query = MagicMock()
+            for method in ("select", "eq", "gt", "order", "limit", "maybe_single", "upsert"):
+                getattr(query, method).return_value = query
+            data = summary_row if name == "chat_summaries" else messages
+            query.execute.return_value = MagicMock(data=data)
+            tables[name] = query
+        return tables[name]
+
+    supabase.table.side_effect = table
+    return supabase, tables
+
+
+def make_messages(n):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i}",
+            "created_at": f"2026-01-01T00:00:{i:02d}+00:00",
+        }
+        for i in range(n)
+    ]
+
+
+class TestUpdateConversationSummary:
+    """Tests for update_conversation_summary function."""
+
+    def test_short_conversation_is_not_summarized(self, mock_settings):
+        """Test nothing happens while all messages are in the recent window."""
+        from app.services.chat_summary import update_conversation_summary
+
+        mock_settings.chat_recent_messages = 4
+        supabase, tables = make_supabase(None, make_messages(4))
+
+        with patch("app.services.chat_summary.get_settings", return_value=mock_settings), \
+                patch("app.services.chat_summary.OpenAI") as openai_cls:
+            update_conversation_summary("material-1", "user-1", "Title", supabase)
+
+        openai_cls.assert_not_called()
+        tables["chat_summaries"].upsert.assert_not_called()
+
+    def test_older_messages_are_folded(self, mock_settings):
+        """Test messages outside the window are summarized and the watermark advances."""
+        from app.services.chat_summary import update_conversation_summary
+
+        mock_settings.chat_recent_messages = 4
+        messages = make_messages(6)
+        supabase, tables = make_supabase(
+            {"summary": "Old summary.", "summarized_until": "2025-12-31T00:00:00+00:00"},
+            messages,
+        )
+
+        with patch("app.services.chat_summary.get_settings", return_value=mock_settings), \
+                patch("app.services.chat_summary.summarize_conversation",
+                      return_value="New summary.") as summarize, \
+                patch("app.services.chat_summary.OpenAI"):
+            update_conversation_summary("material-1", "user-1", "Title", supabase)
+
+        assert summarize.call_args.args[2] == "Old summary."
+        assert summarize.call_args.args[3] == messages[:2]
+        tables["chat_messages"].gt.assert_called_once_with(
+            "created_at", "2025-12-31T00:00:00+00:00"
+        )
+        upserted = tables["chat_summaries"].upsert.call_args.args[0]
+        assert upserted["summary"] == "New summary."
+        assert upserted["summarized_until"] == messages[1]["created_at"]
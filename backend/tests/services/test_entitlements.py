@@ -0,0 +1,218 @@
+"""
+Tests for signed entitlement tokens.
+
+Tests cover:
+- Issuing and verifying tokens in-process
+- Rejecting tokens for other users, expired or revoked tokens
+- Revoking by subscription version, including tokens signed after the revoke
+- Resolving entitlements without a subscription lookup
+"""
+
+import time
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+
+# Subscription versions (updated_at), oldest first
+V1 = "2026-01-20T10:00:00+00:00"
+V2 = "2026-01-20T10:05:00.123456+00:00"
+V3 = "2026-01-20T10:09:00+00:00"
+
+
+def make_settings(mock_settings):
+    mock_settings.entitlement_token_secret = "test-secret"
+    mock_settings.entitlement_token_ttl_seconds = 300
+    mock_settings.free_uploads_per_week = 1
+    mock_settings.pro_uploads_per_week = 10
+    mock_settings.free_quizzes_per_material = 3
+    mock_settings.pro_quizzes_per_material = 10
+    return mock_settings
+
+
+def patch_subscription_cache():
+    from app.core.cache import TTLCache
+
+    return patch(
+        "app.services.entitlements.get_subscription_cache",
+        return_value=TTLCache(max_size=10, ttl_seconds=60),
+    )
+
+
+def pro_entitlements():
+    from app.models.subscription import Entitlements
+
+    return Entitlements(
+        tier="pro", uploads_limit=10, quizzes_per_material_limit=10, can_use_chat=True
+    )
+
+
+class TestEntitlementToken:
+    """Tests for issue_entitlement_token and verify_entitlement_token."""
+
+    def test_round_trip(self, mock_settings):
+        """Test a token verifies to the entitlements it was issued with."""
+        from app.services.entitlements import issue_entitlement_token, verify_entitlement_token
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+        token = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+
+        with patch_subscription_cache():
+            assert verify_entitlement_token(token, user_id, settings) == pro_entitlements()
+
+    def test_other_user_rejected(self, mock_settings):
+        """Test a token can't be used by another user."""
+        from app.services.entitlements import issue_entitlement_token, verify_entitlement_token
+
+        settings = make_settings(mock_settings)
+        token = issue_entitlement_token(uuid4(), pro_entitlements(), V1, settings)
+
+        with patch_subscription_cache():
+            assert verify_entitlement_token(token, uuid4(), settings) is None
+
+    def test_expired_or_tampered_rejected(self, mock_settings):
+        """Test expired tokens and tokens signed with another key are rejected."""
+        from app.services.entitlements import issue_entitlement_token, verify_entitlement_token
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+        with patch("app.services.entitlements.time.time", return_value=time.time() - 600):
+            expired = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+        settings.entitlement_token_secret = "other-secret"
+        forged = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+        settings.entitlement_token_secret = "test-secret"
+
+        with patch_subscription_cache():
+            assert verify_entitlement_token(expired, user_id, settings) is None
+            assert verify_entitlement_token(forged, user_id, settings) is None
+
+    def test_revoked_rejected(self, mock_settings):
+        """Test tokens from before a webhook change are rejected, newer ones accepted."""
+        from app.services.entitlements import (
+            issue_entitlement_token,
+            revoke_entitlements,
+            verify_entitlement_token,
+        )
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+        old_token = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+
+        with patch_subscription_cache(), \
+                patch("app.services.entitlements.get_settings", return_value=settings):
+            revoke_entitlements(user_id, V2)
+            new_token = issue_entitlement_token(user_id, pro_entitlements(), V2, settings)
+
+            assert verify_entitlement_token(old_token, user_id, settings) is None
+            assert verify_entitlement_token(new_token, user_id, settings) is not None
+
+    def test_stale_token_signed_after_revoke(self, mock_settings):
+        """Test a token signed after the revoke from an old subscription read is rejected."""
+        from app.services.entitlements import (
+            issue_entitlement_token,
+            revoke_entitlements,
+            verify_entitlement_token,
+        )
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+
+        with patch_subscription_cache(), \
+                patch("app.services.entitlements.get_settings", return_value=settings):
+            revoke_entitlements(user_id, V2)
+            # Issued later, but from the subscription as it was before
+            with patch("app.services.entitlements.time.time", return_value=time.time() + 5):
+                late_token = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+
+            assert verify_entitlement_token(late_token, user_id, settings) is None
+
+    def test_out_of_order_revoke_keeps_newest(self, mock_settings):
+        """Test an older webhook arriving late doesn't re-admit revoked tokens."""
+        from app.services.entitlements import (
+            issue_entitlement_token,
+            revoke_entitlements,
+            verify_entitlement_token,
+        )
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+        token = issue_entitlement_token(user_id, pro_entitlements(), V2, settings)
+
+        with patch_subscription_cache(), \
+                patch("app.services.entitlements.get_settings", return_value=settings):
+            revoke_entitlements(user_id, V3)
+            revoke_entitlements(user_id, V1)
+
+            assert verify_entitlement_token(token, user_id, settings) is None
+
+
+class TestResolveEntitlements:
+    """Tests for resolve_entitlements function."""
+
+    def test_valid_token_skips_lookup(self, mock_settings):
+        """Test a valid token answers without touching the subscription."""
+        from app.services.entitlements import issue_entitlement_token, resolve_entitlements
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+        token = issue_entitlement_token(user_id, pro_entitlements(), V1, settings)
+        supabase = MagicMock()
+
+        with patch_subscription_cache(), \
+                patch("app.services.entitlements.get_or_create_subscription") as lookup:
+            entitlements = resolve_entitlements(user_id, token, supabase, settings)
+
+        assert entitlements.can_use_chat
+        assert entitlements._token is None
+        lookup.assert_not_called()
+
+    def test_missing_token_issues_one(self, mock_settings):
+        """Test the subscription is looked up and a fresh token issued without one."""
+        from app.services.entitlements import resolve_entitlements, verify_entitlement_token
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+
+        with patch_subscription_cache(), \
+                patch(
+                    "app.services.entitlements.get_or_create_subscription",
+                    return_value={"status": "free", "updated_at": V1},
+                ):
+            entitlements = resolve_entitlements(user_id, None, MagicMock(), settings)
+            reissued = verify_entitlement_token(entitlements._token, user_id, settings)
+
+        assert entitlements.tier == "free"
+        assert entitlements.quizzes_per_material_limit == 3
+        assert not entitlements.can_use_chat
+        assert reissued.model_dump() == entitlements.model_dump()
+
+    def test_stale_cached_subscription_refetched(self, mock_settings):
+        """Test a cached subscription older than the revocation is read again."""
+        from app.services.entitlements import (
+            resolve_entitlements,
+            revoke_entitlements,
+            verify_entitlement_token,
+        )
+
+        settings = make_settings(mock_settings)
+        user_id = uuid4()
+
+        with patch_subscription_cache(), \
+                patch("app.services.entitlements.get_settings", return_value=settings), \
+                patch(
+                    "app.services.entitlements.get_or_create_subscription",
+                    return_value={"status": "free", "updated_at": V1},
+                ), \
+                patch(
+                    "app.services.entitlements.fetch_or_create_subscription",
+                    return_value={"status": "active", "updated_at": V2},
+                ) as fetch, \
+                patch("app.services.entitlements.remember_subscription") as remember:
+            revoke_entitlements(user_id, V2)
+            entitlements = resolve_entitlements(user_id, None, MagicMock(), settings)
+            reissued = verify_entitlement_token(entitlements._token, user_id, settings)
+
+        assert entitlements.tier == "pro"
+        assert reissued is not None
+        fetch.assert_called_once()
+        remember.assert_called_once_with(user_id, {"status": "active", "updated_at": V2})
@@ -0,0 +1,85 @@
+"""
+Tests for the flashcard quiz engine.
+
+Tests cover:
+- Definition, cloze and translation questions
+- Distractors from the user's other cards
+- Falling back when cards lack data
+"""
+
+import random
+
+
+def make_card(term, translation, definition=None, context=None):
+    return {
+        "term": term,
+        "translation": translation,
+        "definition": definition or f"Meaning of {term}",
+        "context_original": context or f"A sentence with {term} in it.",
+    }
+
+
+CARDS = [make_card(t, tr) for t, tr in [
+    ("apple", "manzana"), ("house", "casa"), ("dog", "perro"),
+    ("cat", "gato"), ("book", "libro"), ("tree", "árbol"),
+]]
+
+
+class TestBuildFlashcardQuiz:
+    """Tests for build_flashcard_quiz function."""
+
+    def test_question_shape(self):
+        """Test questions validate as QuizQuestion and rotate through types."""
+        from app.routers.quizzes import QuizQuestion
+        from app.services.flashcard_quiz import build_flashcard_quiz
+
+        questions = build_flashcard_quiz(CARDS, [], 6, rng=random.Random(1))
+
+        assert len(questions) == 6
+        for question in questions:
+            QuizQuestion(**question)
+        assert {q["question_type"] for q in questions} == {"multiple_choice", "fill_blank"}
+
+    def test_multiple_choice_has_one_correct_option(self):
+        """Test options hold the answer once plus distinct distractors."""
+        from app.services.flashcard_quiz import CHOICES_PER_QUESTION, build_flashcard_quiz
+
+        questions = build_flashcard_quiz(CARDS, [], 6, rng=random.Random(2))
+
+        for question in questions:
+            if question["question_type"] != "multiple_choice":
+                continue
+            texts = [o["text"] for o in question["options"]]
+            assert len(texts) == CHOICES_PER_QUESTION == len(set(texts))
+            correct = [o["text"] for o in question["options"] if o["is_correct"]]
+            assert correct == [question["correct_answer"]]
+
+    def test_cloze_blanks_term(self):
+        """Test the term is blanked out of its context as a whole word."""
+        from app.services.flashcard_quiz import BLANK, cloze_question
+
+        card = make_card("cat", "gato", context="The Cat sat on a catalogue.")
+        question = cloze_question(card, [], random.Random(0))
+
+        assert question["question"] == f"The {BLANK} sat on a catalogue."
+        assert question["correct_answer"] == "cat"
+
+    def test_distractors_from_other_cards(self):
+        """Test a material with few cards borrows wrong answers from other cards."""
+        from app.services.flashcard_quiz import translation_question
+
+        card = make_card("apple", "manzana")
+        other = [make_card("x", "uno"), make_card("y", "dos"), make_card("z", "tres")]
+
+        question = translation_question(card, [card] + other, random.Random(0))
+
+        assert {o["text"] for o in question["options"]} == {"manzana", "uno", "dos", "tres"}
+
+    def test_falls_back_without_distractors(self):
+        """Test cards fall through to cloze when there are too few distractors."""
+        from app.services.flashcard_quiz import build_flashcard_quiz
+
+        questions = build_flashcard_quiz(CARDS[:2], [], 5, rng=random.Random(0))
+
+        assert len(questions) == 2
+        assert all(q["question_type"] == "fill_blank" for q in questions)
@@ -0,0 +1,186 @@
+"""
+Tests for keyset pagination helpers.
+
+Tests cover:
+- Cursor encoding round trip and validation
+- Parsing Postgres timestamps with any fractional precision
+- Page trimming and next cursor computation
+- fields= projection parsing
+- Keyset filter construction on a PostgREST query
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestParseTimestamp:
+    """Tests for parse_timestamp function."""
+
+    def test_postgres_formats(self):
+        """Test trimmed fractions, "Z" and hour-only offsets all parse."""
+        from datetime import datetime, timezone
+
+        from app.services.pagination import parse_timestamp
+
+        expected = datetime(2026, 1, 20, 10, 0, 0, 123450, tzinfo=timezone.utc)
+        assert parse_timestamp("2026-01-20T10:00:00.12345+00:00") == expected
+        assert parse_timestamp("2026-01-20T10:00:00.12345Z") == expected
+        assert parse_timestamp("2026-01-20 10:00:00.12345+00") == expected
+        assert parse_timestamp("2026-01-20T10:00:00.1234567+00:00").microsecond == 123456
+        assert parse_timestamp("2026-01-20") == datetime(2026, 1, 20)
+
+    def test_invalid(self):
+        """Test non-timestamps raise ValueError."""
+        from app.services.pagination import parse_timestamp
+
+        with pytest.raises(ValueError):
+            parse_timestamp("not a date")
+
+
+class TestCursor:
+    """Tests for encode_cursor / decode_cursor."""
+
+    def test_round_trip(self):
+        """Test a cursor decodes to the position it was built from."""
+        from app.services.pagination import decode_cursor, encode_cursor
+
+        created_at = "2026-01-20T10:00:00.123456+00:00"
+        row_id = "3f1c2d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f"
+
+        cursor = encode_cursor(created_at, row_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (created_at, row_id)
+
+    def test_invalid_base64(self):
+        """Test garbage input raises ValueError."""
+        from app.services.pagination import decode_cursor
+
+        with pytest.raises(ValueError):
+            decode_cursor("!!!not-a-cursor!!!")
+
+    def test_rejects_injected_values(self):
+        """Test cursors carrying non-timestamp/non-uuid values are rejected."""
+        from app.services.pagination import decode_cursor, encode_cursor
+
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor("2026-01-20", "x),id.neq.0"))
+        with pytest.raises(ValueError):
+            decode_cursor(
+                encode_cursor('2026"),or(', "3f1c2d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f")
+            )
+
+
+class TestPaginateRows:
+    """Tests for paginate_rows function."""
+
+    def test_last_page_has_no_cursor(self):
+        """Test a short result is returned as-is without next cursor."""
+        from app.services.pagination import paginate_rows
+
+        rows = [{"id": "a", "created_at": "2026-01-01T00:00:00+00:00"}]
+        page, next_cursor = paginate_rows(rows, limit=2)
+
+        assert page == rows
+        assert next_cursor is None
+
+    def test_extra_row_yields_cursor(self):
+        """Test the lookahead row is dropped and the cursor points at the last kept row."""
+        from app.services.pagination import decode_cursor, paginate_rows
+
+        ids = [
+            "00000000-0000-0000-0000-000000000003",
+            "00000000-0000-0000-0000-000000000002",
+            "00000000-0000-0000-0000-000000000001",
+        ]
+        rows = [
+            {"id": row_id, "created_at": "2026-01-01T00:00:00+00:00"} for row_id in ids
+        ]
+
+        page, next_cursor = paginate_rows(rows, limit=2)
+
+        assert [r["id"] for r in page] == ids[:2]
+        assert decode_cursor(next_cursor) == ("2026-01-01T00:00:00+00:00", ids[1])
+
+
+class TestParseFields:
+    """Tests for parse_fields function."""
+
+    def test_none_means_default(self):
+        """Test an empty projection returns None."""
+        from app.services.pagination import parse_fields
+
+        assert parse_fields(None, ["id", "term"], ["id"]) is None
+        assert parse_fields("", ["id", "term"], ["id"]) is None
+
+    def test_required_fields_are_added(self):
+        """Test keyset columns are always included once."""
+        from app.services.pagination import parse_fields
+
+        columns = parse_fields(
+            "term, id,translation", ["id", "created_at", "term", "translation"],
+            ["id", "created_at"],
+        )
+
+        assert columns == ["id", "created_at", "term", "translation"]
+
+    def test_unknown_field(self):
+        """Test unknown columns are rejected."""
+        from app.services.pagination import parse_fields
+
+        with pytest.raises(ValueError, match="secret"):
+            parse_fields("term,secret", ["id", "term"], ["id"])
+
+
+class TestApplyKeyset:
+    """Tests for apply_keyset function."""
+
+    def test_without_cursor_only_orders(self):
+        """Test the first page is only ordered by the composite key."""
+        from app.services.pagination import apply_keyset
+
+        query = MagicMock()
+        query.order.return_value = query
+
+        apply_keyset(query, None, desc=True)
+
+        query.or_.assert_not_called()
+        assert [c.args[0] for c in query.order.call_args_list] == ["created_at", "id"]
+
+    def test_with_cursor_filters_after_position(self):
+        """Test a cursor adds a strict tuple comparison filter."""
+        from app.services.pagination import apply_keyset, encode_cursor
+
+        query = MagicMock()
+        query.or_.return_value = query
+        query.order.return_value = query
+        row_id = "3f1c2d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f"
+        cursor = encode_cursor("2026-01-20T10:00:00+00:00", row_id)
+
+        apply_keyset(query, cursor, desc=False)
+
+        query.or_.assert_called_once_with(
+            'created_at.gt."2026-01-20T10:00:00+00:00",'
+            f'and(created_at.eq."2026-01-20T10:00:00+00:00",id.gt.{row_id})',
+            reference_table=None,
+        )
+
+    def test_reference_table(self):
+        """Test embedded resources are filtered and ordered on their own keys."""
+        from app.services.pagination import apply_keyset, encode_cursor
+
+        query = MagicMock()
+        query.or_.return_value = query
+        query.order.return_value = query
+        cursor = encode_cursor(
+            "2026-01-20T10:00:00+00:00", "3f1c2d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f"
+        )
+
+        apply_keyset(query, cursor, desc=False, reference_table="flashcards")
+
+        assert query.or_.call_args.kwargs["reference_table"] == "flashcards"
+        assert all(
+            c.kwargs["foreign_table"] == "flashcards"
+            for c in query.order.call_args_list
+        )
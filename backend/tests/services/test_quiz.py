@@ -0,0 +1,251 @@
+"""
+Tests for the quiz generation service.
+
+Tests cover:
+- Parsing generated questions
+- Timeouts and error handling
+- Section sampling and merging for long materials
+- Incremental parsing and streaming of questions
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+
+def make_completion(payload):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = json.dumps(payload)
+    return response
+
+
+def make_chunk(content):
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    return chunk
+
+
+class FakeStream:
+    """Async iterable standing in for openai.AsyncStream."""
+
+    def __init__(self, text, piece=7):
+        self.chunks = [make_chunk(text[i:i + piece]) for i in range(0, len(text), piece)]
+        self.close = AsyncMock()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def make_question(text):
+    return {
+        "question": text,
+        "question_type": "true_false",
+        "options": [],
+        "correct_answer": "True",
+        "explanation": "Because.",
+    }
+
+
+def make_async_client(create):
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client
+
+
+class TestSampleSections:
+    """Tests for sample_sections function."""
+
+    def test_short_text_single_section(self):
+        """Test short texts are quizzed in one piece."""
+        from app.services.quiz import sample_sections
+
+        assert sample_sections("Short text.", 5) == ["Short text."]
+
+    def test_long_text_sampled_across_whole_text(self):
+        """Test sections are spread from the beginning to the end."""
+        from app.services.quiz import MAX_QUIZ_SECTIONS, QUIZ_SECTION_CHARS, sample_sections
+
+        paragraphs = [f"Paragraph {i}. " + "word " * 200 for i in range(100)]
+        text = "\n".join(paragraphs)
+
+        sections = sample_sections(text, 10)
+
+        assert len(sections) == MAX_QUIZ_SECTIONS
+        assert all(len(section) <= QUIZ_SECTION_CHARS for section in sections)
+        positions = [text.index(section) for section in sections]
+        assert positions == sorted(positions)
+        assert positions[-1] > len(text) * 0.6
+
+
+class TestMergeQuestions:
+    """Tests for merge_questions function."""
+
+    def test_interleaves_and_dedupes(self):
+        """Test questions alternate between sections and duplicates are dropped."""
+        from app.services.quiz import merge_questions
+
+        batches = [
+            [{"question": "A1?"}, {"question": "Same?"}],
+            [{"question": "B1?"}, {"question": "same? "}],
+        ]
+
+        merged = merge_questions(batches, 5)
+
+        assert [q["question"] for q in merged] == ["A1?", "B1?", "Same?"]
+        assert len(merge_questions(batches, 2)) == 2
+
+
+class TestGenerateQuiz:
+    """Tests for generate_quiz function."""
+
+    @pytest.mark.asyncio
+    async def test_returns_questions(self, mock_settings):
+        """Test generated questions are parsed from the JSON response."""
+        from app.services.quiz import generate_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        questions = [{"question": "Q?", "correct_answer": "A"}]
+        create = AsyncMock(return_value=make_completion({"questions": questions}))
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            result = await generate_quiz("Some text", num_questions=1)
+
+        assert result == questions
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, mock_settings):
+        """Test a slow completion is abandoned with TimeoutError."""
+        from app.services.quiz import generate_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 0.05
+
+        async def slow_create(**kwargs):
+            await asyncio.sleep(5)
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(slow_create)):
+            with pytest.raises(TimeoutError):
+                await generate_quiz("Some text")
+
+    @pytest.mark.asyncio
+    async def test_failure_raises_value_error(self, mock_settings):
+        """Test API errors surface as ValueError."""
+        from app.services.quiz import generate_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        create = AsyncMock(side_effect=RuntimeError("API down"))
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            with pytest.raises(ValueError):
+                await generate_quiz("Some text")
+
+    @pytest.mark.asyncio
+    async def test_long_material_generated_in_parallel(self, mock_settings):
+        """Test long materials are quizzed per section and merged to the count."""
+        from app.services.quiz import MAX_QUIZ_SECTIONS, generate_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        calls = []
+
+        async def create(**kwargs):
+            index = len(calls)
+            calls.append(kwargs)
+            questions = [{"question": f"S{index} Q{i}?"} for i in range(3)]
+            return make_completion({"questions": questions})
+
+        text = "\n".join(f"Paragraph {i}. " + "word " * 200 for i in range(100))
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            result = await generate_quiz(text, num_questions=7)
+
+        assert len(calls) == MAX_QUIZ_SECTIONS
+        assert len(result) == 7
+        # First round takes one question from every section
+        assert {q["question"] for q in result[:MAX_QUIZ_SECTIONS]} == {
+            f"S{i} Q0?" for i in range(MAX_QUIZ_SECTIONS)
+        }
+
+
+class TestQuestionStreamParser:
+    """Tests for QuestionStreamParser."""
+
+    def test_questions_complete_as_they_arrive(self):
+        """Test each question is returned once its object closes."""
+        from app.services.quiz import QuestionStreamParser
+
+        doc = json.dumps({"questions": [
+            {"question": 'Tricky "}{[ \\ text?', "options": [{"text": "a"}]},
+            {"question": "Second?"},
+        ]})
+        parser = QuestionStreamParser()
+
+        first_end = doc.index("Second") - 5
+        first = parser.feed(doc[:first_end])
+        rest = parser.feed(doc[first_end:])
+
+        assert [q["question"] for q in first] == ['Tricky "}{[ \\ text?']
+        assert [q["question"] for q in rest] == ["Second?"]
+
+
+class TestStreamQuiz:
+    """Tests for stream_quiz function."""
+
+    @pytest.mark.asyncio
+    async def test_yields_valid_questions(self, mock_settings):
+        """Test valid questions are yielded and invalid ones skipped."""
+        from app.services.quiz import stream_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        payload = {"questions": [
+            make_question("One?"), {"question": "Invalid"}, make_question("Two?"),
+        ]}
+        stream = FakeStream(json.dumps(payload))
+        create = AsyncMock(return_value=stream)
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            questions = [q async for q in stream_quiz("Some text", 5)]
+
+        assert [q["question"] for q in questions] == ["One?", "Two?"]
+        stream.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stops_at_requested_count(self, mock_settings):
+        """Test the stream ends and closes upstream once enough questions arrived."""
+        from app.services.quiz import stream_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        payload = {"questions": [make_question(f"Q{i}?") for i in range(4)]}
+        stream = FakeStream(json.dumps(payload))
+        create = AsyncMock(return_value=stream)
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            questions = [q async for q in stream_quiz("Some text", 2)]
+
+        assert len(questions) == 2
+        stream.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_no_questions_raises(self, mock_settings):
+        """Test a failed generation raises ValueError."""
+        from app.services.quiz import stream_quiz
+
+        mock_settings.quiz_generation_timeout_seconds = 5
+        create = AsyncMock(side_effect=RuntimeError("API down"))
+
+        with patch("app.services.quiz.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz.AsyncOpenAI", return_value=make_async_client(create)):
+            with pytest.raises(ValueError):
+                [q async for q in stream_quiz("Some text", 2)]
@@ -0,0 +1,164 @@
+"""
+Tests for the quiz pre-generation pool.
+
+Tests cover:
+- Claiming pooled quizzes
+- Refilling the pool up to its size, off the event loop thread
+- Clearing the pool when a material is reprocessed
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+
+def make_questions(n):
+    return [{"question": f"Q{i}?", "correct_answer": "A"} for i in range(n)]
+
+
+class TestClaimPooledQuiz:
+    """Tests for claim_pooled_quiz function."""
+
+    def test_claims_via_rpc(self):
+        """Test a pooled quiz is claimed in one RPC call."""
+        from app.services.quiz_pool import claim_pooled_quiz
+
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [{"id": "quiz-1"}]
+        user_id = uuid4()
+
+        assert claim_pooled_quiz("m1", user_id, 5, supabase) == {"id": "quiz-1"}
+        supabase.rpc.assert_called_once_with(
+            "claim_pooled_quiz",
+            {"p_material_id": "m1", "p_user_id": str(user_id), "p_num_questions": 5},
+        )
+
+    def test_empty_pool(self):
+        """Test None is returned when nothing is pooled."""
+        from app.services.quiz_pool import claim_pooled_quiz
+
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = []
+
+        assert claim_pooled_quiz("m1", uuid4(), 5, supabase) is None
+
+    def test_other_sizes_not_pooled(self):
+        """Test non-default question counts skip the pool."""
+        from app.services.quiz_pool import claim_pooled_quiz
+
+        supabase = MagicMock()
+
+        assert claim_pooled_quiz("m1", uuid4(), 8, supabase) is None
+        supabase.rpc.assert_not_called()
+
+
+class TestRefillQuizPool:
+    """Tests for refill_quiz_pool function."""
+
+    def make_supabase(self, pooled):
+        supabase = MagicMock()
+        count_query = supabase.table.return_value.select.return_value.eq.return_value
+        count_query.eq.return_value.eq.return_value.execute.return_value.count = pooled
+        return supabase
+
+    @pytest.mark.asyncio
+    async def test_tops_up_missing_quizzes(self, mock_settings):
+        """Test only the missing quizzes are generated and inserted together."""
+        from app.services.quiz_pool import refill_quiz_pool
+
+        mock_settings.quiz_pool_size = 3
+        supabase = self.make_supabase(pooled=1)
+        generate = AsyncMock(return_value=make_questions(6))
+
+        with patch("app.services.quiz_pool.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz_pool.generate_quiz", generate):
+            added = await refill_quiz_pool("m1", "u1", supabase, text="Some text")
+
+        assert added == 2
+        assert generate.await_count == 2
+        rows = supabase.table.return_value.insert.call_args[0][0]
+        assert len(rows) == 2
+        assert all(row["total_questions"] == 5 for row in rows)
+        assert all(len(row["questions"]) == 5 for row in rows)
+
+    @pytest.mark.asyncio
+    async def test_queries_run_off_event_loop(self, mock_settings):
+        """Test the blocking database calls run in the threadpool."""
+        import threading
+
+        from app.services.quiz_pool import refill_quiz_pool
+
+        mock_settings.quiz_pool_size = 2
+        supabase = self.make_supabase(pooled=0)
+        count_execute = (
+            supabase.table.return_value.select.return_value.eq.return_value
+            .eq.return_value.eq.return_value.execute
+        )
+        material_execute = (
+            supabase.table.return_value.select.return_value.eq.return_value
+            .single.return_value.execute
+        )
+        insert_execute = supabase.table.return_value.insert.return_value.execute
+        threads = []
+        count_execute.side_effect = lambda: (
+            threads.append(threading.get_ident()) or MagicMock(count=0)
+        )
+        material_execute.side_effect = lambda: (
+            threads.append(threading.get_ident())
+            or MagicMock(data={"processed_text": "Some text"})
+        )
+        insert_execute.side_effect = lambda: threads.append(threading.get_ident())
+        generate = AsyncMock(return_value=make_questions(5))
+
+        with patch("app.services.quiz_pool.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz_pool.generate_quiz", generate):
+            assert await refill_quiz_pool("m1", "u1", supabase) == 2
+
+        assert len(threads) == 3
+        assert threading.get_ident() not in threads
+
+    @pytest.mark.asyncio
+    async def test_full_pool_is_noop(self, mock_settings):
+        """Test nothing is generated when the pool is full."""
+        from app.services.quiz_pool import refill_quiz_pool
+
+        mock_settings.quiz_pool_size = 2
+        supabase = self.make_supabase(pooled=2)
+        generate = AsyncMock()
+
+        with patch("app.services.quiz_pool.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz_pool.generate_quiz", generate):
+            assert await refill_quiz_pool("m1", "u1", supabase, text="Some text") == 0
+
+        generate.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_generations_skipped(self, mock_settings):
+        """Test failed or short generations are not pooled."""
+        from app.services.quiz_pool import refill_quiz_pool
+
+        mock_settings.quiz_pool_size = 2
+        supabase = self.make_supabase(pooled=0)
+        generate = AsyncMock(side_effect=[ValueError("boom"), make_questions(5)])
+
+        with patch("app.services.quiz_pool.get_settings", return_value=mock_settings), \
+                patch("app.services.quiz_pool.generate_quiz", generate):
+            assert await refill_quiz_pool("m1", "u1", supabase, text="Some text") == 1
+
+
+class TestClearQuizPool:
+    """Tests for clear_quiz_pool function."""
+
+    def test_deletes_material_rows(self):
+        """Test every pooled quiz of the material is deleted."""
+        from app.services.quiz_pool import clear_quiz_pool
+
+        supabase = MagicMock()
+
+        clear_quiz_pool("m1", supabase)
+
+        supabase.table.assert_called_once_with("quiz_pool")
+        supabase.table.return_value.delete.return_value.eq.assert_called_once_with(
+            "material_id", "m1"
+        )
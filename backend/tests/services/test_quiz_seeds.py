@@ -0,0 +1,123 @@
+"""
+Tests for quiz seeds.
+
+Tests cover:
+- Replacing a material's seeds when it is processed again
+- Picking seeds spread across chunks
+- Assembling quizzes only from seeds the user hasn't been served
+- Falling back when too few unserved seeds remain
+"""
+
+import random
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+
+def make_seeds(per_chunk, chunks):
+    return [
+        {"id": f"s{c}-{i}", "chunk_index": c, "question": {"question": f"C{c} Q{i}?"}}
+        for c in range(chunks)
+        for i in range(per_chunk)
+    ]
+
+
+class TestSaveQuizSeeds:
+    """Tests for save_quiz_seeds function."""
+
+    def test_replaces_previous_seeds(self):
+        """Test seeds from an earlier processing run are deleted first."""
+        from app.services.quiz_seeds import save_quiz_seeds
+
+        supabase = MagicMock()
+        seeds = [{"chunk_index": 0, "question": {"question": "Q?"}}]
+
+        save_quiz_seeds("m1", "u1", seeds, supabase)
+
+        supabase.table.return_value.delete.return_value.eq.assert_called_once_with(
+            "material_id", "m1"
+        )
+        rows = supabase.table.return_value.insert.call_args[0][0]
+        assert rows == [{
+            "material_id": "m1",
+            "user_id": "u1",
+            "chunk_index": 0,
+            "question": {"question": "Q?"},
+        }]
+
+
+class TestPickSeeds:
+    """Tests for pick_seeds function."""
+
+    def test_spread_across_chunks(self):
+        """Test every chunk contributes before any chunk is asked twice."""
+        from app.services.quiz_seeds import pick_seeds
+
+        seeds = pick_seeds(make_seeds(5, 3), 4, rng=random.Random(0))
+
+        assert len(seeds) == 4
+        chunks = [seed["chunk_index"] for seed in seeds]
+        assert sorted(chunks[:3]) == [0, 1, 2]
+        assert chunks[3] == 0
+
+
+class TestAssembleQuizFromSeeds:
+    """Tests for assemble_quiz_from_seeds function."""
+
+    def make_supabase(self, unserved, claimed=None):
+        supabase = MagicMock()
+        query = (
+            supabase.table.return_value.select.return_value
+            .eq.return_value.eq.return_value.is_.return_value
+        )
+        query.execute.return_value.data = unserved
+        claim = supabase.table.return_value.update.return_value.in_.return_value.is_.return_value
+
+        def claim_execute():
+            ids = supabase.table.return_value.update.return_value.in_.call_args[0][1]
+            rows = [{"id": i} for i in ids]
+            return MagicMock(data=rows if claimed is None else rows[:claimed])
+
+        claim.execute.side_effect = claim_execute
+        return supabase
+
+    def test_assembles_from_unserved_seeds(self):
+        """Test a quiz is assembled from unserved seeds, which are marked served."""
+        from app.services.quiz_seeds import assemble_quiz_from_seeds
+
+        seeds = make_seeds(5, 2)
+        supabase = self.make_supabase(seeds)
+
+        questions = assemble_quiz_from_seeds("m1", uuid4(), 6, supabase)
+
+        assert len(questions) == 6
+        supabase.table.return_value.select.return_value.eq.return_value.eq.return_value \
+            .is_.assert_called_once_with("served_at", "null")
+        update = supabase.table.return_value.update
+        assert update.call_args[0][0]["served_at"] is not None
+        served_ids = update.return_value.in_.call_args[0][1]
+        served = {seed["id"]: seed["question"] for seed in seeds if seed["id"] in served_ids}
+        assert sorted(q["question"] for q in questions) == sorted(
+            q["question"] for q in served.values()
+        )
+
+    def test_too_few_unserved_seeds(self):
+        """Test None is returned so the quiz comes from the pool or is generated."""
+        from app.services.quiz_seeds import assemble_quiz_from_seeds
+
+        supabase = self.make_supabase(make_seeds(2, 1))
+
+        assert assemble_quiz_from_seeds("m1", uuid4(), 5, supabase) is None
+        supabase.table.return_value.update.assert_not_called()
+
+    def test_seeds_taken_concurrently(self):
+        """Test seeds claimed by another request aren't repeated."""
+        from app.services.quiz_seeds import assemble_quiz_from_seeds
+
+        supabase = self.make_supabase(make_seeds(5, 1), claimed=3)
+
+        assert assemble_quiz_from_seeds("m1", uuid4(), 5, supabase) is None
+        # The three seeds this request did claim are handed back
+        release = supabase.table.return_value.update.call_args_list[-1]
+        assert release[0][0] == {"served_at": None}
+        released_ids = supabase.table.return_value.update.return_value.in_.call_args[0][1]
+        assert len(released_ids) == 3
@@ -0,0 +1,169 @@
+"""
+Tests for the chat retrieval service.
+
+Tests cover:
+- Passage chunking
+- BM25 ranking
+- Top-k passage selection with and without embeddings
+- Material overview and the in-process index cache
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+class TestChunkText:
+    """Tests for chunk_text function."""
+
+    def test_short_text_single_chunk(self):
+        """Test text under the chunk size is returned whole."""
+        from app.services.retrieval import chunk_text
+
+        assert chunk_text("  Short text.  ", chunk_chars=100) == ["Short text."]
+
+    def test_empty_text(self):
+        """Test empty text yields no passages."""
+        from app.services.retrieval import chunk_text
+
+        assert chunk_text("   ", chunk_chars=100) == []
+
+    def test_long_text_covers_everything(self):
+        """Test every sentence ends up in some passage, split at sentence ends."""
+        from app.services.retrieval import chunk_text
+
+        sentences = [f"Sentence number {i} is here." for i in range(100)]
+        text = " ".join(sentences)
+
+        chunks = chunk_text(text, chunk_chars=200, overlap_chars=50)
+
+        assert len(chunks) > 1
+        assert all(len(c) <= 200 for c in chunks)
+        assert all(c.endswith(".") for c in chunks)
+        joined = " ".join(chunks)
+        assert all(s in joined for s in sentences)
+
+
+class TestBM25Index:
+    """Tests for BM25Index."""
+
+    def test_relevant_passage_scores_highest(self):
+        """Test the passage containing the query terms ranks first."""
+        from app.services.retrieval import BM25Index
+
+        index = BM25Index([
+            "The mitochondria is the powerhouse of the cell.",
+            "Photosynthesis converts light into chemical energy.",
+            "Cells divide through mitosis.",
+        ])
+
+        scores = index.scores("How does photosynthesis work?")
+
+        assert scores[1] > 0
+        assert scores[1] == max(scores)
+        assert scores[0] == 0
+
+    def test_stopwords_ignored(self):
+        """Test queries made only of stopwords match nothing."""
+        from app.services.retrieval import BM25Index
+
+        index = BM25Index(["The cat is on the mat."])
+
+        assert index.scores("what is the") == [0.0]
+
+
+class TestMaterialIndex:
+    """Tests for MaterialIndex.search."""
+
+    CHUNKS = [
+        "Introduction to the course.",
+        "Glaciers carve valleys over thousands of years.",
+        "Volcanoes form at plate boundaries.",
+        "Rivers deposit sediment in deltas.",
+        "Summary and conclusion.",
+    ]
+
+    def test_top_k_in_document_order(self):
+        """Test the best passages are returned in their original order."""
+        from app.services.retrieval import MaterialIndex
+
+        index = MaterialIndex(self.CHUNKS)
+
+        passages = index.search("rivers and glaciers", top_k=2)
+
+        assert passages == [self.CHUNKS[1], self.CHUNKS[3]]
+
+    def test_no_match_falls_back_to_beginning(self):
+        """Test unmatched queries get the start of the material."""
+        from app.services.retrieval import MaterialIndex
+
+        index = MaterialIndex(self.CHUNKS)
+
+        assert index.search("tell me more", top_k=2) == self.CHUNKS[:2]
+
+    def test_small_material_returned_whole(self):
+        """Test materials with few passages are sent entirely."""
+        from app.services.retrieval import MaterialIndex
+
+        index = MaterialIndex(self.CHUNKS[:2])
+
+        assert index.search("volcanoes", top_k=4) == self.CHUNKS[:2]
+
+    def test_embeddings_blend(self):
+        """Test embedding similarity can surface passages BM25 misses."""
+        np = pytest.importorskip("numpy")
+        from app.services.retrieval import MaterialIndex
+
+        embeddings = np.eye(len(self.CHUNKS), dtype=np.float32)
+        index = MaterialIndex(self.CHUNKS, embeddings)
+
+        # No lexical overlap, but the query embedding points at "Volcanoes"
+        passages = index.search("eruptions", top_k=1, query_embedding=embeddings[2])
+
+        assert passages == [self.CHUNKS[2]]
+
+
+class TestMaterialIndexOverview:
+    """Tests for MaterialIndex.overview."""
+
+    def test_leading_chunks_within_limit(self):
+        """Test whole leading passages are taken up to the character limit."""
+        from app.services.retrieval import MaterialIndex
+
+        index = MaterialIndex(["a" * 10, "b" * 10, "c" * 10])
+
+        assert index.overview(25) == "a" * 10 + "\n\n" + "b" * 10
+        assert index.overview(5) == ""
+
+
+class TestGetMaterialIndex:
+    """Tests for get_material_index function."""
+
+    def make_supabase(self, chunks):
+        supabase = MagicMock()
+        query = supabase.table.return_value.select.return_value.eq.return_value
+        query.order.return_value.execute.return_value.data = [
+            {"content": c} for c in chunks
+        ]
+        return supabase
+
+    def test_cached_until_material_changes(self, mock_settings):
+        """Test the index is loaded once per material version."""
+        from app.core.cache import TTLCache
+        from app.services.retrieval import get_material_index
+
+        mock_settings.chat_retrieval_embeddings = False
+        supabase = self.make_supabase(["First passage.", "Second passage."])
+        cache = TTLCache(max_size=10, ttl_seconds=60)
+
+        with patch("app.services.retrieval.get_settings", return_value=mock_settings), \
+                patch("app.services.retrieval.get_material_index_cache", return_value=cache):
+            first = get_material_index("m1", "u1", "2024-01-01T00:00:00", supabase)
+            second = get_material_index("m1", "u1", "2024-01-01T00:00:00", supabase)
+            assert second is first
+            assert supabase.table.call_count == 1
+
+            # Reprocessing bumps updated_at and rebuilds the index
+            third = get_material_index("m1", "u1", "2024-02-01T00:00:00", supabase)
+            assert third is not first
+            assert supabase.table.call_count == 2
@@ -0,0 +1,63 @@
+"""
+Tests for the review session store.
+
+Tests cover:
+- Snapshotting and paging with prefetch
+- Removing reviewed cards
+- Ownership checks and ending sessions
+"""
+
+
+def make_cards(n):
+    return [{"id": f"card-{i}", "term": f"term {i}"} for i in range(n)]
+
+
+class TestReviewSessionStore:
+    """Tests for ReviewSessionStore."""
+
+    def test_page_and_prefetch(self):
+        """Test a page is returned with the following batch prefetched."""
+        from app.services.review_session import ReviewSessionStore
+
+        store = ReviewSessionStore(max_sessions=10, ttl_seconds=60)
+        session = store.create("user-1", make_cards(5))
+
+        cards, prefetch = store.page(session, page_size=2)
+
+        assert [c["id"] for c in cards] == ["card-0", "card-1"]
+        assert [c["id"] for c in prefetch] == ["card-2", "card-3"]
+
+    def test_remove_card_advances_queue(self):
+        """Test reviewed cards drop out of the queue."""
+        from app.services.review_session import ReviewSessionStore
+
+        store = ReviewSessionStore(max_sessions=10, ttl_seconds=60)
+        session = store.create("user-1", make_cards(3))
+
+        assert store.remove_card(session.id, "user-1", "card-0") is True
+        assert store.remove_card(session.id, "user-1", "card-0") is False
+
+        cards, prefetch = store.page(store.get(session.id, "user-1"), page_size=1)
+        assert [c["id"] for c in cards] == ["card-1"]
+        assert [c["id"] for c in prefetch] == ["card-2"]
+
+    def test_other_user_cannot_access(self):
+        """Test sessions are scoped to their owner."""
+        from app.services.review_session import ReviewSessionStore
+
+        store = ReviewSessionStore(max_sessions=10, ttl_seconds=60)
+        session = store.create("user-1", make_cards(2))
+
+        assert store.get(session.id, "user-2") is None
+        assert store.remove_card(session.id, "user-2", "card-0") is False
+        assert store.end(session.id, "user-2") is False
+
+    def test_end_session(self):
+        """Test ended sessions are gone."""
+        from app.services.review_session import ReviewSessionStore
+
+        store = ReviewSessionStore(max_sessions=10, ttl_seconds=60)
+        session = store.create("user-1", make_cards(2))
+
+        assert store.end(session.id, "user-1") is True
+        assert store.get(session.id, "user-1") is None
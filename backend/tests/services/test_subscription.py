@@ -0,0 +1,281 @@
+"""
+Tests for the subscription service.
+
+Tests cover:
+- Atomic upload slot reservation and release
+- Atomic quiz slot reservation and release
+- Read-through subscription cache and request memo
+- Weekly usage computed from the reset anchor
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+
+def make_subscription_cache():
+    from app.core.cache import TTLCache
+
+    return TTLCache(max_size=10, ttl_seconds=60)
+
+
+def patch_subscription_cache(cache=None):
+    return patch(
+        "app.services.subscription.get_subscription_cache",
+        return_value=cache if cache is not None else make_subscription_cache(),
+    )
+
+
+def make_supabase(subscription):
+    supabase = MagicMock()
+    query = supabase.table.return_value.select.return_value.eq.return_value
+    query.maybe_single.return_value.execute.return_value.data = subscription
+    return supabase
+
+
+class TestReserveUploadSlot:
+    """Tests for reserve_upload_slot function."""
+
+    def test_reserves_via_rpc(self, mock_settings):
+        """Test the check and increment are a single RPC call with the tier limits."""
+        from app.services.subscription import reserve_upload_slot
+
+        mock_settings.free_uploads_per_week = 1
+        mock_settings.pro_uploads_per_week = 10
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"allowed": True, "uploads_this_week": 3, "upload_limit": 10}
+        ]
+        user_id = uuid4()
+
+        with patch_subscription_cache():
+            assert reserve_upload_slot(user_id, supabase, mock_settings) == (True, 3, 10)
+        supabase.rpc.assert_called_once_with(
+            "reserve_upload_slot",
+            {"p_user_id": str(user_id), "p_free_limit": 1, "p_pro_limit": 10},
+        )
+        supabase.table.assert_not_called()
+
+    def test_limit_reached(self, mock_settings):
+        """Test a refused reservation reports the current count and limit."""
+        from app.services.subscription import reserve_upload_slot
+
+        mock_settings.free_uploads_per_week = 1
+        mock_settings.pro_uploads_per_week = 10
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"allowed": False, "uploads_this_week": 1, "upload_limit": 1}
+        ]
+
+        with patch_subscription_cache():
+            assert reserve_upload_slot(uuid4(), supabase, mock_settings) == (False, 1, 1)
+
+
+class TestReleaseUploadSlot:
+    """Tests for release_upload_slot function."""
+
+    def test_releases_via_rpc(self):
+        """Test a failed upload gives its slot back."""
+        from app.services.subscription import release_upload_slot
+
+        supabase = MagicMock()
+        user_id = uuid4()
+
+        with patch_subscription_cache():
+            release_upload_slot(user_id, supabase)
+
+        supabase.rpc.assert_called_once_with("release_upload_slot", {"p_user_id": str(user_id)})
+
+
+class TestReserveQuizSlot:
+    """Tests for reserve_quiz_slot function."""
+
+    def test_reserves_via_rpc(self, mock_settings):
+        """Test the check and increment are a single RPC call with the tier limits."""
+        from app.services.subscription import reserve_quiz_slot
+
+        mock_settings.free_quizzes_per_material = 2
+        mock_settings.pro_quizzes_per_material = 20
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"allowed": True, "quiz_count": 2, "quiz_limit": 2}
+        ]
+        user_id = uuid4()
+
+        assert reserve_quiz_slot(user_id, "m1", supabase, mock_settings) == (True, 2, 2)
+        supabase.rpc.assert_called_once_with(
+            "reserve_quiz_slot",
+            {
+                "p_material_id": "m1",
+                "p_user_id": str(user_id),
+                "p_free_limit": 2,
+                "p_pro_limit": 20,
+            },
+        )
+        supabase.table.assert_not_called()
+
+    def test_limit_reached(self, mock_settings):
+        """Test a refused reservation reports the current count and limit."""
+        from app.services.subscription import reserve_quiz_slot
+
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"allowed": False, "quiz_count": 2, "quiz_limit": 2}
+        ]
+
+        assert reserve_quiz_slot(uuid4(), "m1", supabase, mock_settings) == (False, 2, 2)
+
+    def test_unknown_material(self, mock_settings):
+        """Test None is returned for a material the user doesn't own."""
+        from app.services.subscription import reserve_quiz_slot
+
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value.data = []
+
+        assert reserve_quiz_slot(uuid4(), "m1", supabase, mock_settings) is None
+
+
+class TestReleaseQuizSlot:
+    """Tests for release_quiz_slot function."""
+
+    def test_releases_via_rpc(self):
+        """Test a quiz that wasn't created gives its slot back."""
+        from app.services.subscription import release_quiz_slot
+
+        supabase = MagicMock()
+
+        release_quiz_slot("m1", supabase)
+
+        supabase.rpc.assert_called_once_with("release_quiz_slot", {"p_material_id": "m1"})
+
+
+class TestSubscriptionCache:
+    """Tests for the read-through subscription cache."""
+
+    def test_read_through(self):
+        """Test the subscription is read from the database once and then cached."""
+        from app.services.subscription import get_or_create_subscription
+
+        user_id = uuid4()
+        row = {"id": "s1", "user_id": str(user_id), "status": "active"}
+        supabase = make_supabase(row)
+
+        with patch_subscription_cache():
+            assert get_or_create_subscription(user_id, supabase) == row
+            assert get_or_create_subscription(user_id, supabase) == row
+
+        assert supabase.table.call_count == 1
+
+    def test_upload_reservation_invalidates(self, mock_settings):
+        """Test reserving an upload drops the cached usage."""
+        from app.services.subscription import get_or_create_subscription, reserve_upload_slot
+
+        user_id = uuid4()
+        supabase = make_supabase({"id": "s1", "user_id": str(user_id), "status": "free"})
+        supabase.rpc.return_value.execute.return_value.data = [
+            {"allowed": True, "uploads_this_week": 1, "upload_limit": 1}
+        ]
+        cache = make_subscription_cache()
+
+        with patch_subscription_cache(cache):
+            get_or_create_subscription(user_id, supabase)
+            reserve_upload_slot(user_id, supabase, mock_settings)
+
+        assert cache.get(str(user_id)) is None
+
+    def test_stripe_update_refreshes_cache(self):
+        """Test webhook updates replace the cached row."""
+        from app.services.subscription import (
+            get_or_create_subscription,
+            update_subscription_from_stripe,
+        )
+
+        user_id = uuid4()
+        supabase = make_supabase({"id": "s1", "user_id": str(user_id), "status": "free"})
+        updated = {"id": "s1", "user_id": str(user_id), "status": "trialing"}
+        supabase.table.return_value.update.return_value.eq.return_value.execute.return_value.data = [
+            updated
+        ]
+
+        with patch_subscription_cache():
+            get_or_create_subscription(user_id, supabase)
+            update_subscription_from_stripe(
+                user_id=str(user_id),
+                stripe_customer_id="cus_1",
+                stripe_subscription_id="sub_1",
+                status="trialing",
+                trial_end=None,
+                current_period_start=None,
+                current_period_end=None,
+                supabase=supabase,
+            )
+            assert get_or_create_subscription(user_id, supabase) == updated
+
+    def test_request_memo(self):
+        """Test a request reuses its subscription even if the shared cache is cold."""
+        from app.core.cache import _request_cache
+        from app.services.subscription import get_or_create_subscription
+
+        user_id = uuid4()
+        supabase = make_supabase({"id": "s1", "user_id": str(user_id), "status": "free"})
+        cache = MagicMock()
+        cache.get.return_value = None
+
+        token = _request_cache.set({})
+        try:
+            with patch_subscription_cache(cache):
+                get_or_create_subscription(user_id, supabase)
+                get_or_create_subscription(user_id, supabase)
+        finally:
+            _request_cache.reset(token)
+
+        assert cache.get.call_count == 1
+        assert supabase.table.call_count == 1
+
+
+class TestWeeklyUsage:
+    """Tests for weekly_usage function."""
+
+    ANCHOR = datetime(2024, 1, 8, tzinfo=timezone.utc)
+
+    def test_current_week(self):
+        """Test usage counts until the anchor."""
+        from app.services.subscription import weekly_usage
+
+        subscription = {"uploads_this_week": 3, "week_reset_at": "2024-01-08T00:00:00Z"}
+        now = self.ANCHOR - timedelta(days=1)
+
+        assert weekly_usage(subscription, now) == (3, self.ANCHOR)
+
+    def test_elapsed_weeks(self):
+        """Test usage is zero after the anchor and the reset stays on the weekly grid."""
+        from app.services.subscription import weekly_usage
+
+        subscription = {"uploads_this_week": 3, "week_reset_at": self.ANCHOR.isoformat()}
+
+        assert weekly_usage(subscription, self.ANCHOR) == (0, self.ANCHOR + timedelta(days=7))
+        assert weekly_usage(subscription, self.ANCHOR + timedelta(days=17)) == (
+            0, self.ANCHOR + timedelta(days=21)
+        )
+
+    def test_response_is_read_only(self, mock_settings):
+        """Test the status response never writes, even after the week has passed."""
+        from app.services.subscription import get_subscription_response
+
+        mock_settings.free_uploads_per_week = 1
+        mock_settings.free_quizzes_per_material = 3
+        user_id = uuid4()
+        supabase = make_supabase({
+            "id": "s1",
+            "user_id": str(user_id),
+            "status": "free",
+            "uploads_this_week": 1,
+            "week_reset_at": "2020-01-01T00:00:00+00:00",
+        })
+
+        with patch_subscription_cache():
+            response = get_subscription_response(user_id, supabase, mock_settings)
+
+        assert response["uploads_used"] == 0
+        assert response["uploads_reset_at"] > datetime.now(timezone.utc)
+        supabase.table.return_value.update.assert_not_called()
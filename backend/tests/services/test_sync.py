@@ -0,0 +1,147 @@
+"""
+Tests for the delta sync service.
+
+Tests cover:
+- Sync cursor parsing
+- Changed rows and tombstones paging
+- Safety window for late commits and expired cursors
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+ROW_1 = "00000000-0000-0000-0000-000000000001"
+ROW_2 = "00000000-0000-0000-0000-000000000002"
+TOMBSTONE = "00000000-0000-0000-0000-0000000000aa"
+
+
+def make_supabase(changes, deletes):
+    """Build a mock Supabase client returning the given rows per table."""
+    supabase = MagicMock()
+
+    def table(name):
+        query = MagicMock()
+        for method in ("select", "eq", "or_", "order", "limit"):
+            getattr(query, method).return_value = query
+        data = deletes if name == "deleted_records" else changes
+        query.execute.return_value = MagicMock(data=data)
+        return query
+
+    supabase.table.side_effect = table
+    return supabase
+
+
+class TestSplitSyncCursor:
+    """Tests for split_sync_cursor function."""
+
+    def test_empty(self):
+        """Test a missing cursor means initial sync."""
+        from app.services.sync import split_sync_cursor
+
+        assert split_sync_cursor(None) == (None, None)
+
+    def test_malformed(self):
+        """Test cursors without both parts are rejected."""
+        from app.services.sync import split_sync_cursor
+
+        with pytest.raises(ValueError):
+            split_sync_cursor("onlyonepart")
+        with pytest.raises(ValueError):
+            split_sync_cursor("a.")
+
+
+class TestFetchDelta:
+    """Tests for fetch_delta function."""
+
+    def test_initial_sync(self):
+        """Test an initial sync returns rows and a resumable cursor."""
+        from app.services.pagination import decode_cursor
+        from app.services.sync import (
+            MIN_UUID,
+            SYNC_SAFETY_WINDOW,
+            fetch_delta,
+            split_sync_cursor,
+        )
+
+        changes = [
+            {"id": ROW_1, "updated_at": "2026-01-01T00:00:00+00:00"},
+            {"id": ROW_2, "updated_at": "2026-01-02T00:00:00+00:00"},
+        ]
+        supabase = make_supabase(changes, [])
+
+        delta = fetch_delta(supabase, "flashcards", "user-1", ["id", "updated_at"], None, 10)
+
+        assert delta["changed"] == changes
+        assert delta["deleted"] == []
+        assert delta["has_more"] is False
+        changes_cursor, _ = split_sync_cursor(delta["next_cursor"])
+        position, row_id = decode_cursor(changes_cursor)
+        # Caught up: the cursor waits at the safety horizon
+        assert row_id == MIN_UUID
+        assert datetime.fromisoformat(position) <= datetime.now(timezone.utc) - SYNC_SAFETY_WINDOW
+
+    def test_has_more_and_tombstones(self):
+        """Test paging stops at the limit and tombstones are reported."""
+        from app.services.sync import fetch_delta
+
+        changes = [
+            {"id": ROW_1, "updated_at": "2026-01-01T00:00:00+00:00"},
+            {"id": ROW_2, "updated_at": "2026-01-02T00:00:00+00:00"},
+        ]
+        deletes = [
+            {"id": TOMBSTONE, "record_id": ROW_1, "deleted_at": "2026-01-03T00:00:00+00:00"},
+        ]
+        supabase = make_supabase(changes, deletes)
+
+        delta = fetch_delta(supabase, "flashcards", "user-1", ["id", "updated_at"], None, 1)
+
+        assert delta["changed"] == changes[:1]
+        assert delta["deleted"] == [ROW_1]
+        assert delta["has_more"] is True
+
+    def test_full_page_continues_after_last_row(self):
+        """Test a full page resumes right after its last row."""
+        from app.services.pagination import decode_cursor
+        from app.services.sync import fetch_delta, split_sync_cursor
+
+        changes = [
+            {"id": ROW_1, "updated_at": "2026-01-01T00:00:00+00:00"},
+            {"id": ROW_2, "updated_at": "2026-01-02T00:00:00+00:00"},
+        ]
+        supabase = make_supabase(changes, [])
+
+        delta = fetch_delta(supabase, "flashcards", "user-1", ["id", "updated_at"], None, 1)
+
+        changes_cursor, _ = split_sync_cursor(delta["next_cursor"])
+        assert decode_cursor(changes_cursor) == ("2026-01-01T00:00:00+00:00", ROW_1)
+
+    def test_cursor_stays_behind_recent_stamps(self):
+        """Test a row stamped just before a sync but committed after it is picked up next time."""
+        from app.services.pagination import decode_cursor
+        from app.services.sync import fetch_delta, split_sync_cursor
+
+        # Committed row seen by this sync, plus one still in flight stamped 10s ago
+        stamped_at = datetime.now(timezone.utc) - timedelta(seconds=10)
+        seen = {"id": ROW_2, "updated_at": (stamped_at + timedelta(seconds=5)).isoformat()}
+
+        delta = fetch_delta(
+            make_supabase([seen], []), "flashcards", "user-1", ["id", "updated_at"], None, 10
+        )
+
+        changes_cursor, deletes_cursor = split_sync_cursor(delta["next_cursor"])
+        assert datetime.fromisoformat(decode_cursor(changes_cursor)[0]) < stamped_at
+        assert datetime.fromisoformat(decode_cursor(deletes_cursor)[0]) < stamped_at
+
+    def test_expired_cursor(self):
+        """Test cursors older than the tombstone retention must resync."""
+        from app.services.pagination import encode_cursor
+        from app.services.sync import SyncCursorExpired, fetch_delta
+
+        old = encode_cursor("2020-01-01T00:00:00+00:00", ROW_1)
+
+        with pytest.raises(SyncCursorExpired):
+            fetch_delta(
+                make_supabase([], []), "flashcards", "user-1", ["id"], f"{old}.{old}", 10
+            )
@@ -0,0 +1,70 @@
+"""
+Tests for vocabulary extraction.
+
+Tests cover:
+- The combined flashcards + quiz seeds tool call
+"""
+
+import json
+from unittest.mock import MagicMock
+
+
+def make_client(arguments):
+    client = MagicMock()
+    response = MagicMock()
+    response.choices[0].message.tool_calls = [MagicMock()]
+    response.choices[0].message.tool_calls[0].function.arguments = json.dumps(arguments)
+    client.chat.completions.create.return_value = response
+    return client
+
+
+CARD = {
+    "term": "thrive",
+    "translation": "процветать",
+    "definition": "to grow well",
+    "context_original": "Plants thrive in sunlight.",
+}
+
+QUESTION = {
+    "question": "Plants need sunlight.",
+    "question_type": "true_false",
+    "options": [],
+    "correct_answer": "True",
+    "explanation": "The text says so.",
+}
+
+
+class TestExtractStudyMaterialFromChunk:
+    """Tests for extract_study_material_from_chunk function."""
+
+    def test_quiz_seeds_requested_in_same_call(self):
+        """Test one tool call returns both flashcards and validated quiz seeds."""
+        from app.services.vocabulary import extract_study_material_from_chunk
+
+        client = make_client({
+            "flashcards": [CARD],
+            "quiz_questions": [QUESTION, {"question": "Missing fields"}],
+        })
+
+        flashcards, seeds = extract_study_material_from_chunk(
+            client, "Plants thrive in sunlight.", 0, 1, with_quiz_seeds=True
+        )
+
+        assert [c.term for c in flashcards] == ["thrive"]
+        assert [s["question"] for s in seeds] == ["Plants need sunlight."]
+        client.chat.completions.create.assert_called_once()
+        tools = client.chat.completions.create.call_args.kwargs["tools"]
+        assert "quiz_questions" in tools[0]["function"]["parameters"]["required"]
+
+    def test_without_seeds(self):
+        """Test the default call only asks for flashcards."""
+        from app.services.vocabulary import extract_study_material_from_chunk
+
+        client = make_client({"flashcards": [CARD]})
+
+        flashcards, seeds = extract_study_material_from_chunk(client, "text", 0, 1)
+
+        assert len(flashcards) == 1
+        assert seeds == []
+        tools = client.chat.completions.create.call_args.kwargs["tools"]
+        assert "quiz_questions" not in tools[0]["function"]["parameters"]["properties"]
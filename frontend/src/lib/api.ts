@@ -6,6 +6,10 @@ type FetchOptions = RequestInit & {
   params?: Record<string, string>
 }
 
+// Signed tier/limits token from the API; sent back so it can skip subscription lookups
+const ENTITLEMENT_HEADER = "X-Entitlement-Token"
+let entitlementToken: string | null = null
+
 async function fetchWithAuth(endpoint: string, options: FetchOptions = {}) {
   const token = await getAccessToken()
   if (!token) {
@@ -25,10 +29,16 @@ async function fetchWithAuth(endpoint: string, options: FetchOptions = {}) {
     headers: {
       Authorization: `Bearer ${token}`,
       "Content-Type": "application/json",
+      ...(entitlementToken ? { [ENTITLEMENT_HEADER]: entitlementToken } : {}),
       ...fetchOptions.headers,
     },
   })
 
+  const issuedToken = response.headers.get(ENTITLEMENT_HEADER)
+  if (issuedToken) {
+    entitlementToken = issuedToken
+  }
+
   if (!response.ok) {
     const error = await response.json().catch(() => ({ detail: "Request failed" }))
     throw new Error(error.detail || "Request failed")
@@ -54,7 +64,7 @@ export type Material = {
   source_type: "youtube" | "file" | "url"
   source_url: string | null
   file_path: string | null
-  processed_text: string | null
+  processed_text?: string | null
   processing_status: "pending" | "processing" | "completed" | "failed"
   created_at: string
 }
@@ -124,6 +134,11 @@ export type Flashcard = {
   created_at: string
 }
 
+export type FlashcardPage = {
+  items: Partial<Flashcard>[]
+  next_cursor: string | null
+}
+
 export type ReviewStats = {
   total_cards: number
   due_for_review: number
@@ -145,10 +160,17 @@ export const cardsApi = {
       body: JSON.stringify({ quality }),
     }),
 
-  list: (materialId?: string): Promise<Flashcard[]> =>
-    fetchWithAuth("/cards", {
-      params: materialId ? { material_id: materialId } : undefined,
-    }),
+  list: (
+    materialId?: string,
+    options: { cursor?: string; limit?: number; compact?: boolean } = {}
+  ): Promise<FlashcardPage> => {
+    const params: Record<string, string> = {}
+    if (materialId) params.material_id = materialId
+    if (options.cursor) params.cursor = options.cursor
+    if (options.limit) params.limit = String(options.limit)
+    if (options.compact) params.compact = "true"
+    return fetchWithAuth("/cards", { params })
+  },
 
   getStats: (): Promise<ReviewStats> => fetchWithAuth("/cards/stats"),
 }
@@ -177,6 +199,12 @@ export type Quiz = {
   created_at: string
 }
 
+// "flashcards" builds the quiz from the material's cards, without the AI model
+export type QuizSource = "llm" | "flashcards"
+
+// List entry; load the questions with quizzesApi.get
+export type QuizSummary = Omit<Quiz, "questions">
+
 export type QuizResult = {
   quiz_id: string
   score: number
@@ -192,13 +220,17 @@ export type QuizResult = {
 }
 
 export const quizzesApi = {
-  create: (materialId: string, numQuestions = 5): Promise<Quiz> =>
+  create: (
+    materialId: string,
+    numQuestions = 5,
+    source: QuizSource = "llm"
+  ): Promise<Quiz> =>
     fetchWithAuth("/quizzes", {
       method: "POST",
-      body: JSON.stringify({ material_id: materialId, num_questions: numQuestions }),
+      body: JSON.stringify({ material_id: materialId, num_questions: numQuestions, source }),
     }),
 
-  list: (materialId: string): Promise<Quiz[]> =>
+  list: (materialId: string): Promise<QuizSummary[]> =>
     fetchWithAuth(`/quizzes/material/${materialId}`),
 
   get: (quizId: string): Promise<Quiz> =>